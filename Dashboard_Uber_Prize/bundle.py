@@ -0,0 +1,121 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import time
+from os.path import dirname, isdir, join, relpath
+import numpy as np
+import pandas as pd
+
+from frame_cache import file_fingerprint
+from reference import REFERENCE_FILES
+from submission import DATA_SOURCES, column_data, data_memory_usage, input_paths, reference_path, submission_path
+
+# Precomputed data sources are saved in a `.dashboard_bundle` directory inside each submission directory.
+# Bump BUNDLE_VERSION whenever a `make_*` method changes its output, so that existing bundles become stale.
+BUNDLE_DIR = '.dashboard_bundle'
+BUNDLE_VERSION = 6
+
+
+class SubmissionBundle():
+
+    def __init__(self, name, scenario, data):
+        """
+        Precomputed data sources of a submission, exposing the same `*_data` attributes as a Submission.
+
+        Parameters
+        ----------
+        name : str
+        scenario : str
+        data : dict of dict
+            Data of each data source, keyed by attribute name
+
+        Returns
+        -------
+        None
+        """
+        self.name = name
+        self.scenario = scenario
+        for data_source in DATA_SOURCES:
+            setattr(self, data_source, column_data(data[data_source]))
+
+    def memory_usage(self):
+        '''Returns the memory used by the data sources of the bundle ("data"), in bytes (it holds no raw frames)'''
+        return {'raw': 0, 'data': sum(data_memory_usage(getattr(self, data_source)) for data_source in DATA_SOURCES)}
+
+
+def bundle_path(scenario, name):
+    '''Returns the bundle directory of the `name` submission of `scenario`'''
+    return join(submission_path(scenario, name), BUNDLE_DIR)
+
+
+def source_fingerprints(scenario, name):
+    """ Returns the (size, mtime) fingerprint of every file the data sources of a submission are computed from,
+    keyed by path relative to the data directory.
+    """
+    data_dir = dirname(reference_path())
+    paths = input_paths(submission_path(scenario, name)) + [join(reference_path(), f) for f in REFERENCE_FILES]
+    return {relpath(path, data_dir): list(file_fingerprint(path)) for path in paths}
+
+
+def to_json_type(obj):
+    '''Converts numpy and pandas objects left in the data sources into JSON serializable types'''
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (np.ndarray, pd.Series, pd.Index, pd.Categorical)):
+        return np.asarray(obj).tolist()
+    raise TypeError('{} is not JSON serializable'.format(type(obj).__name__))
+
+
+def write_bundle(submission):
+    """ Saves all the data sources of a built Submission, with a manifest of the files they were computed from.
+    """
+    path = bundle_path(submission.scenario, submission.name)
+    manifest = {
+        'version': BUNDLE_VERSION,
+        'created': time.time(),
+        'sources': source_fingerprints(submission.scenario, submission.name),
+        'data_sources': DATA_SOURCES
+    }
+    data = {data_source: getattr(submission, data_source) for data_source in DATA_SOURCES}
+
+    tmp_dir = tempfile.mkdtemp(prefix='.tmp-bundle-', dir=submission.submissions_dir)
+    with gzip.open(join(tmp_dir, 'data.json.gz'), 'wt') as f:
+        json.dump(data, f, default=to_json_type, separators=(',', ':'))
+    with open(join(tmp_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    shutil.rmtree(path, ignore_errors=True)
+    try:
+        os.rename(tmp_dir, path)
+    except OSError:
+        # Another process saved the same bundle in the meantime
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def is_fresh(manifest, scenario, name):
+    """ Checks that a bundle manifest matches the current bundle version and source files of a submission.
+    """
+    try:
+        return manifest['version'] == BUNDLE_VERSION and manifest['sources'] == source_fingerprints(scenario, name)
+    except (OSError, ValueError):
+        return False
+
+
+def read_bundle(scenario, name):
+    """ Returns the SubmissionBundle of a submission, or None if its bundle is missing or stale.
+    """
+    path = bundle_path(scenario, name)
+    if not isdir(path):
+        return None
+    try:
+        with open(join(path, 'manifest.json')) as f:
+            manifest = json.load(f)
+        if not is_fresh(manifest, scenario, name):
+            return None
+        with gzip.open(join(path, 'data.json.gz'), 'rt') as f:
+            data = json.load(f)
+        return SubmissionBundle(name=name, scenario=scenario, data=data)
+    except (IOError, ValueError, KeyError):
+        return None
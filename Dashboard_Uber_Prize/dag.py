@@ -0,0 +1,70 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def timed(function):
+    '''Returns a function calling `function` and returning its result along with its duration in seconds'''
+    def run():
+        start = time.time()
+        return function(), time.time() - start
+    return run
+
+
+def run_graph(nodes, workers=1):
+    """ Runs every node of a dependency graph once, each one after all its dependencies, with independent nodes
+    running concurrently on a thread pool.
+
+    Parameters
+    ----------
+    nodes: dict
+        (function, dependencies) pair of each node name, where `function` takes no argument and `dependencies` is
+        a list of node names
+
+    workers: int
+        Number of threads
+
+    Returns
+    -------
+    results: dict
+        Result of the function of each node
+    timings: dict
+        Duration of each node, in seconds
+    """
+    unknown = {dependency for _, dependencies in nodes.values() for dependency in dependencies}.difference(nodes)
+    if unknown:
+        raise ValueError('Unknown dependencies: {}'.format(', '.join(sorted(unknown))))
+
+    waiting_for = {name: set(dependencies) for name, (_, dependencies) in nodes.items()}
+    dependents = {name: [] for name in nodes}
+    for name, (_, dependencies) in nodes.items():
+        for dependency in set(dependencies):
+            dependents[dependency].append(name)
+
+    results = {}
+    timings = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        running = {}
+
+        def submit_ready():
+            for name in [name for name, waiting in waiting_for.items() if not waiting]:
+                del waiting_for[name]
+                running[executor.submit(timed(nodes[name][0]))] = name
+
+        submit_ready()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name], timings[name] = future.result()
+                except Exception:
+                    for pending in running:
+                        pending.cancel()
+                    raise
+                for dependent in dependents[name]:
+                    waiting_for[dependent].discard(name)
+            submit_ready()
+
+    if waiting_for:
+        raise ValueError('Dependency cycle between: {}'.format(', '.join(sorted(waiting_for))))
+    return results, timings
@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from os.path import basename, dirname, getmtime, getsize, join
+import numpy as np
+import pandas as pd
+
+# Parsed frames are saved in a `.frame_cache` directory next to their CSV file, as one `.npy` file per column
+CACHE_DIR = '.frame_cache'
+CACHE_VERSION = 1
+FRAME_CACHE_ENABLED = True
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def file_hash(path):
+    """ Returns the md5 hex digest of the content of the file at `path`.
+    """
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            md5.update(block)
+    return md5.hexdigest()
+
+
+def file_fingerprint(path):
+    """ Returns the (size, mtime) pair identifying the current version of the file at `path`.
+    """
+    return getsize(path), getmtime(path)
+
+
+def cache_path(path):
+    """ Returns the cache directory of the CSV file at `path`.
+    """
+    return join(dirname(path), CACHE_DIR, basename(path))
+
+
+def _read_meta(cache_dir):
+    try:
+        with open(join(cache_dir, 'meta.json')) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return None
+
+
+def _write_meta(cache_dir, meta):
+    with open(join(cache_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+
+
+def _is_valid(meta, path, read_args):
+    """ Checks that the cache described by `meta` was built from the current version of `path` with `read_args`.
+
+    The size and mtime of the source are compared first. If only the mtime changed (e.g. the run was copied
+    over), the content hash decides and the stored mtime is refreshed on a match.
+    """
+    if meta is None or meta['version'] != CACHE_VERSION or meta['read_args'] != read_args:
+        return False
+    size, mtime = file_fingerprint(path)
+    if size != meta['size']:
+        return False
+    if mtime != meta['mtime']:
+        if file_hash(path) != meta['hash']:
+            return False
+        meta['mtime'] = mtime
+        try:
+            _write_meta(cache_path(path), meta)
+        except IOError:
+            pass
+    return True
+
+
+def _save(df, path, read_args):
+    """ Saves `df` column by column in the cache directory of `path`.
+
+    Numeric and boolean columns are saved as they are. Object (string) and categorical columns are saved as
+    integer codes plus their categories. Frames with any other dtype are not cached.
+    """
+    if isinstance(df.index, pd.RangeIndex) and df.index.name is None:
+        index_names = []
+    else:
+        index_names = list(df.index.names)
+        df = df.reset_index()
+
+    cache_dir = cache_path(path)
+    try:
+        os.makedirs(dirname(cache_dir))
+    except OSError:
+        pass
+    tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=dirname(cache_dir))
+    columns = []
+    for i, column in enumerate(df.columns):
+        values = df[column]
+        if hasattr(values, 'cat'):
+            kind = 'category'
+            np.save(join(tmp_dir, '{}.npy'.format(i)), values.cat.codes.values)
+            np.save(join(tmp_dir, '{}.categories.npy'.format(i)), values.cat.categories.values, allow_pickle=True)
+        elif values.dtype == object:
+            kind = 'object'
+            codes, uniques = pd.factorize(values)
+            np.save(join(tmp_dir, '{}.npy'.format(i)), codes.astype(np.int32))
+            np.save(join(tmp_dir, '{}.categories.npy'.format(i)), np.asarray(uniques, dtype=object), allow_pickle=True)
+        elif values.dtype.kind in 'biuf':
+            kind = 'array'
+            np.save(join(tmp_dir, '{}.npy'.format(i)), values.values)
+        else:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+        columns.append([str(column), kind])
+
+    size, mtime = file_fingerprint(path)
+    _write_meta(tmp_dir, {
+        'version': CACHE_VERSION,
+        'read_args': read_args,
+        'size': size,
+        'mtime': mtime,
+        'hash': file_hash(path),
+        'columns': columns,
+        'index': index_names
+    })
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    try:
+        os.rename(tmp_dir, cache_dir)
+    except OSError:
+        # Another process saved the same frame in the meantime
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _load(meta, cache_dir):
+    """ Loads a cached frame, memory-mapping every column file.
+    """
+    data = {}
+    for i, (column, kind) in enumerate(meta['columns']):
+        values = np.load(join(cache_dir, '{}.npy'.format(i)), mmap_mode='r')
+        if kind == 'array':
+            data[column] = values
+            continue
+        categories = np.load(join(cache_dir, '{}.categories.npy'.format(i)), allow_pickle=True)
+        if kind == 'category':
+            data[column] = pd.Categorical.from_codes(values, categories)
+        else:
+            decoded = categories.take(values) if len(categories) else np.empty(len(values), dtype=object)
+            decoded[values < 0] = np.nan
+            data[column] = decoded
+    df = pd.DataFrame(data, columns=[column for column, kind in meta['columns']])
+    if meta['index']:
+        # The index was saved as the leading columns of the frame
+        df = df.set_index(list(df.columns[:len(meta['index'])]))
+        df.index.names = meta['index']
+    return df
+
+
+def cache_frame(df, path, **kwargs):
+    """ Saves `df`, the frame read from the CSV file at `path` with `kwargs`, in the frame cache unless it is
+    already there, so that the next `read_csv_cached(path, **kwargs)` loads it instead of parsing the CSV file.
+
+    Returns
+    -------
+    cached: bool
+        Whether the frame can now be read from the cache
+    """
+    if not FRAME_CACHE_ENABLED:
+        return False
+
+    read_args = json.loads(json.dumps(kwargs, sort_keys=True))
+    if _is_valid(_read_meta(cache_path(path)), path, read_args):
+        return True
+    try:
+        _save(df, path, read_args)
+    except (IOError, OSError):
+        return False
+    return _is_valid(_read_meta(cache_path(path)), path, read_args)
+
+
+def read_csv_cached(path, **kwargs):
+    """ Drop-in replacement for `pd.read_csv(path, **kwargs)` backed by the columnar on-disk frame cache.
+
+    The first read parses the CSV file and saves the resulting frame next to it. Later reads load the saved
+    columns instead, as long as the CSV file's size and mtime (or content hash) and the read arguments are
+    unchanged.
+
+    Parameters
+    ----------
+    path: str
+        Path of the CSV file
+
+    kwargs:
+        Keyword arguments passed on to `pd.read_csv`, they must be JSON serializable
+
+    Returns
+    -------
+    df: pandas dataframe
+    """
+    if not FRAME_CACHE_ENABLED:
+        return pd.read_csv(path, **kwargs)
+
+    read_args = json.loads(json.dumps(kwargs, sort_keys=True))
+    cache_dir = cache_path(path)
+    meta = _read_meta(cache_dir)
+    if _is_valid(meta, path, read_args):
+        try:
+            return _load(meta, cache_dir)
+        except (IOError, ValueError):
+            pass
+
+    df = pd.read_csv(path, **kwargs)
+    try:
+        _save(df, path, read_args)
+    except (IOError, OSError):
+        # A read-only data directory only costs the caching, not the read
+        pass
+    return df
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+
+def complete_grid(df, keys, fill_value=0.0):
+    """ Completes `df` with a row for every combination of key values it is missing, so that each category appears in
+    the plots even when a submission has no data for it.
+
+    The rows of `df` are kept as they are (in their order, duplicates included) and the missing combinations are
+    appended in the order of the grid. The cost only depends on the number of rows of `df` and on the size of the
+    grid, not on the number of missing rows.
+
+    Parameters
+    ----------
+    df: pandas dataframe
+
+    keys: list of (str, list) pairs
+        Key columns of the grid and the values each one should take, the grid being their cartesian product
+
+    fill_value: scalar or dict
+        Value of the other columns in the added rows, or value of each of these columns
+
+    Returns
+    -------
+    df: pandas dataframe
+    """
+    columns = [column for column, _ in keys]
+    grid = pd.MultiIndex.from_product([values for _, values in keys], names=columns)
+    if len(df):
+        present = pd.MultiIndex.from_arrays([df[column].values for column in columns], names=columns)
+        missing = grid[~grid.isin(present)]
+    else:
+        missing = grid
+    if not len(missing):
+        return df
+
+    added = missing.to_frame(index=False)
+    for column in df.columns.drop(columns):
+        added[column] = fill_value.get(column, np.nan) if isinstance(fill_value, dict) else fill_value
+    return pd.concat([df, added[df.columns]], ignore_index=True, sort=False)
+
+
+def expand_wildcards(df, column, values):
+    """ Replaces each row of `df` whose `column` is missing (NaN, or "nan" once converted to string) by one row per
+    value of `values`, in place of the original row.
+
+    Parameters
+    ----------
+    df: pandas dataframe
+
+    column: str
+        Column holding the wildcards, e.g. the route of the fares applying to all routes
+
+    values: list
+        Values a wildcard stands for
+
+    Returns
+    -------
+    df: pandas dataframe
+        With a fresh range index
+    """
+    wildcards = (df[column].isnull() | (df[column].astype(str) == 'nan')).values
+    counts = np.where(wildcards, len(values), 1)
+    expanded = df.iloc[np.repeat(np.arange(len(df)), counts)].reset_index(drop=True)
+
+    column_values = expanded[column].values.astype(object)
+    column_values[np.repeat(wildcards, counts)] = np.tile(np.asarray(values, dtype=object), wildcards.sum())
+    expanded[column] = column_values
+    return expanded
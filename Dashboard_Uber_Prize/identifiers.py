@@ -0,0 +1,110 @@
+import threading
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_categorical_dtype
+
+# Identifier columns of the input files, and the kind of identifier each one holds (the IdentifierTable of the
+# submission interning it). Columns of the same kind are joined on their codes.
+IDENTIFIER_COLUMNS = {
+    'legs_dataframe.csv': {'Veh': 'vehicle'},
+    'path_traversals_dataframe.csv': {'vehicle': 'vehicle'},
+    'persons_dataframe.csv': {'PID': 'person'},
+    'trips_dataframe.csv': {'PID': 'person', 'Trip_ID': 'trip'}
+}
+IDENTIFIER_KINDS = sorted({kind for columns in IDENTIFIER_COLUMNS.values() for kind in columns.values()})
+
+
+class IdentifierTable():
+
+    def __init__(self):
+        """
+        Dictionary of the identifiers of one kind (person, vehicle or trip ids) of a submission, giving each
+        distinct id a dense integer code in order of first appearance.
+
+        Interned columns are categoricals whose categories are the ids of the table: each id string is stored once
+        for all the frames of the submission, and equal ids have equal codes in every frame, so that frames are
+        joined and grouped on the codes (see `get_indexer`). Ids are only added, never removed or renumbered.
+
+        Returns
+        -------
+        None
+        """
+        self.ids = pd.Index([], dtype=object)
+        self.lock = threading.Lock()
+        # Memory used by the ids, in bytes
+        self.memory = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def intern(self, values):
+        """ Returns the id series `values` (strings or categorical) as a categorical over the ids of the table,
+        adding the new ids to the table. Missing values stay missing.
+        """
+        values = values if is_categorical_dtype(values) else values.astype('category')
+        categories = values.cat.categories
+        with self.lock:
+            codes = self.ids.get_indexer(categories)
+            if (codes < 0).any():
+                new = categories[codes < 0].astype(object)
+                self.ids = self.ids.append(new)
+                self.memory += int(new.memory_usage(deep=True))
+                codes = self.ids.get_indexer(categories)
+            ids = self.ids
+        # The code -1 of the missing values picks the trailing -1
+        codes = np.append(codes, -1).astype(np.int32)[values.cat.codes.values]
+        return pd.Series(pd.Categorical.from_codes(codes, ids), index=values.index, name=values.name)
+
+    def decode(self, codes):
+        '''Returns the ids of `codes` (NaN for -1), for display'''
+        # The code -1 picks the trailing NaN
+        return np.append(self.ids.values, np.nan).astype(object)[np.asarray(codes)]
+
+
+def intern_identifiers(df, input_file, tables):
+    """ Interns the identifier columns of `df`, read from `input_file`, with the IdentifierTable of their kind in
+    `tables` (see IDENTIFIER_COLUMNS). `df` is modified in place and returned.
+    """
+    for column, kind in IDENTIFIER_COLUMNS.get(input_file, {}).items():
+        if column in df.columns:
+            df[column] = tables[kind].intern(df[column])
+    return df
+
+
+def frame_memory_usage(df, input_file):
+    """ Returns the memory used by `df`, read from `input_file`, in bytes. Only the codes of its interned
+    identifier columns are counted, their ids being counted once in their IdentifierTable.
+    """
+    memory = df.memory_usage(index=True, deep=True)
+    for column in IDENTIFIER_COLUMNS.get(input_file, {}):
+        if column in df.columns and is_categorical_dtype(df[column]):
+            memory[column] = df[column].cat.codes.nbytes
+    return int(memory.sum())
+
+
+def get_indexer(keys, values):
+    """ Returns the position in `keys` (unique ids) of each id of `values`, or -1 if it is missing from `keys`, as
+    `pd.Index(keys).get_indexer(values)` does.
+
+    Categorical columns whose categories are the same, or one a prefix of the other (e.g. two columns interned by
+    the same IdentifierTable), are matched on their codes, without hashing the ids again.
+
+    Parameters
+    ----------
+    keys: pandas series
+
+    values: pandas series
+
+    Returns
+    -------
+    positions: np.ndarray
+    """
+    if is_categorical_dtype(keys) and is_categorical_dtype(values):
+        shorter, longer = sorted([keys.cat.categories, values.cat.categories], key=len)
+        if shorter is longer or longer[:len(shorter)].equals(shorter):
+            # One slot per code, plus a last one for the code -1 of missing values
+            positions = np.full(len(longer) + 1, -1, dtype=np.int64)
+            positions[keys.cat.codes.values] = np.arange(len(keys))
+            positions[-1] = -1
+            return positions[values.cat.codes.values]
+    return pd.Index(keys).get_indexer(values)
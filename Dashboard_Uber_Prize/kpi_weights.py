@@ -0,0 +1,156 @@
+from bokeh.layouts import column, row
+from bokeh.models import CustomJS, Slider
+from bokeh.models.widgets import Div
+
+TOTAL_SCORE = 'Submission Score'
+
+# Browser side of the re-weighting, mirroring `reweight` and `ranking_html`: the scores of every shown submission
+# are re-weighted in place from their base scores and the factors of the sliders, then ranked, without any request
+# to the server.
+REWEIGHT_JS = """
+var factors = {};
+for (var i = 0; i < sliders.length; i++) {
+    factors[sliders[i].name] = sliders[i].value;
+}
+var rows = [];
+for (var i = 0; i < sources.length; i++) {
+    var data = sources[i].data;
+    var names = data['Component Name'];
+    var base = data['Base Weighted Score'];
+    var scores = data['Weighted Score'];
+    var total = -1;
+    var base_sum = 0.0;
+    var sum = 0.0;
+    for (var j = 0; j < names.length; j++) {
+        if (names[j] == total_score) {
+            total = j;
+            continue;
+        }
+        var factor = names[j] in factors ? factors[names[j]] : 1.0;
+        scores[j] = base[j] * factor;
+        base_sum += base[j];
+        sum += scores[j];
+    }
+    if (total >= 0) {
+        scores[total] = base_sum != 0 ? base[total] * sum / base_sum : base[total];
+        rows.push([labels[i].value, scores[total]]);
+    }
+    sources[i].change.emit();
+}
+rows.sort(function(a, b) { return b[1] - a[1]; });
+var lines = ['<b>Ranking</b>'];
+for (var i = 0; i < rows.length; i++) {
+    lines.push((i + 1) + '. ' + rows[i][0] + ': ' + rows[i][1].toFixed(3));
+}
+ranking.text = lines.join('<br>');
+"""
+
+
+def reweight(data, factors):
+    """ Returns the scores data of a submission (see `Submission.make_normalized_scores_data`) re-weighted by
+    `factors`.
+
+    Each weighted subscore is its base (submitted) value times the factor of its component (1 if it has none), and
+    the Submission Score its base value times the ratio of the sums of the re-weighted and base subscores, so that
+    factors of 1 give back the submitted scores.
+
+    Parameters
+    ----------
+    data: dict
+        Data of the scores ColumnDataSource, with "Component Name", "Base Weighted Score" and "Weighted Score"
+        columns
+
+    factors: dict
+        Weight factor of each component
+
+    Returns
+    -------
+    data: dict
+    """
+    names = list(data['Component Name'])
+    base = [float(score) for score in data['Base Weighted Score']]
+    scores = [score * factors.get(name, 1.0) for name, score in zip(names, base)]
+    base_sum = sum(score for name, score in zip(names, base) if name != TOTAL_SCORE)
+    scores_sum = sum(score for name, score in zip(names, scores) if name != TOTAL_SCORE)
+    for i, name in enumerate(names):
+        if name == TOTAL_SCORE:
+            scores[i] = base[i] * scores_sum / base_sum if base_sum != 0 else base[i]
+    data = dict(data)
+    data['Weighted Score'] = scores
+    return data
+
+
+def ranking_html(rows):
+    '''Returns the ranking shown by the re-weighting, from the (label, Submission Score) pair of each submission'''
+    rows = sorted(rows, key=lambda label_score: -label_score[1])
+    return '<br>'.join(['<b>Ranking</b>'] + ['{}. {}: {:.3f}'.format(i + 1, label, score)
+                                              for i, (label, score) in enumerate(rows)])
+
+
+class KpiWeights():
+
+    def __init__(self, components, selects, end=3.0, step=0.1):
+        """
+        Sliders re-weighting the score components of the shown submissions in the browser, along with a ranking
+        of the submissions by re-weighted Submission Score.
+
+        Each slider sets a factor applied to the submitted weight of its component (1 keeps the submitted scores).
+        Moving a slider only runs REWEIGHT_JS in the browser. The server applies the current factors with
+        `reweight` to the scores it sends afterwards, when a dropdown changes.
+
+        Parameters
+        ----------
+        components : list of str
+            Score components, the Submission Score being left out of the sliders
+        selects : dict
+            Select widget of each side, labelling its submission in the ranking
+        end : float
+            Largest weight factor
+        step : float
+
+        Returns
+        -------
+        None
+        """
+        self.selects = selects
+        self.sources = {}
+        self.sliders = [Slider(start=0.0, end=end, step=step, value=1.0, title=component, name=component,
+                               width=380)
+                        for component in components if component != TOTAL_SCORE]
+        self.ranking = Div(width=400)
+        self.callback = CustomJS(code=REWEIGHT_JS, args=self.callback_args())
+        for slider in self.sliders:
+            slider.js_on_change('value', self.callback)
+
+    def callback_args(self):
+        sides = sorted(self.sources)
+        return dict(sliders=self.sliders, sources=[self.sources[side] for side in sides],
+                    labels=[self.selects[side] for side in sides], ranking=self.ranking, total_score=TOTAL_SCORE)
+
+    def factors(self):
+        '''Returns the weight factor of each component, as last set in the browser'''
+        return {slider.name: slider.value for slider in self.sliders}
+
+    def reweight(self, data):
+        '''Returns the scores data `data` re-weighted by the current factors'''
+        return reweight(data, self.factors())
+
+    def set_source(self, side, source):
+        '''Re-weights from now on the scores ColumnDataSource `source` of `side`'''
+        self.sources[side] = source
+        self.callback.args = self.callback_args()
+        self.update_ranking()
+
+    def update_ranking(self):
+        '''Ranks the shown submissions by Submission Score, after the scores of one of them were sent'''
+        rows = []
+        for side, source in sorted(self.sources.items()):
+            data = self.reweight(source.data)
+            rows.extend([(self.selects[side].value, score)
+                         for name, score in zip(data['Component Name'], data['Weighted Score'])
+                         if name == TOTAL_SCORE])
+        self.ranking.text = ranking_html(rows)
+
+    def layout(self, columns=3):
+        '''Returns the ranking and the sliders, in `columns` columns'''
+        return column(self.ranking, row(*[column(*self.sliders[i::columns]) for i in range(columns)]))
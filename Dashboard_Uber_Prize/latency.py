@@ -0,0 +1,74 @@
+from bokeh.models import ColumnDataSource, CustomJS
+
+# Browser side of the latency measurement: the time of each dropdown change is recorded when it happens, and the
+# end to end latency is reported once the server has acknowledged the switch (its probe update arrives after all
+# the source updates of the switch) and the browser has painted the updated plots.
+START_JS = """
+window.switch_start = window.switch_start || {};
+window.switch_start[cb_obj.id] = performance.now();
+"""
+
+DONE_JS = """
+var starts = window.switch_start || {};
+var select = cb_obj.data['select'][0];
+var start = starts[select];
+if (start === undefined) {
+    return;
+}
+delete starts[select];
+var value = cb_obj.data['value'][0];
+var server_ms = cb_obj.data['server_ms'][0];
+requestAnimationFrame(function() {
+    setTimeout(function() {
+        report.data = {select: [select], value: [value], server_ms: [server_ms],
+                       total_ms: [performance.now() - start]};
+    }, 0);
+});
+"""
+
+
+def print_latency(select, value, server_seconds, total_seconds):
+    '''Default latency hook, printing the latency of a dropdown change'''
+    print('{} -> {}: {:.0f} ms in the server, {:.0f} ms end to end'.format(
+        select.title, value, 1000 * server_seconds, 1000 * total_seconds))
+
+
+class LatencyProbe():
+
+    def __init__(self, hook=print_latency):
+        """
+        Measures the end to end latency of the dropdown changes of a document, from the change in the browser to
+        the updated plots being painted, along with the time spent in the server callback.
+
+        Call `watch` on each dropdown, and `done` at the end of its `on_change` callback. `hook` is then called with
+        the dropdown, its new value, the server and the end to end latencies in seconds.
+
+        Parameters
+        ----------
+        hook : callable
+
+        Returns
+        -------
+        None
+        """
+        self.hook = hook
+        self.selects = {}
+        self.probe = ColumnDataSource(data=dict(select=[], value=[], server_ms=[]))
+        self.report = ColumnDataSource(data=dict(select=[], value=[], server_ms=[], total_ms=[]))
+        self.probe.js_on_change('data', CustomJS(args=dict(report=self.report), code=DONE_JS))
+        self.report.on_change('data', self.on_report)
+
+    def watch(self, select):
+        '''Starts measuring the latency of the changes of `select` (a Select widget)'''
+        self.selects[select.id] = select
+        select.js_on_change('value', CustomJS(code=START_JS, args=dict(probe=self.probe)))
+
+    def done(self, select, server_seconds):
+        '''Marks the end of the server callback handling a change of `select`, that took `server_seconds`'''
+        self.probe.data = dict(select=[select.id], value=[select.value], server_ms=[1000 * server_seconds])
+
+    def on_report(self, attr, old, new):
+        if not new['select'] or new['select'][0] not in self.selects:
+            return
+        self.hook(self.selects[new['select'][0]], new['value'][0], new['server_ms'][0] / 1000.0,
+                  new['total_ms'][0] / 1000.0)
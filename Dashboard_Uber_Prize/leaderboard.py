@@ -0,0 +1,75 @@
+from bokeh.layouts import column, row
+from bokeh.models import ColumnDataSource
+from bokeh.models.widgets import DataTable, NumberFormatter, Select, TableColumn, TextInput
+
+from kpi_weights import TOTAL_SCORE
+from submission import column_data
+
+ALL_SCENARIOS = 'All scenarios'
+
+
+class Leaderboard():
+
+    def __init__(self, index, categories, width=1200, height=600):
+        """
+        Table of all the submissions ranked by Submission Score, read from a ScoreIndex (so without loading any
+        submission), filtered by scenario and by name. Columns are sorted in the browser by clicking their header.
+
+        Parameters
+        ----------
+        index : ScoreIndex
+        categories : dict
+            Score components of each scenario, shown as columns when the scenario is selected
+        width : int
+        height : int
+
+        Returns
+        -------
+        None
+        """
+        self.index = index
+        self.categories = categories
+        self.scenario_select = Select(title='Scenario', value=ALL_SCENARIOS,
+                                      options=[ALL_SCENARIOS] + sorted(categories))
+        self.search = TextInput(title='Submission name contains', value='')
+        self.source = ColumnDataSource(data={})
+        self.table = DataTable(source=self.source, columns=self.columns(None), width=width, height=height,
+                               index_position=None)
+        self.scenario_select.on_change('value', self.on_filter)
+        self.search.on_change('value', self.on_filter)
+        # Version of the index shown, None until the table is first filled
+        self.version = None
+
+    def columns(self, scenario):
+        '''Returns the table columns: the rank, submission and total score, and the score components of `scenario`'''
+        formatter = NumberFormatter(format='0.000')
+        columns = [TableColumn(field='Rank', title='Rank', width=50),
+                   TableColumn(field='Scenario', title='Scenario', width=80),
+                   TableColumn(field='Submission', title='Submission', width=200),
+                   TableColumn(field=TOTAL_SCORE, title=TOTAL_SCORE, formatter=formatter)]
+        return columns + [TableColumn(field=component, title=component, formatter=formatter)
+                          for component in self.categories.get(scenario, []) if component != TOTAL_SCORE]
+
+    def scenario(self):
+        return None if self.scenario_select.value == ALL_SCENARIOS else self.scenario_select.value
+
+    def refresh(self):
+        '''Shows the submissions of the index matching the filters'''
+        self.version = self.index.version
+        scenario = self.scenario()
+        columns = self.columns(scenario)
+        leaderboard = self.index.frame(scenario, self.search.value.strip())
+        leaderboard = leaderboard.reindex(columns=[table_column.field for table_column in columns])
+        self.table.columns = columns
+        self.source.data = column_data(leaderboard.astype(object).where(leaderboard.notnull(), None))
+
+    def on_filter(self, attr, old, new):
+        self.refresh()
+
+    def poll(self):
+        '''Refreshes the table if it was shown and the index changed since'''
+        if self.version is not None and self.version != self.index.version:
+            self.refresh()
+
+    def layout(self):
+        return column(row(self.scenario_select, self.search), self.table)
@@ -1,11 +1,12 @@
 import pdb
 
-import glob
 import math
+import time
+import traceback
+from functools import partial
 from os import listdir, makedirs
-from os.path import dirname, isdir, join
+from os.path import dirname, join
 import pandas as pd
-import yaml
 
 from bokeh.core.properties import value
 from bokeh.io import curdoc, show, output_file, export_png, export_svgs
@@ -17,12 +18,18 @@ from bokeh.palettes import Dark2, Category10, Category20, Plasma256, YlOrRd
 from bokeh.plotting import figure, show
 from bokeh.transform import dodge, transform
 
-from submission import Submission
+from kpi_weights import KpiWeights
+from latency import LatencyProbe
+from leaderboard import Leaderboard
+from score_index import SCORE_INDEX
+from submission_store import BACKGROUND_EXECUTOR, SUBMISSION_STORE, read_submission_dirs
 
 HOURS = [str(h) for h in range(24)]
 ROUTE_IDS = ['1340', '1341', '1342', '1343', '1344', '1345', '1346', '1347', '1348', '1349', '1350', '1351']
 BUSES_LIST = ['BUS-DEFAULT', 'BUS-SMALL-HD', 'BUS-STD-HD', 'BUS-STD-ART']
 MODES = ['OnDemand_ride', 'car', 'drive_transit', 'walk', 'walk_transit']#, 'mixed_mode']
+# Milliseconds between two checks of the submissions added, removed or changed on disk
+REFRESH_PERIOD_MS = 2000
 
 def plot_normalized_scores(source, sub_key=1, savefig='None'):
     
@@ -811,39 +818,6 @@ def plot_sustainability_25pm_per_mode(source, sub_key=1, savefig='None'):
 
     return p
 
-def find_submissions():
-
-    path = join(dirname(__file__), 'data/submissions/')
-    new_dirs = {'/'.join(f.split('/')[-2:]) for f in glob.glob(join(path, '*/*')) if isdir(f)}
-
-    cols = ['submission_dir', 'show']
-    try:
-        submission_dirs = pd.read_csv(join(dirname(__file__), 'submission_files.csv'))
-    except IOError:
-        submission_dirs = pd.DataFrame(columns=cols)
-
-    old_dirs = set(submission_dirs['submission_dir'])
-
-    removed_dirs = old_dirs.difference(new_dirs)
-    added_dirs = new_dirs.difference(old_dirs)
-
-    added = pd.DataFrame.from_records([(added_dir, 1) for added_dir in added_dirs], columns=cols)
-    submission_dirs = submission_dirs.append(added, ignore_index=True, sort=False)
-    submission_dirs.loc[submission_dirs['submission_dir'].isin(removed_dirs), 'show'] = 0
-
-    submission_dirs.to_csv(join(dirname(__file__), 'submission_files.csv'), index=False)
-
-    if len(removed_dirs):
-        print("Can't find the following submissions, hiding for now:")
-        print('\n'.join(['\t{}'.format(removed_dir) for removed_dir in removed_dirs]))
-
-    if len(added_dirs):
-        print('The following submissions were added:')
-        print('\n'.join(['\t{}'.format(added_dir) for added_dir in added_dirs]))
-
-    return submission_dirs
-
-
 def create_dir_tree(sub_key):
     
     try:
@@ -862,83 +836,237 @@ def create_dir_tree(sub_key):
         pass
 
 
-def update_submission1(attrname, old, new):
+def source_data(data_source, data):
+    '''Returns the data of the ColumnDataSource of `data_source`, the scores being re-weighted by the KPI sliders'''
+    if data_source == 'normalized_scores_data':
+        return kpi_weights.reweight(data)
+    return data
+
+
+def update_source(source, data):
+    """ Replaces the data of a ColumnDataSource. When the columns are the same, they are updated in place, so that
+    their numpy arrays are sent in binary buffers rather than as JSON.
+    """
+    if set(data) == set(source.data):
+        source.data.update(data)
+    else:
+        source.data = data
+
+
+def update_submission(side, new):
+    """ Shows the `new` "scenario/submission" pair on `side` (1 or 2), in the tabs loaded so far. Its data is
+    computed in the background, by a computation shared with the other sessions asking for the same data, and
+    applied in a callback of the next tick of the document.
+    """
+    start = time.time()
     scenario_key, submission_key = new.split('/')
     create_dir_tree(submission_key)
-    submission1_normalized_scores_source.data = submission_dict[scenario_key]['submissions'][submission_key].normalized_scores_data
-    submission1_fleetmix_input_source.data = submission_dict[scenario_key]['submissions'][submission_key].fleetmix_input_data
-    submission1_routesched_input_line_source.data = submission_dict[scenario_key]['submissions'][submission_key].routesched_input_line_data
-    submission1_routesched_input_start_source.data = submission_dict[scenario_key]['submissions'][submission_key].routesched_input_start_data
-    submission1_routesched_input_end_source.data = submission_dict[scenario_key]['submissions'][submission_key].routesched_input_end_data
-    submission1_fares_input_source.data = submission_dict[scenario_key]['submissions'][submission_key].fares_input_data
-    submission1_modeinc_input_source.data = submission_dict[scenario_key]['submissions'][submission_key].modeinc_input_data
-    submission1_mode_planned_pie_chart_source.data = submission_dict[scenario_key]['submissions'][submission_key].mode_planned_pie_chart_data
-    submission1_mode_realized_pie_chart_source.data = submission_dict[scenario_key]['submissions'][submission_key].mode_realized_pie_chart_data
-    submission1_mode_choice_by_time_source.data = submission_dict[scenario_key]['submissions'][submission_key].mode_choice_by_time_data
-    submission1_mode_choice_by_income_group_source.data = submission_dict[scenario_key]['submissions'][submission_key].mode_choice_by_income_group_data
-    submission1_mode_choice_by_age_group_source.data = submission_dict[scenario_key]['submissions'][submission_key].mode_choice_by_age_group_data
-    submission1_mode_choice_by_distance_source.data = submission_dict[scenario_key]['submissions'][submission_key].mode_choice_by_distance_data
-    submission1_congestion_travel_time_by_mode_source.data = submission_dict[scenario_key]['submissions'][submission_key].congestion_travel_time_by_mode_data
-    submission1_congestion_travel_time_per_passenger_trip_source.data = submission_dict[scenario_key]['submissions'][submission_key].congestion_travel_time_per_passenger_trip_data
-    submission1_congestion_miles_traveled_per_mode_source.data = submission_dict[scenario_key]['submissions'][submission_key].congestion_miles_traveled_per_mode_data
-    submission1_congestion_bus_vmt_by_ridership_source.data = submission_dict[scenario_key]['submissions'][submission_key].congestion_bus_vmt_by_ridership_data
-    submission1_congestion_on_demand_vmt_by_phases_source.data = submission_dict[scenario_key]['submissions'][submission_key].congestion_on_demand_vmt_by_phases_data
-    submission1_congestion_travel_speed_source.data = submission_dict[scenario_key]['submissions'][submission_key].congestion_travel_speed_data
-    submission1_los_travel_expenditure_source.data = submission_dict[scenario_key]['submissions'][submission_key].los_travel_expenditure_data
-    submission1_los_crowding_source.data = submission_dict[scenario_key]['submissions'][submission_key].los_crowding_data
-    submission1_transit_cb_costs_source.data = submission_dict[scenario_key]['submissions'][submission_key].transit_cb_costs_data
-    submission1_transit_cb_benefits_source.data = submission_dict[scenario_key]['submissions'][submission_key].transit_cb_benefits_data
-    submission1_transit_inc_by_mode_source.data = submission_dict[scenario_key]['submissions'][submission_key].transit_inc_by_mode_data
-    submission1_sustainability_25pm_per_mode_source.data = submission_dict[scenario_key]['submissions'][submission_key].sustainability_25pm_per_mode_data
+    loading[side] += 1
+    show_status(side)
+    future = SUBMISSION_STORE.submit_data(scenario_key, submission_key, list(sources[side]))
+
+    def post(future):
+        doc.add_next_tick_callback(partial(apply_submission, side, new, start, future))
+    future.add_done_callback(post)
+
+def apply_submission(side, scenario_submission, start, future):
+    loading[side] -= 1
+    if scenario_submission != selects[side].value:
+        # Superseded by a later selection, whose data is applied when ready
+        show_status(side)
+        return
+    try:
+        data = future.result()
+    except Exception:
+        failed[side] = True
+        traceback.print_exc()
+        show_status(side)
+        return
+    # Hold the document changes until all the sources are updated, to apply them as one batch. Sources of the tabs
+    # loaded in the meantime already show the selected submission.
+    curdoc().hold('combine')
+    try:
+        for data_source, source in sources[side].items():
+            if data_source in data:
+                update_source(source, source_data(data_source, data[data_source]))
+        if 'normalized_scores_data' in sources[side]:
+            kpi_weights.update_ranking()
+    finally:
+        curdoc().unhold()
+    failed[side] = False
+    show_status(side)
+    latency_probe.done(selects[side], time.time() - start)
+
+def update_submission1(attrname, old, new):
+    update_submission(1, new)
 
 def update_submission2(attrname, old, new):
-    scenario_key, submission_key = new.split('/')
-    create_dir_tree(submission_key)
-    submission2_normalized_scores_source.data = submission_dict[scenario_key]['submissions'][submission_key].normalized_scores_data
-    submission2_fleetmix_input_source.data = submission_dict[scenario_key]['submissions'][submission_key].fleetmix_input_data
-    submission2_routesched_input_line_source.data = submission_dict[scenario_key]['submissions'][submission_key].routesched_input_line_data
-    submission2_routesched_input_start_source.data = submission_dict[scenario_key]['submissions'][submission_key].routesched_input_start_data
-    submission2_routesched_input_end_source.data = submission_dict[scenario_key]['submissions'][submission_key].routesched_input_end_data
-    submission2_fares_input_source.data = submission_dict[scenario_key]['submissions'][submission_key].fares_input_data
-    submission2_modeinc_input_source.data = submission_dict[scenario_key]['submissions'][submission_key].modeinc_input_data
-    submission2_mode_planned_pie_chart_source.data = submission_dict[scenario_key]['submissions'][submission_key].mode_planned_pie_chart_data
-    submission2_mode_realized_pie_chart_source.data = submission_dict[scenario_key]['submissions'][submission_key].mode_realized_pie_chart_data
-    submission2_mode_choice_by_time_source.data = submission_dict[scenario_key]['submissions'][submission_key].mode_choice_by_time_data
-    submission2_mode_choice_by_income_group_source.data = submission_dict[scenario_key]['submissions'][submission_key].mode_choice_by_income_group_data
-    submission2_mode_choice_by_age_group_source.data = submission_dict[scenario_key]['submissions'][submission_key].mode_choice_by_age_group_data
-    submission2_mode_choice_by_distance_source.data = submission_dict[scenario_key]['submissions'][submission_key].mode_choice_by_distance_data
-    submission2_congestion_travel_time_by_mode_source.data = submission_dict[scenario_key]['submissions'][submission_key].congestion_travel_time_by_mode_data
-    submission2_congestion_travel_time_per_passenger_trip_source.data = submission_dict[scenario_key]['submissions'][submission_key].congestion_travel_time_per_passenger_trip_data
-    submission2_congestion_miles_traveled_per_mode_source.data = submission_dict[scenario_key]['submissions'][submission_key].congestion_miles_traveled_per_mode_data
-    submission2_congestion_bus_vmt_by_ridership_source.data = submission_dict[scenario_key]['submissions'][submission_key].congestion_bus_vmt_by_ridership_data
-    submission2_congestion_on_demand_vmt_by_phases_source.data = submission_dict[scenario_key]['submissions'][submission_key].congestion_on_demand_vmt_by_phases_data
-    submission2_congestion_travel_speed_source.data = submission_dict[scenario_key]['submissions'][submission_key].congestion_travel_speed_data
-    submission2_los_travel_expenditure_source.data = submission_dict[scenario_key]['submissions'][submission_key].los_travel_expenditure_data
-    submission2_los_crowding_source.data = submission_dict[scenario_key]['submissions'][submission_key].los_crowding_data
-    submission2_transit_cb_costs_source.data = submission_dict[scenario_key]['submissions'][submission_key].transit_cb_costs_data
-    submission2_transit_cb_benefits_source.data = submission_dict[scenario_key]['submissions'][submission_key].transit_cb_benefits_data
-    submission2_transit_inc_by_mode_source.data = submission_dict[scenario_key]['submissions'][submission_key].transit_inc_by_mode_data
-    submission2_sustainability_25pm_per_mode_source.data = submission_dict[scenario_key]['submissions'][submission_key].sustainability_25pm_per_mode_data
+    update_submission(2, new)
+
+# Plots of each tab: the plot function, the data source shown by each of its ColumnDataSource arguments, and its
+# other arguments. A tab is only built, and the data sources of its plots computed, when it is first shown.
+TAB_PLOTS = [
+    ("Inputs", [
+        (plot_fleetmix_input, {'source': 'fleetmix_input_data'}, {}),
+        (plot_routesched_input, {'line_source': 'routesched_input_line_data',
+                                 'start_source': 'routesched_input_start_data',
+                                 'end_source': 'routesched_input_end_data'}, {}),
+        (plot_fares_input, {'source': 'fares_input_data'}, {}),
+        (plot_modeinc_input, {'source': 'modeinc_input_data'}, {})
+    ]),
+    ("Scores", [
+        (plot_normalized_scores, {'source': 'normalized_scores_data'}, {})
+    ]),
+    ("Outputs - Mode Choice", [
+        (plot_mode_pie_chart, {'source': 'mode_planned_pie_chart_data'}, {'choice_type': 'planned'}),
+        (plot_mode_pie_chart, {'source': 'mode_realized_pie_chart_data'}, {'choice_type': 'realized'}),
+        (plot_mode_choice_by_time, {'source': 'mode_choice_by_time_data'}, {}),
+        (plot_mode_choice_by_income_group, {'source': 'mode_choice_by_income_group_data'}, {}),
+        (plot_mode_choice_by_age_group, {'source': 'mode_choice_by_age_group_data'}, {}),
+        (plot_mode_choice_by_distance, {'source': 'mode_choice_by_distance_data'}, {})
+    ]),
+    ("Outputs - Level of Service", [
+        (plot_los_travel_expenditure, {'source': 'los_travel_expenditure_data'}, {}),
+        (plot_los_crowding, {'source': 'los_crowding_data'}, {})
+    ]),
+    ("Outputs - Congestion", [
+        (plot_congestion_travel_time_by_mode, {'source': 'congestion_travel_time_by_mode_data'}, {}),
+        (plot_congestion_travel_time_per_passenger_trip,
+         {'source': 'congestion_travel_time_per_passenger_trip_data'}, {}),
+        (plot_congestion_miles_traveled_per_mode, {'source': 'congestion_miles_traveled_per_mode_data'}, {}),
+        (plot_congestion_bus_vmt_by_ridership, {'source': 'congestion_bus_vmt_by_ridership_data'}, {}),
+        (plot_congestion_on_demand_vmt_by_phases, {'source': 'congestion_on_demand_vmt_by_phases_data'}, {}),
+        (plot_congestion_travel_speed, {'source': 'congestion_travel_speed_data'}, {})
+    ]),
+    ("Outputs - Cost/Benefit", [
+        (plot_transit_cb, {'costs_source': 'transit_cb_costs_data', 'benefits_source': 'transit_cb_benefits_data'}, {}),
+        (plot_transit_inc_by_mode, {'source': 'transit_inc_by_mode_data'}, {})
+    ]),
+    ("Outputs - Sustainability", [
+        (plot_sustainability_25pm_per_mode, {'source': 'sustainability_25pm_per_mode_data'}, {})
+    ])
+]
+
+def tab_data_sources(index):
+    '''Returns the data sources shown by the plots of the tab at `index`'''
+    return [data_source for _, data_sources, _ in TAB_PLOTS[index][1] for data_source in data_sources.values()]
+
+def build_plots(side, plots, data, sub_key):
+    """ Returns the figures of `plots` (see TAB_PLOTS) showing `data` (data of each data source) on `side`, with
+    new ColumnDataSources that the dropdown of `side` updates from then on.
+    """
+    figures = []
+    for plot, data_sources, kwargs in plots:
+        plot_sources = {}
+        for argument, data_source in data_sources.items():
+            sources[side][data_source] = ColumnDataSource(data=source_data(data_source, data[data_source]))
+            plot_sources[argument] = sources[side][data_source]
+            if data_source == 'normalized_scores_data':
+                kpi_weights.set_source(side, sources[side][data_source])
+        plot_sources.update(kwargs)
+        figures.append(plot(sub_key=sub_key, **plot_sources))
+    return figures
+
+def show_status(side):
+    '''Shows the loading status of the submission selected on `side` under its dropdown'''
+    if loading[side]:
+        status_divs[side].text = '<i>Loading {}...</i>'.format(selects[side].value)
+    elif failed[side]:
+        status_divs[side].text = '<b>{} failed to load</b>'.format(selects[side].value)
+    else:
+        status_divs[side].text = '{} loaded'.format(selects[side].value)
+
+def load_tab(index, side):
+    """ Computes the data of the tab at `index` for the submission selected on `side` in a background thread, and
+    shows its figures once it is ready.
+    """
+    scenario_submission = selects[side].value
+    scenario_key, submission_key = scenario_submission.split('/')
+    loading[side] += 1
+    show_status(side)
+    future = SUBMISSION_STORE.submit_data(scenario_key, submission_key, tab_data_sources(index))
+
+    def post(future):
+        # The figures are built on the thread of the document, in a callback of its next tick
+        doc.add_next_tick_callback(partial(show_tab, index, side, scenario_submission, future))
+    future.add_done_callback(post)
+
+def show_tab(index, side, scenario_submission, future):
+    loading[side] -= 1
+    if scenario_submission != selects[side].value:
+        # The dropdown changed in the meantime: load the new submission instead
+        load_tab(index, side)
+        return
+    title, plots = TAB_PLOTS[index]
+    try:
+        data = future.result()
+    except Exception:
+        failed[side] = True
+        tab_columns[index][side].children = [Div(text='<b>{} failed to load</b>'.format(scenario_submission))]
+        traceback.print_exc()
+    else:
+        failed[side] = False
+        tab_columns[index][side].children = build_plots(side, plots, data, scenario_submission.split('/')[1])
+    show_status(side)
+
+def show_leaderboard(future):
+    try:
+        future.result()
+    except Exception:
+        # The scores indexed so far are still shown
+        traceback.print_exc()
+    leaderboard.refresh()
+
+def request_tab(attrname, old, new):
+    '''Loads the tab at `new` for both submissions, the first time it is shown'''
+    if new in requested_tabs:
+        return
+    if new == len(TAB_PLOTS):
+        # The leaderboard only reads the score files, through the server-wide score index, brought up to date in a
+        # background thread and shown in a callback of the next tick of the document
+        requested_tabs.add(new)
+        future = BACKGROUND_EXECUTOR.submit(
+            SCORE_INDEX.update, submissions if SUBMISSION_STORE.submissions is None else SUBMISSION_STORE.submissions)
+
+        def post(future):
+            doc.add_next_tick_callback(partial(show_leaderboard, future))
+        future.add_done_callback(post)
+        return
+    requested_tabs.add(new)
+    for side in (1, 2):
+        load_tab(new, side)
+
+def refresh_submissions():
+    """ Updates the dropdown options when submissions were added or removed, and reloads the selected submissions
+    that changed on disk (see watcher.py).
+    """
+    if SUBMISSION_STORE.version != shown['version']:
+        shown['version'] = SUBMISSION_STORE.version
+        for select in selects.values():
+            select.options = sorted(SUBMISSION_STORE.submissions)
+    for side, select in selects.items():
+        generation = (select.value, SUBMISSION_STORE.generation(*select.value.split('/')))
+        if shown[side][0] == generation[0] and shown[side][1] != generation[1] and select.value in select.options:
+            update_submission(side, select.value)
+        shown[side] = generation
+    leaderboard.poll()
 
 title_div = Div(text="<img src='Dashboard_Uber_Prize/static/uber.svg' height='18'><b>Prize Visualization Dashboard</b>", width=800, height=10, style={'font-size': '200%'})
 
-### Instantiate all submission objects and generate data sources ###
-try:
-    submission_dirs = pd.read_csv(join(dirname(__file__), 'submission_files_override.csv'))
-except IOError:
-    submission_dirs = find_submissions()
-submissions = submission_dirs.loc[submission_dirs['show'] == 1, 'submission_dir'].to_list()
+### Register all submissions, they are only loaded from the server-wide store when first selected ###
+submissions = SUBMISSION_STORE.submissions
+if submissions is None:
+    submissions = read_submission_dirs()
 
 submission_dict = {}
 for scenario_submission in submissions:
     scenario, submission = scenario_submission.split('/')
     if scenario not in submission_dict:
         submission_dict[scenario] = {
-            'submissions': {submission: Submission(name=submission, scenario=scenario)},
-            'categories': yaml.safe_load(open(join(dirname(__file__), 'data/submissions', scenario, 'kpis.yaml')))
+            'submissions': [],
+            'categories': SUBMISSION_STORE.get_categories(scenario)
         }
-    else:
-        submission_dict[scenario]['submissions'][submission] = Submission(name=submission, scenario=scenario)
+    submission_dict[scenario]['submissions'].append(submission)
 
 try:
     makedirs("figures")
@@ -956,199 +1084,16 @@ CATEGORIES = submission_dict[scenario_key]['categories']
 if 'warm-start' in submission_dict[scenario_key]['submissions']:
     submission1_key = 'warm-start'
 else:
-    submission1_key = sorted(list(submission_dict[scenario_key]['submissions'].keys()))[0]
+    submission1_key = sorted(submission_dict[scenario_key]['submissions'])[0]
 create_dir_tree(submission1_key)
 
 if 'example_submission' in submission_dict[scenario_key]['submissions']:
     submission2_key = 'example_submission'
 else:
-    submission2_key = sorted(list(submission_dict[scenario_key]['submissions'].keys()))[-1]
+    submission2_key = sorted(submission_dict[scenario_key]['submissions'])[-1]
 create_dir_tree(submission2_key)
-##############################################################
-
-### Convert data sources into ColumnDataSources ###
-submission1_normalized_scores_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission1_key].normalized_scores_data)
-submission1_fleetmix_input_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission1_key].fleetmix_input_data)
-submission1_routesched_input_line_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission1_key].routesched_input_line_data)
-submission1_routesched_input_start_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission1_key].routesched_input_start_data)
-submission1_routesched_input_end_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission1_key].routesched_input_end_data)
-submission1_fares_input_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission1_key].fares_input_data)
-submission1_modeinc_input_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission1_key].modeinc_input_data)
-submission1_mode_planned_pie_chart_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission1_key].mode_planned_pie_chart_data)
-submission1_mode_realized_pie_chart_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission1_key].mode_realized_pie_chart_data)
-submission1_mode_choice_by_time_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission1_key].mode_choice_by_time_data)
-submission1_mode_choice_by_income_group_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission1_key].mode_choice_by_income_group_data)
-submission1_mode_choice_by_age_group_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission1_key].mode_choice_by_age_group_data)
-submission1_mode_choice_by_distance_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission1_key].mode_choice_by_distance_data)
-submission1_congestion_travel_time_by_mode_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission1_key].congestion_travel_time_by_mode_data)
-submission1_congestion_travel_time_per_passenger_trip_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission1_key].congestion_travel_time_per_passenger_trip_data)
-submission1_congestion_miles_traveled_per_mode_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission1_key].congestion_miles_traveled_per_mode_data)
-submission1_congestion_bus_vmt_by_ridership_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission1_key].congestion_bus_vmt_by_ridership_data)
-submission1_congestion_on_demand_vmt_by_phases_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission1_key].congestion_on_demand_vmt_by_phases_data)
-submission1_congestion_travel_speed_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission1_key].congestion_travel_speed_data)
-submission1_los_travel_expenditure_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission1_key].los_travel_expenditure_data)
-submission1_los_crowding_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission1_key].los_crowding_data)
-submission1_transit_cb_costs_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission1_key].transit_cb_costs_data)
-submission1_transit_cb_benefits_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission1_key].transit_cb_benefits_data)
-submission1_transit_inc_by_mode_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission1_key].transit_inc_by_mode_data)
-submission1_sustainability_25pm_per_mode_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission1_key].sustainability_25pm_per_mode_data)
-
-submission2_normalized_scores_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission2_key].normalized_scores_data)
-submission2_fleetmix_input_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission2_key].fleetmix_input_data)
-submission2_routesched_input_line_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission2_key].routesched_input_line_data)
-submission2_routesched_input_start_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission2_key].routesched_input_start_data)
-submission2_routesched_input_end_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission2_key].routesched_input_end_data)
-submission2_fares_input_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission2_key].fares_input_data)
-submission2_modeinc_input_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission2_key].modeinc_input_data)
-submission2_mode_planned_pie_chart_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission2_key].mode_planned_pie_chart_data)
-submission2_mode_realized_pie_chart_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission2_key].mode_realized_pie_chart_data)
-submission2_mode_choice_by_time_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission2_key].mode_choice_by_time_data)
-submission2_mode_choice_by_income_group_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission2_key].mode_choice_by_income_group_data)
-submission2_mode_choice_by_age_group_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission2_key].mode_choice_by_age_group_data)
-submission2_mode_choice_by_distance_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission2_key].mode_choice_by_distance_data)
-submission2_congestion_travel_time_by_mode_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission2_key].congestion_travel_time_by_mode_data)
-submission2_congestion_travel_time_per_passenger_trip_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission2_key].congestion_travel_time_per_passenger_trip_data)
-submission2_congestion_miles_traveled_per_mode_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission2_key].congestion_miles_traveled_per_mode_data)
-submission2_congestion_bus_vmt_by_ridership_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission2_key].congestion_bus_vmt_by_ridership_data)
-submission2_congestion_on_demand_vmt_by_phases_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission2_key].congestion_on_demand_vmt_by_phases_data)
-submission2_congestion_travel_speed_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission2_key].congestion_travel_speed_data)
-submission2_los_travel_expenditure_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission2_key].los_travel_expenditure_data)
-submission2_los_crowding_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission2_key].los_crowding_data)
-submission2_transit_cb_costs_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission2_key].transit_cb_costs_data)
-submission2_transit_cb_benefits_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission2_key].transit_cb_benefits_data)
-submission2_transit_inc_by_mode_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission2_key].transit_inc_by_mode_data)
-submission2_sustainability_25pm_per_mode_source = ColumnDataSource(data=submission_dict[scenario_key]['submissions'][submission2_key].sustainability_25pm_per_mode_data)
-###################################################
-
-### Generate plots from ColumnDataSource's ###
-normalized_scores_1_plot = plot_normalized_scores(source=submission1_normalized_scores_source, sub_key=submission1_key)
-fleetmix_input_1_plot = plot_fleetmix_input(source=submission1_fleetmix_input_source, sub_key=submission1_key)
-routesched_input_1_plot = plot_routesched_input(
-    line_source=submission1_routesched_input_line_source, 
-    start_source=submission1_routesched_input_start_source,
-    end_source=submission1_routesched_input_end_source, sub_key=submission1_key)
-fares_input_1_plot = plot_fares_input(source=submission1_fares_input_source, sub_key=submission1_key)
-modeinc_input_1_plot = plot_modeinc_input(source=submission1_modeinc_input_source, sub_key=submission1_key)
-mode_planned_pie_chart_1_plot = plot_mode_pie_chart(source=submission1_mode_planned_pie_chart_source, choice_type='planned', sub_key=submission1_key)
-mode_realized_pie_chart_1_plot = plot_mode_pie_chart(source=submission1_mode_realized_pie_chart_source, choice_type='realized', sub_key=submission1_key)
-mode_choice_by_time_1_plot = plot_mode_choice_by_time(source=submission1_mode_choice_by_time_source, sub_key=submission1_key)
-mode_choice_by_income_group_1_plot = plot_mode_choice_by_income_group(source=submission1_mode_choice_by_income_group_source, sub_key=submission1_key)
-mode_choice_by_age_group_1_plot = plot_mode_choice_by_age_group(source=submission1_mode_choice_by_age_group_source, sub_key=submission1_key)
-mode_choice_by_distance_1_plot = plot_mode_choice_by_distance(source=submission1_mode_choice_by_distance_source, sub_key=submission1_key)
-congestion_travel_time_by_mode_1_plot = plot_congestion_travel_time_by_mode(source=submission1_congestion_travel_time_by_mode_source, sub_key=submission1_key)
-congestion_travel_time_per_passenger_trip_1_plot = plot_congestion_travel_time_per_passenger_trip(source=submission1_congestion_travel_time_per_passenger_trip_source, sub_key=submission1_key)
-congestion_miles_traveled_per_mode_1_plot = plot_congestion_miles_traveled_per_mode(source=submission1_congestion_miles_traveled_per_mode_source, sub_key=submission1_key)
-congestion_bus_vmt_by_ridership_1_plot = plot_congestion_bus_vmt_by_ridership(source=submission1_congestion_bus_vmt_by_ridership_source, sub_key=submission1_key)
-congestion_on_demand_vmt_by_phases_1_plot = plot_congestion_on_demand_vmt_by_phases(source=submission1_congestion_on_demand_vmt_by_phases_source, sub_key=submission1_key)
-congestion_travel_speed_1_plot = plot_congestion_travel_speed(source=submission1_congestion_travel_speed_source, sub_key=submission1_key)
-los_travel_expenditure_1_plot = plot_los_travel_expenditure(source=submission1_los_travel_expenditure_source, sub_key=submission1_key)
-los_crowding_1_plot = plot_los_crowding(source=submission1_los_crowding_source, sub_key=submission1_key)
-transit_cb_1_plot = plot_transit_cb(costs_source=submission1_transit_cb_costs_source, benefits_source=submission1_transit_cb_benefits_source, sub_key=submission1_key)
-transit_inc_by_mode_1_plot = plot_transit_inc_by_mode(source=submission1_transit_inc_by_mode_source, sub_key=submission1_key)
-sustainability_25pm_per_mode_1_plot = plot_sustainability_25pm_per_mode(source=submission1_sustainability_25pm_per_mode_source, sub_key=submission1_key)
-
-normalized_scores_2_plot = plot_normalized_scores(source=submission2_normalized_scores_source, sub_key=submission2_key)
-fleetmix_input_2_plot = plot_fleetmix_input(source=submission2_fleetmix_input_source, sub_key=submission2_key)
-routesched_input_2_plot = plot_routesched_input(
-    line_source=submission2_routesched_input_line_source, 
-    start_source=submission2_routesched_input_start_source,
-    end_source=submission2_routesched_input_end_source, sub_key=submission2_key)
-fares_input_2_plot = plot_fares_input(source=submission2_fares_input_source, sub_key=submission2_key)
-modeinc_input_2_plot = plot_modeinc_input(source=submission2_modeinc_input_source, sub_key=submission2_key)
-mode_planned_pie_chart_2_plot = plot_mode_pie_chart(source=submission2_mode_planned_pie_chart_source, choice_type='planned', sub_key=submission2_key)
-mode_realized_pie_chart_2_plot = plot_mode_pie_chart(source=submission2_mode_realized_pie_chart_source, choice_type='realized', sub_key=submission2_key)
-mode_choice_by_time_2_plot = plot_mode_choice_by_time(source=submission2_mode_choice_by_time_source, sub_key=submission2_key)
-mode_choice_by_income_group_2_plot = plot_mode_choice_by_income_group(source=submission2_mode_choice_by_income_group_source, sub_key=submission2_key)
-mode_choice_by_age_group_2_plot = plot_mode_choice_by_age_group(source=submission2_mode_choice_by_age_group_source, sub_key=submission2_key)
-mode_choice_by_distance_2_plot = plot_mode_choice_by_distance(source=submission2_mode_choice_by_distance_source, sub_key=submission2_key)
-congestion_travel_time_by_mode_2_plot = plot_congestion_travel_time_by_mode(source=submission2_congestion_travel_time_by_mode_source, sub_key=submission2_key)
-congestion_travel_time_per_passenger_trip_2_plot = plot_congestion_travel_time_per_passenger_trip(source=submission2_congestion_travel_time_per_passenger_trip_source, sub_key=submission2_key)
-congestion_miles_traveled_per_mode_2_plot = plot_congestion_miles_traveled_per_mode(source=submission2_congestion_miles_traveled_per_mode_source, sub_key=submission2_key)
-congestion_bus_vmt_by_ridership_2_plot = plot_congestion_bus_vmt_by_ridership(source=submission2_congestion_bus_vmt_by_ridership_source, sub_key=submission2_key)
-congestion_on_demand_vmt_by_phases_2_plot = plot_congestion_on_demand_vmt_by_phases(source=submission2_congestion_on_demand_vmt_by_phases_source, sub_key=submission2_key)
-congestion_travel_speed_2_plot = plot_congestion_travel_speed(source=submission2_congestion_travel_speed_source, sub_key=submission2_key)
-los_travel_expenditure_2_plot = plot_los_travel_expenditure(source=submission2_los_travel_expenditure_source, sub_key=submission2_key)
-los_crowding_2_plot = plot_los_crowding(source=submission2_los_crowding_source, sub_key=submission2_key)
-transit_cb_2_plot = plot_transit_cb(costs_source=submission2_transit_cb_costs_source, benefits_source=submission2_transit_cb_benefits_source, sub_key=submission2_key)
-transit_inc_by_mode_2_plot = plot_transit_inc_by_mode(source=submission2_transit_inc_by_mode_source, sub_key=submission2_key)
-sustainability_25pm_per_mode_2_plot = plot_sustainability_25pm_per_mode(source=submission2_sustainability_25pm_per_mode_source, sub_key=submission2_key)
-##############################################
-
-### Gather plot objects into lists ###
-submission1_inputs_plots = [
-    fleetmix_input_1_plot,
-    routesched_input_1_plot,
-    fares_input_1_plot,
-    modeinc_input_1_plot
-]
-submission1_scores_plots = [normalized_scores_1_plot]
-submission1_outputs_mode_plots = [
-    mode_planned_pie_chart_1_plot,
-    mode_realized_pie_chart_1_plot,
-    mode_choice_by_time_1_plot,
-    mode_choice_by_income_group_1_plot,
-    mode_choice_by_age_group_1_plot,
-    mode_choice_by_distance_1_plot
-]
-submission1_outputs_congestion_plots = [
-    congestion_travel_time_by_mode_1_plot,
-    congestion_travel_time_per_passenger_trip_1_plot,
-    congestion_miles_traveled_per_mode_1_plot,
-    congestion_bus_vmt_by_ridership_1_plot,
-    congestion_on_demand_vmt_by_phases_1_plot,
-    congestion_travel_speed_1_plot
-]
-submission1_outputs_los_plots = [
-    los_travel_expenditure_1_plot,
-    los_crowding_1_plot
-]
-submission1_outputs_transitcb_plots = [
-    transit_cb_1_plot,
-    transit_inc_by_mode_1_plot
-]
-submission1_outputs_sustainability_plots = [sustainability_25pm_per_mode_1_plot]
-
-submission2_inputs_plots = [
-    fleetmix_input_2_plot,
-    routesched_input_2_plot,
-    fares_input_2_plot,
-    modeinc_input_2_plot
-]
-submission2_scores_plots = [normalized_scores_2_plot]
-submission2_outputs_mode_plots = [
-    mode_planned_pie_chart_2_plot,
-    mode_realized_pie_chart_2_plot,
-    mode_choice_by_time_2_plot,
-    mode_choice_by_income_group_2_plot,
-    mode_choice_by_age_group_2_plot,
-    mode_choice_by_distance_2_plot
-]
-submission2_outputs_congestion_plots = [
-    congestion_travel_time_by_mode_2_plot,
-    congestion_travel_time_per_passenger_trip_2_plot,
-    congestion_miles_traveled_per_mode_2_plot,
-    congestion_bus_vmt_by_ridership_2_plot,
-    congestion_on_demand_vmt_by_phases_2_plot,
-    congestion_travel_speed_2_plot
-]
-submission2_outputs_los_plots = [
-    los_travel_expenditure_2_plot,
-    los_crowding_2_plot
-]
-submission2_outputs_transitcb_plots = [
-    transit_cb_2_plot,
-    transit_inc_by_mode_2_plot
-]
-submission2_outputs_sustainability_plots = [sustainability_25pm_per_mode_2_plot]
-######################################
 
-inputs_plots = row(column(submission1_inputs_plots), column(submission2_inputs_plots))
-scores_plots = column(column(submission1_scores_plots), column(submission2_scores_plots))
-outputs_mode_plots = row(column(submission1_outputs_mode_plots), column(submission2_outputs_mode_plots))
-outputs_los_plots = row(column(submission1_outputs_los_plots), column(submission2_outputs_los_plots))
-outputs_congestion_plots = row(column(submission1_outputs_congestion_plots), column(submission2_outputs_congestion_plots))
-outputs_transitcb_plots = row(column(submission1_outputs_transitcb_plots), column(submission2_outputs_transitcb_plots))
-outputs_sustainability_plots = row(column(submission1_outputs_sustainability_plots), column(submission2_outputs_sustainability_plots))
+##############################################################
 
 submission1_select = Select(value='{}/{}'.format(scenario_key, submission1_key),
                      title='Submission 1', 
@@ -1156,38 +1101,56 @@ submission1_select = Select(value='{}/{}'.format(scenario_key, submission1_key),
 submission2_select = Select(value='{}/{}'.format(scenario_key, submission2_key),
                      title='Submission 2', 
                      options=sorted(submissions))
+selects = {1: submission1_select, 2: submission2_select}
 
 pulldowns = row(submission1_select, submission2_select)
 
+# Reports the end to end latency of the dropdown changes (see latency.py)
+latency_probe = LatencyProbe()
+latency_probe.watch(submission1_select)
+latency_probe.watch(submission2_select)
+
+# Re-weights the scores of both submissions in the browser (see kpi_weights.py)
+kpi_weights = KpiWeights(CATEGORIES, selects)
+
 submission1_select.on_change('value', update_submission1)
 submission2_select.on_change('value', update_submission2)
 
-inputs = layout([inputs_plots], sizing_mode='fixed')
-scores = layout([[scores_plots]], sizing_mode='fixed')
-outputs_mode = layout([outputs_mode_plots], sizing_mode='fixed')
-outputs_los = layout([outputs_los_plots], sizing_mode='fixed')
-outputs_congestion = layout([outputs_congestion_plots], sizing_mode='fixed')
-outputs_transitcb = layout([outputs_transitcb_plots], sizing_mode='fixed')
-outputs_sustainability = layout([outputs_sustainability_plots], sizing_mode='fixed')
-
-inputs_tab = Panel(child=inputs,title="Inputs")
-scores_tab = Panel(child=scores,title="Scores")
-outputs_mode_tab = Panel(child=outputs_mode,title="Outputs - Mode Choice")
-outputs_los_tab = Panel(child=outputs_los,title="Outputs - Level of Service")
-outputs_congestion_tab = Panel(child=outputs_congestion,title="Outputs - Congestion")
-outputs_transitcb_tab = Panel(child=outputs_transitcb,title="Outputs - Cost/Benefit")
-outputs_sustainability_tab = Panel(child=outputs_sustainability,title="Outputs - Sustainability")
-
-tabs=[
-    inputs_tab, 
-    scores_tab, 
-    outputs_mode_tab, 
-    outputs_los_tab, 
-    outputs_congestion_tab, 
-    outputs_transitcb_tab, 
-    outputs_sustainability_tab
-]
-tabs = Tabs(tabs=tabs, width=1200)
-
-curdoc().add_root(column([title_div, pulldowns, tabs]))
-curdoc().title = "UberPrize Dashboard"
\ No newline at end of file
+### Tabs, filled in the background when first shown (starting with the Inputs tab) ###
+doc = curdoc()
+# ColumnDataSource of each data source of the loaded tabs, by side
+sources = {1: {}, 2: {}}
+requested_tabs = set()
+loading = {1: 0, 2: 0}
+failed = {1: False, 2: False}
+status_divs = {1: Div(width=400), 2: Div(width=400)}
+
+# Figures of each submission in each tab, in place of a placeholder until their data is ready
+tab_columns = []
+panels = []
+for title, _ in TAB_PLOTS:
+    columns = {side: column(Div(text='<i>Loading...</i>', width=600)) for side in (1, 2)}
+    if title == "Scores":
+        child = layout([[column(columns[1], columns[2], kpi_weights.layout())]], sizing_mode='fixed')
+    else:
+        child = layout([row(columns[1], columns[2])], sizing_mode='fixed')
+    tab_columns.append(columns)
+    panels.append(Panel(child=child, title=title))
+
+# Ranking of all the submissions, from their score files only (see score_index.py)
+leaderboard = Leaderboard(SCORE_INDEX, {scenario: submission_dict[scenario]['categories']
+                                        for scenario in submission_dict})
+panels.append(Panel(child=leaderboard.layout(), title="Leaderboard"))
+
+tabs = Tabs(tabs=panels, width=1200)
+tabs.on_change('active', request_tab)
+request_tab('active', None, tabs.active)
+
+# Version of the submission list and generation of each selected submission shown by the session
+shown = {side: (select.value, SUBMISSION_STORE.generation(*select.value.split('/'))) for side, select in selects.items()}
+shown['version'] = SUBMISSION_STORE.version
+doc.add_periodic_callback(refresh_submissions, REFRESH_PERIOD_MS)
+
+statuses = row(status_divs[1], status_divs[2])
+curdoc().add_root(column([title_div, pulldowns, statuses, tabs]))
+curdoc().title = "UberPrize Dashboard"
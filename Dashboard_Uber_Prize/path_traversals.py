@@ -0,0 +1,205 @@
+import numpy as np
+import pandas as pd
+
+from schemas import SCHEMAS, read_input
+
+PATHS_FILE = 'path_traversals_dataframe.csv'
+TRANSIT_SCALE_FACTOR = 0.1
+
+# Departure time bins of the hourly plots, and of the service periods of the crowding plot
+# (AM peak = 7am-10am, PM Peak = 5pm-8pm, Early Morning, Midday, Late Evening = in between)
+HOUR_EDGES = range(0, 25 * 3600, 3600)
+SERVICE_PERIOD_EDGES = [0, 25200, 36000, 61200, 72000, 86400]
+SERVICE_PERIODS = ["Early Morning (12a-7a)", "AM Peak (7a-10a)", "Midday (10a-5p)", "PM Peak (5p-8p)",
+                   "Late Evening (8p-12a)"]
+
+# Ridership bins of the bus VMT plot, in percent of the seating capacity up to 100% and of the standing room
+# capacity above
+RIDERSHIP_EDGES = [0, 0.01, 50, 100, 150.0, 200.0]
+RIDERSHIP_BINS = [
+    'empty\n(0 passengers)',
+    'low ridership\n(< 50% seating capacity)',
+    'medium ridership\n(< seating capacity)',
+    'high ridership\n(< 50% standing capacity)',
+    'crowded\n(<= standing capacity)'
+]
+
+
+def read_path_traversals(path, chunksize=None):
+    """ Yields the path traversals file at `path` as frames of at most `chunksize` rows, or as a single frame (read
+    through the frame cache) if `chunksize` is None.
+    """
+    if chunksize is None:
+        yield read_input(path, PATHS_FILE)
+    else:
+        for chunk in pd.read_csv(path, chunksize=chunksize, **SCHEMAS[PATHS_FILE]):
+            yield chunk
+
+
+def ridership_vmt_histogram(paths, reference, ridership_edges=RIDERSHIP_EDGES, time_bin=3600):
+    """ Computes the total length of the bus path traversals by departure time and ridership.
+
+    The ridership of a traversal is its number of passengers in percent of the seating capacity of its vehicle
+    type, plus the passengers above the seating capacity in percent of the standing room capacity. Departure times
+    and riderships fall in right-closed bins, the first one including its lower edge.
+
+    Parameters
+    ----------
+    paths: pandas dataframe
+        Bus path traversals, with "vehicleType", "numPassengers", "departureTime" and "length" columns
+
+    reference: ReferenceData
+        Capacities of each vehicle type
+
+    ridership_edges: list of float
+        Edges of the ridership bins, in percent
+
+    time_bin: int
+        Duration of the departure time bins over the day, in seconds
+
+    Returns
+    -------
+    histogram: np.ndarray
+        Array of shape (number of time bins, number of ridership bins)
+    """
+    vehicle_types = reference.vehicle_type_codes(paths['vehicleType'])
+    seating = np.append(reference.seating_capacity, np.nan)[vehicle_types]
+    standing = np.append(reference.standing_room_capacity, np.nan)[vehicle_types]
+    passengers = paths['numPassengers'].values.astype(float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ridership = np.where(passengers > seating,
+                             100.0 + (passengers - seating) * 100.0 / standing,
+                             passengers * 100.0 / seating)
+
+    time_edges = np.arange(0, 24 * 3600 + time_bin, time_bin)
+    ridership_edges = np.asarray(ridership_edges, dtype=float)
+    n_times = len(time_edges) - 1
+    n_riderships = len(ridership_edges) - 1
+    times = np.searchsorted(time_edges, paths['departureTime'].values, side='left') - 1
+    times[paths['departureTime'].values == time_edges[0]] = 0
+    riderships = np.searchsorted(ridership_edges, ridership, side='left') - 1
+    riderships[ridership == ridership_edges[0]] = 0
+
+    valid = (times >= 0) & (times < n_times) & (riderships >= 0) & (riderships < n_riderships)
+    histogram = np.bincount(times[valid] * n_riderships + riderships[valid],
+                            weights=paths['length'].values[valid].astype(float), minlength=n_times * n_riderships)
+    return histogram.reshape(n_times, n_riderships)
+
+
+def group_sum(df, by, columns):
+    '''Returns the sums of `columns` of `df` grouped by `by`, with the (non categorical) group keys as columns'''
+    grouped = df.groupby(by, observed=True)[columns].sum().reset_index()
+    for key in by:
+        if hasattr(grouped[key], 'cat'):
+            grouped.loc[:, key] = grouped[key].astype(object)
+    return grouped
+
+
+def fold(total, partial, by):
+    '''Adds the group sums of `partial` to the ones of `total` (both returned by `group_sum`)'''
+    if total is None:
+        return partial
+    return pd.concat([total, partial], ignore_index=True, sort=False).groupby(by, as_index=False).sum()
+
+
+class PathTraversalAggregator():
+
+    def __init__(self, reference, route_index):
+        """
+        Partial aggregates of the path traversals needed by the congestion, level of service, transit and
+        sustainability plots, updated one chunk of path traversals at a time. Their size only depends on the number
+        of hours, routes, vehicle types and passenger counts, not on the number of path traversals.
+
+        Parameters
+        ----------
+        reference : ReferenceData
+        route_index : RouteIndex
+
+        Returns
+        -------
+        None
+        """
+        self.reference = reference
+        self.route_index = route_index
+
+        # Total length (in meters) of the walk, bus and on-demand path traversals
+        self.walk_length = 0.0
+        self.bus_length = 0.0
+        self.on_demand_length = 0.0
+        # Bus length by departure hour and ridership bin
+        self.bus_vmt = np.zeros((len(HOUR_EDGES) - 1, len(RIDERSHIP_EDGES) - 1))
+        # On-demand length by departure hour and number of passengers (0 or 1)
+        self.on_demand_vmt = None
+        # Service time of the buses carrying more passengers than their seats, by route and service period
+        self.crowding = None
+        # Operational and fuel costs of the bus path traversals, by route
+        self.bus_costs = None
+
+    def update(self, paths):
+        """ Adds a chunk of path traversals to the aggregates.
+        """
+        length = paths['length'].astype(float)
+        is_bus = (paths['mode'] == 'bus').values
+        is_on_demand = paths['vehicle'].str.contains('rideHailVehicle', na=False).values
+        self.walk_length += length[(paths['mode'] == 'walk').values].sum()
+        self.bus_length += length[is_bus].sum()
+        self.on_demand_length += length[is_on_demand].sum()
+
+        bus = paths[is_bus]
+        self.bus_vmt += ridership_vmt_histogram(bus, self.reference)
+
+        on_demand = paths[is_on_demand]
+        on_demand_vmt = pd.DataFrame({
+            'Hour': pd.cut(on_demand['departureTime'], bins=HOUR_EDGES, labels=False, right=False),
+            'drivingState': pd.cut(on_demand['numPassengers'], bins=[0, 1, 2], labels=False, right=False),
+            'length': length[is_on_demand]})
+        self.on_demand_vmt = fold(self.on_demand_vmt, group_sum(on_demand_vmt, ['Hour', 'drivingState'], ['length']),
+                                  ['Hour', 'drivingState'])
+
+        # Bus path traversals of unknown trips are left out of the route aggregates
+        route_codes = self.route_index.codes(bus['vehicle'])
+        routed = route_codes >= 0
+        route_ids = self.route_index.route_ids.take(route_codes[routed])
+        bus = bus[routed]
+
+        service_time = ((bus['arrivalTime'] - bus['departureTime']) / 3600).values
+        vehicle_types = self.reference.vehicle_type_codes(bus['vehicleType'])
+        seating_capacity = TRANSIT_SCALE_FACTOR * np.append(self.reference.seating_capacity, np.nan)[vehicle_types]
+        overflow = bus['numPassengers'].values > seating_capacity
+        crowding = pd.DataFrame({
+            'route_id': route_ids[overflow],
+            'servicePeriod': pd.cut(bus['departureTime'].values[overflow], bins=SERVICE_PERIOD_EDGES, labels=False),
+            'serviceTime': service_time[overflow]})
+        self.crowding = fold(self.crowding, group_sum(crowding, ['route_id', 'servicePeriod'], ['serviceTime']),
+                             ['route_id', 'servicePeriod'])
+
+        bus_costs = pd.DataFrame({
+            'route_id': route_ids,
+            'OperationalCosts': np.append(self.reference.operational_cost, np.nan)[vehicle_types] * service_time,
+            'FuelCost': bus['FuelCost'].values.astype(float)})
+        self.bus_costs = fold(self.bus_costs, group_sum(bus_costs, ['route_id'], ['OperationalCosts', 'FuelCost']),
+                              ['route_id'])
+
+
+def aggregate_path_traversals(chunks, reference, route_index):
+    """ Streams `chunks` of path traversals through a PathTraversalAggregator, in a single pass.
+
+    Parameters
+    ----------
+    chunks: iterable of pandas dataframe
+        Path traversals, e.g. from `read_path_traversals`
+
+    reference: ReferenceData
+        Vehicle types of the submission
+
+    route_index: RouteIndex
+        Route of the bus vehicle ids
+
+    Returns
+    -------
+    aggregator: PathTraversalAggregator
+    """
+    aggregator = PathTraversalAggregator(reference, route_index)
+    for chunk in chunks:
+        aggregator.update(chunk)
+    return aggregator
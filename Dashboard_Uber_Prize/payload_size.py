@@ -0,0 +1,85 @@
+"""Measure the size of the dashboard document and of the submission switch updates, tab by tab.
+
+Usage:
+    python Dashboard_Uber_Prize/payload_size.py scenario/submission1 scenario/submission2
+
+For each tab, prints the size of the document holding the ColumnDataSources of the first submission, and of the
+PATCH-DOC message sent when they switch to the second one. Both are measured with the data sources as JSON lists
+(before `column_data`) and as they are built now, with numeric columns as numpy arrays sent in binary form.
+"""
+import argparse
+import sys
+import numpy as np
+
+from bokeh.document import Document
+from bokeh.models import ColumnDataSource
+from bokeh.protocol import Protocol
+
+from submission import TAB_DATA_SOURCES
+from submission_store import load_submission
+
+
+def as_lists(data):
+    '''Returns the data of a ColumnDataSource with all its columns as lists'''
+    return {name: values if isinstance(values, list) else np.asarray(values).tolist() for name, values in data.items()}
+
+
+def message_size(message):
+    '''Returns the number of bytes of a protocol message, with its buffers'''
+    size = len(message.header_json) + len(message.metadata_json) + len(message.content_json)
+    for header, payload in message.buffers:
+        size += len(header) if isinstance(header, (bytes, str)) else len(str(header))
+        size += len(payload)
+    return size
+
+
+def measure(datas1, datas2):
+    """ Returns the size of the document holding ColumnDataSources of `datas1`, and of the PATCH-DOC message
+    replacing their data with `datas2`, in bytes.
+    """
+    document = Document()
+    sources = [ColumnDataSource(data=data) for data in datas1]
+    for source in sources:
+        document.add_root(source)
+    document_size = len(document.to_json_string())
+
+    events = []
+
+    def record(event):
+        events.append(event)
+    document.on_change(record)
+    for source, data in zip(sources, datas2):
+        if set(data) == set(source.data):
+            source.data.update(data)
+        else:
+            source.data = data
+    patch_size = message_size(Protocol("1.0").create('PATCH-DOC', events))
+    return document_size, patch_size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure the document and update sizes of each dashboard tab.')
+    parser.add_argument('submission1', help='"scenario/submission" pair shown first')
+    parser.add_argument('submission2', help='"scenario/submission" pair switched to')
+    args = parser.parse_args(argv)
+
+    submission1 = load_submission(*args.submission1.split('/'))
+    submission2 = load_submission(*args.submission2.split('/'))
+
+    line = '{:<30} {:>12} {:>12} {:>12} {:>12}'
+    print(line.format('Tab', 'doc (lists)', 'doc (numpy)', 'patch (lists)', 'patch (numpy)'))
+    totals = np.zeros(4, dtype=int)
+    for tab, data_sources in TAB_DATA_SOURCES:
+        datas1 = [getattr(submission1, data_source) for data_source in data_sources]
+        datas2 = [getattr(submission2, data_source) for data_source in data_sources]
+        sizes = measure([as_lists(data) for data in datas1], [as_lists(data) for data in datas2]) + \
+            measure(datas1, datas2)
+        sizes = [sizes[0], sizes[2], sizes[1], sizes[3]]
+        totals += sizes
+        print(line.format(tab, *sizes))
+    print(line.format('Total', *totals))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""Precompute the dashboard data sources of every submission into bundles.
+
+Usage:
+    python Dashboard_Uber_Prize/precompute.py [--workers N] [--chunksize N] [--force] [scenario/submission ...]
+
+Without submissions, every directory matching `data/submissions/*/*` is processed. Submissions whose bundle is
+fresh are skipped unless `--force` is given.
+"""
+import argparse
+import glob
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import cpu_count
+from os.path import dirname, isdir, join
+
+from bundle import read_bundle, write_bundle
+from submission import PATHS_CHUNKSIZE, Submission
+
+
+def find_all_submissions():
+    '''Returns every "scenario/submission" pair found in the data directory'''
+    path = join(dirname(__file__), 'data/submissions/')
+    return sorted('/'.join(f.split('/')[-2:]) for f in glob.glob(join(path, '*/*')) if isdir(f))
+
+
+def precompute(scenario_submission, force=False, chunksize=None):
+    """ Builds the Submission of `scenario_submission` and writes its bundle, unless a fresh bundle exists.
+
+    Returns
+    -------
+    scenario_submission: str
+    status: str
+        "skipped", "built" or the traceback of the failure
+    duration: float
+        Time spent in seconds
+    """
+    start = time.time()
+    scenario, name = scenario_submission.split('/')
+    try:
+        if not force and read_bundle(scenario, name) is not None:
+            return scenario_submission, 'skipped', time.time() - start
+        write_bundle(Submission(name=name, scenario=scenario, chunksize=chunksize))
+        return scenario_submission, 'built', time.time() - start
+    except Exception:
+        return scenario_submission, traceback.format_exc(), time.time() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Precompute the dashboard data sources of every submission.')
+    parser.add_argument('submissions', nargs='*', help='"scenario/submission" pairs (default: all)')
+    parser.add_argument('--workers', type=int, default=cpu_count(), help='number of worker processes')
+    parser.add_argument('--chunksize', type=int, default=PATHS_CHUNKSIZE,
+                        help='number of path traversals read at a time (default: whole file)')
+    parser.add_argument('--force', action='store_true', help='rebuild bundles even if they are fresh')
+    args = parser.parse_args(argv)
+
+    submissions = args.submissions or find_all_submissions()
+    failures = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(precompute, submission, args.force, args.chunksize) for submission in submissions]
+        for i, future in enumerate(as_completed(futures)):
+            scenario_submission, status, duration = future.result()
+            if status in ('skipped', 'built'):
+                print('[{}/{}] {}: {} ({:.1f}s)'.format(i + 1, len(submissions), scenario_submission, status, duration))
+            else:
+                failures += 1
+                print('[{}/{}] {}: failed ({:.1f}s)\n{}'.format(
+                    i + 1, len(submissions), scenario_submission, duration, status))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+import threading
+from os.path import join
+import numpy as np
+import pandas as pd
+
+from schemas import read_input
+
+# Reference files read by `load_reference_data`, relative to the reference directory
+REFERENCE_FILES = [
+    'availableVehicleTypes.csv',
+    'gtfs_data/trips.txt',
+    'vehicleCosts.csv'
+]
+
+_lock = threading.Lock()
+_reference_data = {}
+
+
+def read_only(values):
+    '''Returns `values` as a numpy array that can not be modified in place'''
+    values = np.array(values)
+    values.flags.writeable = False
+    return values
+
+
+class ReferenceData():
+
+    def __init__(self, vehicle_types, vehicle_costs, trips):
+        """
+        Reference vehicle and GTFS data shared by all submissions, indexed by integer code.
+
+        Vehicle type attributes are arrays aligned with `vehicle_type_ids`, and the route of each trip of
+        `trip_ids` is its index in `route_ids`. All arrays are read-only. Use `load_reference_data` to get the
+        instance of a reference directory.
+
+        Parameters
+        ----------
+        vehicle_types : pd.DataFrame
+            availableVehicleTypes.csv reference file
+        vehicle_costs : pd.DataFrame
+            vehicleCosts.csv reference file
+        trips : pd.DataFrame
+            gtfs_data/trips.txt reference file
+
+        Returns
+        -------
+        None
+        """
+        vehicle_types = vehicle_types.drop_duplicates('vehicleTypeId', keep='last').set_index('vehicleTypeId')
+        vehicle_costs = vehicle_costs.drop_duplicates('vehicleTypeId', keep='last').set_index('vehicleTypeId')
+        self.vehicle_type_ids = vehicle_types.index.append(vehicle_costs.index).unique()
+        self.seating_capacity = read_only(vehicle_types['seatingCapacity'].reindex(self.vehicle_type_ids).astype(float))
+        self.standing_room_capacity = read_only(
+            vehicle_types['standingRoomCapacity'].reindex(self.vehicle_type_ids).astype(float))
+        self.operational_cost = read_only(vehicle_costs['opAndMaintCost'].reindex(self.vehicle_type_ids).astype(float))
+
+        trips = trips.drop_duplicates('trip_id', keep='last')
+        self.trip_ids = pd.Index(trips['trip_id'])
+        self.route_ids = read_only(np.unique(trips['route_id'].values))
+        self.trip_route_codes = read_only(np.searchsorted(self.route_ids, trips['route_id'].values))
+
+    def vehicle_type_codes(self, vehicle_types):
+        """ Returns the code (index in `vehicle_type_ids`) of each vehicle type of `vehicle_types`, or -1 if it is
+        unknown.
+
+        Parameters
+        ----------
+        vehicle_types: pandas series
+            Vehicle type ids, preferably categorical
+
+        Returns
+        -------
+        codes: np.ndarray
+        """
+        vehicle_types = vehicle_types.astype('category').cat
+        category_codes = self.vehicle_type_ids.get_indexer(vehicle_types.categories)
+        return np.append(category_codes, -1)[vehicle_types.codes.values]
+
+    def vehicle_type_values(self, vehicle_types, values):
+        """ Returns the value of `values` (one of the vehicle type attributes) for each vehicle type of
+        `vehicle_types`, NaN for the unknown ones.
+        """
+        return np.append(values, np.nan)[self.vehicle_type_codes(vehicle_types)]
+
+
+def load_reference_data(reference_dir):
+    """ Returns the ReferenceData of `reference_dir`, reading its files on the first call only. The instance is
+    shared by all the callers of the process and must not be modified.
+    """
+    with _lock:
+        if reference_dir not in _reference_data:
+            _reference_data[reference_dir] = ReferenceData(
+                read_input(join(reference_dir, 'availableVehicleTypes.csv')),
+                read_input(join(reference_dir, 'vehicleCosts.csv')),
+                read_input(join(reference_dir, 'gtfs_data/trips.txt'), 'gtfs_data/trips.txt'))
+        return _reference_data[reference_dir]
@@ -0,0 +1,60 @@
+import threading
+import numpy as np
+import pandas as pd
+
+
+def parse_trip_ids(vehicle_ids):
+    '''Returns the GTFS trip id of transit vehicle ids ("<agency>:<trip id>-<suffix>")'''
+    return pd.Series(vehicle_ids).astype(str).str.split(':').str[-1].str.split('-').str[0].values
+
+
+class RouteIndex():
+
+    def __init__(self, reference):
+        """
+        Index from transit vehicle ids to the route of their GTFS trip.
+
+        Vehicle columns are resolved through their categories: each distinct vehicle id is parsed and looked up once
+        in the trips of the reference data (and remembered for the next columns), then the result is broadcast to the
+        rows by category code. The index is shared by the threads building data sources, so it is only updated under
+        its lock.
+
+        Parameters
+        ----------
+        reference : ReferenceData
+
+        Returns
+        -------
+        None
+        """
+        self.reference = reference
+        self.route_ids = reference.route_ids
+        # Route code of every vehicle id resolved so far (-1 for the vehicles of unknown trips)
+        self.vehicle_route_codes = pd.Series([], dtype=int)
+        self.lock = threading.Lock()
+
+    def codes(self, vehicles):
+        """ Returns the route code (index in `route_ids`) of each vehicle id of `vehicles`, or -1 if its trip is
+        unknown.
+
+        Parameters
+        ----------
+        vehicles: pandas series
+            Vehicle ids, preferably categorical
+
+        Returns
+        -------
+        codes: np.ndarray
+        """
+        vehicles = vehicles.astype('category').cat
+        categories = vehicles.categories
+        with self.lock:
+            new = categories[~categories.isin(self.vehicle_route_codes.index)]
+            if len(new):
+                trips = self.reference.trip_ids.get_indexer(parse_trip_ids(new))
+                self.vehicle_route_codes = pd.concat([
+                    self.vehicle_route_codes,
+                    pd.Series(np.where(trips >= 0, self.reference.trip_route_codes[trips], -1), index=new)])
+            vehicle_route_codes = self.vehicle_route_codes
+        category_codes = vehicle_route_codes.reindex(categories).values
+        return np.append(category_codes, -1)[vehicles.codes.values]
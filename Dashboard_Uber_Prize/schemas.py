@@ -0,0 +1,91 @@
+from os.path import basename
+
+from frame_cache import cache_frame, read_csv_cached
+
+# Columns actually consumed by the `make_*` methods of Submission and their compact dtypes, for every input file.
+# Files are keyed by name, relative to the submission (or reference) directory. The ITERS files are keyed by
+# "ITERS/<name>" as their actual name starts with the iteration number.
+SCHEMAS = {
+    'competition/submission-inputs/FrequencyAdjustment.csv': {
+        'usecols': ['route_id', 'start_time', 'end_time', 'headway_secs'],
+        'dtype': {'route_id': 'str'}
+    },
+    'competition/submission-inputs/MassTransitFares.csv': {
+        'usecols': ['agencyId', 'routeId', 'age', 'amount'],
+        'dtype': {'routeId': 'str', 'age': 'str'}
+    },
+    'competition/submission-inputs/ModeIncentives.csv': {
+        'usecols': ['mode', 'age', 'income', 'amount'],
+        'dtype': {'mode': 'str', 'age': 'str', 'income': 'str'}
+    },
+    'competition/submission-inputs/VehicleFleetMix.csv': {
+        'usecols': ['agencyId', 'routeId', 'vehicleTypeId'],
+        'dtype': {'routeId': 'str', 'vehicleTypeId': 'str'}
+    },
+    'competition/submissionScores.csv': {
+        'usecols': ['Component Name', 'Weight', 'Raw Score', 'Weighted Score'],
+        'dtype': {'Component Name': 'str'}
+    },
+    'legs_dataframe.csv': {
+        'usecols': ['Mode', 'Veh', 'Distance_m', 'Fare'],
+        'dtype': {'Mode': 'category', 'Veh': 'category', 'Distance_m': 'float32', 'Fare': 'float32'}
+    },
+    'path_traversals_dataframe.csv': {
+        'usecols': ['vehicle', 'mode', 'vehicleType', 'numPassengers', 'departureTime', 'arrivalTime', 'length',
+                    'FuelCost'],
+        'dtype': {'vehicle': 'category', 'mode': 'category', 'vehicleType': 'category', 'numPassengers': 'int16',
+                  'departureTime': 'int32', 'arrivalTime': 'int32', 'length': 'float32', 'FuelCost': 'float32'}
+    },
+    'persons_dataframe.csv': {
+        'usecols': ['PID', 'Age', 'income'],
+        'dtype': {'PID': 'category', 'Age': 'int16', 'income': 'float32'}
+    },
+    'trips_dataframe.csv': {
+        'usecols': ['PID', 'Trip_ID', 'realizedTripMode', 'Distance_m', 'Duration_sec', 'Start_time', 'FuelCost',
+                    'Fare', 'Incentive'],
+        'dtype': {'PID': 'category', 'Trip_ID': 'category', 'realizedTripMode': 'category', 'Distance_m': 'float32',
+                  'Duration_sec': 'int32', 'Start_time': 'int32', 'FuelCost': 'float32', 'Fare': 'float32',
+                  'Incentive': 'float32'}
+    },
+    'modeChoice.csv': {},
+    'realizedModeChoice.csv': {},
+    'ITERS/modeChoice.csv': {
+        'index_col': 0
+    },
+    'ITERS/averageTravelTimes.csv': {},
+    'availableVehicleTypes.csv': {
+        'usecols': ['vehicleTypeId', 'seatingCapacity', 'standingRoomCapacity']
+    },
+    'gtfs_data/trips.txt': {
+        'usecols': ['trip_id', 'route_id']
+    },
+    'vehicleCosts.csv': {
+        'usecols': ['vehicleTypeId', 'opAndMaintCost'],
+        'encoding': 'utf-8-sig'
+    }
+}
+
+
+def read_input(path, name=None):
+    """ Reads an input file with the columns and dtypes registered for it, through the on-disk frame cache.
+
+    Parameters
+    ----------
+    path: str
+        Path of the CSV file
+
+    name: str
+        Key of the file in SCHEMAS, defaults to the file name
+
+    Returns
+    -------
+    df: pandas dataframe
+    """
+    return read_csv_cached(path, **SCHEMAS[name or basename(path)])
+
+
+def cache_input(df, path, name=None):
+    """ Saves `df`, read from the input file at `path` by `read_input`, in the on-disk frame cache unless it is
+    already there. Returns whether the next `read_input` of the file will load it from the cache.
+    """
+    return cache_frame(df, path, **SCHEMAS[name or basename(path)])
@@ -0,0 +1,134 @@
+import os
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+from frame_cache import file_fingerprint
+from kpi_weights import TOTAL_SCORE
+from schemas import SCHEMAS
+from submission import INPUT_FILES, input_path, submission_path
+
+SCORES_FILE = INPUT_FILES['scores_df']
+
+# Threads reading the score files of the submissions new to the score index or changed since they were read
+SCORE_INDEX_THREADS = int(os.environ.get('DASHBOARD_SCORE_INDEX_THREADS', 8))
+
+
+def scores_path(scenario_submission):
+    '''Returns the path of the score file of a "scenario/submission" pair'''
+    return input_path(submission_path(*scenario_submission.split('/')), SCORES_FILE)
+
+
+def read_scores(scenario_submission):
+    """ Returns the weighted score of each component of a submission, read from its score file only, or None if
+    the file cannot be parsed.
+    """
+    try:
+        scores = pd.read_csv(scores_path(scenario_submission), **SCHEMAS[SCORES_FILE])
+        return dict(zip(scores['Component Name'], scores['Weighted Score'].astype(float)))
+    except Exception:
+        print("Can't read the scores of {}:".format(scenario_submission))
+        traceback.print_exc()
+        return None
+
+
+class ScoreIndex():
+
+    def __init__(self, workers=SCORE_INDEX_THREADS):
+        """
+        Process-wide index of the scores of all the submissions, for the leaderboard. Only the score file of each
+        submission is read, never its other files, and only again when its size or modification time changes.
+
+        Parameters
+        ----------
+        workers : int
+            Number of threads reading score files
+
+        Returns
+        -------
+        None
+        """
+        self.workers = workers
+        self._lock = threading.Lock()
+        # Fingerprint of the score file and scores (None if unreadable) of each "scenario/submission" pair
+        self._entries = {}
+        # Counter of the updates changing the index
+        self.version = 0
+
+    def update(self, submissions):
+        """ Brings the index up to date with the "scenario/submission" pairs of `submissions`: the score files that
+        are new or changed since they were read are read in parallel, and the submissions not listed anymore are
+        dropped. Submissions without a score file yet are left out until it appears.
+
+        Returns
+        -------
+        read, removed: list of str
+            Pairs whose scores were read, and pairs dropped from the index
+        """
+        fingerprints = {}
+        for scenario_submission in submissions:
+            try:
+                fingerprints[scenario_submission] = file_fingerprint(scores_path(scenario_submission))
+            except OSError:
+                pass
+        with self._lock:
+            stale = [scenario_submission for scenario_submission, fingerprint in fingerprints.items()
+                     if self._entries.get(scenario_submission, (None, None))[0] != fingerprint]
+            removed = [scenario_submission for scenario_submission in self._entries
+                       if scenario_submission not in fingerprints]
+
+        read = {}
+        if stale:
+            with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(stale)))) as executor:
+                for scenario_submission, scores in zip(stale, executor.map(read_scores, stale)):
+                    read[scenario_submission] = (fingerprints[scenario_submission], scores)
+
+        with self._lock:
+            for scenario_submission in removed:
+                self._entries.pop(scenario_submission, None)
+            self._entries.update(read)
+            if read or removed:
+                self.version += 1
+        return sorted(read), sorted(removed)
+
+    def frame(self, scenario=None, search=''):
+        """ Returns the leaderboard, best Submission Score first.
+
+        Parameters
+        ----------
+        scenario: str
+            Only the submissions of this scenario, or of all of them if None
+
+        search: str
+            Only the submissions whose name contains this text (case insensitive)
+
+        Returns
+        -------
+        leaderboard: pandas dataframe
+            One row per submission, with its "Rank", "Scenario", "Submission" and the weighted score of each
+            component
+        """
+        with self._lock:
+            entries = [(scenario_submission, scores) for scenario_submission, (_, scores) in self._entries.items()
+                       if scores is not None]
+        rows = []
+        for scenario_submission, scores in entries:
+            submission_scenario, name = scenario_submission.split('/')
+            if (scenario is None or submission_scenario == scenario) and search.lower() in name.lower():
+                row = dict(scores)
+                row.update({'Scenario': submission_scenario, 'Submission': name})
+                rows.append(row)
+
+        leaderboard = pd.DataFrame(rows)
+        for column in ['Scenario', 'Submission', TOTAL_SCORE]:
+            if column not in leaderboard.columns:
+                leaderboard[column] = pd.Series([], dtype=float if column == TOTAL_SCORE else object)
+        leaderboard = leaderboard.sort_values([TOTAL_SCORE, 'Scenario', 'Submission'],
+                                              ascending=[False, True, True], na_position='last')
+        leaderboard.insert(0, 'Rank', np.arange(1, len(leaderboard) + 1))
+        return leaderboard.reset_index(drop=True)
+
+
+SCORE_INDEX = ScoreIndex()
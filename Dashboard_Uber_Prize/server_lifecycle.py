@@ -0,0 +1,33 @@
+import threading
+
+from score_index import SCORE_INDEX
+from submission_store import LOAD_WORKERS, SUBMISSION_STORE, read_submission_dirs
+from watcher import WATCH_INTERVAL, SubmissionWatcher
+
+WATCHER = SubmissionWatcher(SUBMISSION_STORE, score_index=SCORE_INDEX)
+
+
+def on_server_loaded(server_context):
+    # Submissions are only loaded when a session first selects them, unless DASHBOARD_LOAD_WORKERS is set, in which
+    # case they are all loaded in parallel, in a background thread so that sessions can open in the meantime
+    submissions = read_submission_dirs()
+    SUBMISSION_STORE.set_submissions(submissions)
+    for scenario in {scenario_submission.split('/')[0] for scenario_submission in submissions}:
+        SUBMISSION_STORE.get_categories(scenario)
+    if LOAD_WORKERS > 0:
+        preload = threading.Thread(target=SUBMISSION_STORE.load, args=(submissions, LOAD_WORKERS),
+                                   name='submission-preload')
+        preload.daemon = True
+        preload.start()
+    # The leaderboard only needs the score files, indexed apart from the submissions
+    index_scores = threading.Thread(target=SCORE_INDEX.update, args=(submissions,), name='score-index')
+    index_scores.daemon = True
+    index_scores.start()
+    # Submissions added, removed or changed afterwards are picked up by polling the data directory
+    if WATCH_INTERVAL > 0:
+        WATCHER.start()
+
+
+def on_server_unloaded(server_context):
+    WATCHER.stop()
+    print('Submission store at shutdown: {}'.format(SUBMISSION_STORE.stats()))
@@ -1,6 +1,9 @@
 import pdb
 import math
 import numpy as np 
+import os
+import threading
+from functools import partial
 from os import listdir
 from os.path import dirname, join
 import pandas as pd 
@@ -9,11 +12,137 @@ import pandas as pd
 from bokeh.models import ColumnDataSource
 from bokeh.palettes import Dark2, Category10, Category20, Plasma256, YlOrRd
 
+from dag import run_graph
+from grid import complete_grid, expand_wildcards
+from identifiers import IDENTIFIER_KINDS, IdentifierTable, frame_memory_usage, intern_identifiers
+from path_traversals import RIDERSHIP_BINS, SERVICE_PERIODS, aggregate_path_traversals, read_path_traversals
+from reference import REFERENCE_FILES, load_reference_data
+from routes import RouteIndex
+from schemas import cache_input, read_input
+from trip_metrics import compute_trip_metrics
+
 HOURS = [str(h) for h in range(24)]
 ROUTE_IDS = ['1340', '1341', '1342', '1343', '1344', '1345', '1346', '1347', '1348', '1349', '1350', '1351']
 BUSES_LIST = ['BUS-DEFAULT', 'BUS-SMALL-HD', 'BUS-STD-HD', 'BUS-STD-ART']
 AGENCY_IDS = [217]
-TRANSIT_SCALE_FACTOR = 0.1
+
+# Input frames of a submission and the file each one is read from, relative to the submission directory (the
+# ITERS files are looked up in the last iteration directory, as their name starts with the iteration number).
+# Their columns and dtypes are declared in schemas.py.
+INPUT_FRAMES = [
+    ('frequency_df', 'competition/submission-inputs/FrequencyAdjustment.csv'),
+    ('fares_df', 'competition/submission-inputs/MassTransitFares.csv'),
+    ('incentives_df', 'competition/submission-inputs/ModeIncentives.csv'),
+    ('fleet_df', 'competition/submission-inputs/VehicleFleetMix.csv'),
+    ('scores_df', 'competition/submissionScores.csv'),
+    ('legs_df', 'legs_dataframe.csv'),
+    ('paths_df', 'path_traversals_dataframe.csv'),
+    ('persons_df', 'persons_dataframe.csv'),
+    ('trips_df', 'trips_dataframe.csv'),
+    ('mode_choice_df', 'modeChoice.csv'),
+    ('realized_mode_choice_df', 'realizedModeChoice.csv'),
+    ('mode_choice_hourly_df', 'ITERS/modeChoice.csv'),
+    ('travel_times_df', 'ITERS/averageTravelTimes.csv')
+]
+INPUT_FILES = dict(INPUT_FRAMES)
+
+# Attributes holding the raw submission frames, only needed while computing the data sources
+RAW_FRAMES = ['legs_df', 'paths_df', 'persons_df', 'trips_df']
+
+# What a submission does with each raw frame once no data source left to compute needs it: "keep" it in memory
+# (until the submission store releases it to fit its memory budget), "drop" it, or "spill" it to the on-disk frame
+# cache first if it is not there yet. Dropped and spilled frames are read again, from the frame cache, if needed.
+RAW_RETENTION_POLICIES = ['keep', 'drop', 'spill']
+RAW_RETENTION = os.environ.get('DASHBOARD_RAW_RETENTION', 'keep')
+
+# Data dependency manifest of the dashboard: the data sources (each holding the data of one ColumnDataSource)
+# returned by every `make_*` method, and the input frames and reference data it reads. A data source is computed,
+# and only its inputs read, the first time it is accessed.
+DATA_SOURCE_BUILDERS = [
+    (['modeinc_input_data'], 'make_modeinc_input_data', ['incentives_df']),
+    (['fleetmix_input_data'], 'make_fleetmix_input_data', ['fleet_df']),
+    (['fares_input_data'], 'make_fares_input_data', ['fares_df']),
+    (['routesched_input_line_data', 'routesched_input_start_data', 'routesched_input_end_data'],
+     'make_routesched_input_data', ['frequency_df']),
+    (['normalized_scores_data'], 'make_normalized_scores_data', ['scores_df']),
+    (['mode_planned_pie_chart_data'], 'make_mode_planned_pie_chart_data', ['mode_choice_df']),
+    (['mode_realized_pie_chart_data'], 'make_mode_realized_pie_chart_data', ['realized_mode_choice_df']),
+    (['mode_choice_by_time_data'], 'make_mode_choice_by_time_data', ['mode_choice_hourly_df']),
+    (['mode_choice_by_age_group_data'], 'make_mode_choice_by_age_group_data', ['trip_metrics']),
+    (['mode_choice_by_income_group_data'], 'make_mode_choice_by_income_group_data', ['trip_metrics']),
+    (['mode_choice_by_distance_data'], 'make_mode_choice_by_distance_data', ['trip_metrics']),
+    (['congestion_travel_time_by_mode_data'], 'make_congestion_travel_time_by_mode_data', ['travel_times_df']),
+    (['congestion_travel_time_per_passenger_trip_data'], 'make_congestion_travel_time_per_passenger_trip_data',
+     ['travel_times_df']),
+    (['congestion_miles_traveled_per_mode_data'], 'make_congestion_miles_traveled_per_mode_data',
+     ['path_traversal_aggregates', 'legs_df']),
+    (['congestion_bus_vmt_by_ridership_data'], 'make_congestion_bus_vmt_by_ridership_data',
+     ['path_traversal_aggregates']),
+    (['congestion_on_demand_vmt_by_phases_data'], 'make_congestion_on_demand_vmt_by_phases_data',
+     ['path_traversal_aggregates']),
+    (['congestion_travel_speed_data'], 'make_congestion_travel_speed_data', ['trip_metrics']),
+    (['los_travel_expenditure_data'], 'make_los_travel_expenditure_data', ['trip_metrics']),
+    (['los_crowding_data'], 'make_los_crowding_data', ['path_traversal_aggregates']),
+    (['transit_cb_costs_data', 'transit_cb_benefits_data'], 'make_transit_cb_data',
+     ['path_traversal_aggregates', 'legs_df', 'route_index']),
+    (['transit_inc_by_mode_data'], 'make_transit_inc_by_mode_data', ['trip_metrics']),
+    (['sustainability_25pm_per_mode_data'], 'make_sustainability_25pm_per_mode_data',
+     ['path_traversal_aggregates', 'legs_df'])
+]
+
+# Intermediate results shared by several data sources, with the inputs they are computed from
+INTERMEDIATES = {
+    'path_traversal_aggregates': ['paths_df', 'reference', 'route_index'],
+    'route_index': ['reference'],
+    'trip_metrics': ['trips_df', 'persons_df']
+}
+
+# Every data source attribute of a submission, in dashboard order
+DATA_SOURCES = [data_source for data_sources, _, _ in DATA_SOURCE_BUILDERS for data_source in data_sources]
+
+# Builder of each data source attribute
+DATA_SOURCE_BUILDER = {data_source: builder for builder in DATA_SOURCE_BUILDERS for data_source in builder[0]}
+
+# Data sources plotted in each tab of the dashboard
+TAB_DATA_SOURCES = [
+    ('Inputs', ['fleetmix_input_data', 'routesched_input_line_data', 'routesched_input_start_data',
+                'routesched_input_end_data', 'fares_input_data', 'modeinc_input_data']),
+    ('Scores', ['normalized_scores_data']),
+    ('Outputs - Mode Choice', ['mode_planned_pie_chart_data', 'mode_realized_pie_chart_data',
+                               'mode_choice_by_time_data', 'mode_choice_by_income_group_data',
+                               'mode_choice_by_age_group_data', 'mode_choice_by_distance_data']),
+    ('Outputs - Level of Service', ['los_travel_expenditure_data', 'los_crowding_data']),
+    ('Outputs - Congestion', ['congestion_travel_time_by_mode_data', 'congestion_travel_time_per_passenger_trip_data',
+                              'congestion_miles_traveled_per_mode_data', 'congestion_bus_vmt_by_ridership_data',
+                              'congestion_on_demand_vmt_by_phases_data', 'congestion_travel_speed_data']),
+    ('Outputs - Cost/Benefit', ['transit_cb_costs_data', 'transit_cb_benefits_data', 'transit_inc_by_mode_data']),
+    ('Outputs - Sustainability', ['sustainability_25pm_per_mode_data'])
+]
+
+
+def required_inputs(data_sources):
+    """ Returns the input files (relative to the submission directory) and the reference files needed to compute
+    `data_sources`.
+    """
+    inputs = {dependency for data_source in data_sources for dependency in DATA_SOURCE_BUILDER[data_source][2]}
+    intermediates = inputs.intersection(INTERMEDIATES)
+    while intermediates:
+        dependencies = set().union(*[INTERMEDIATES[intermediate] for intermediate in intermediates])
+        intermediates = dependencies.intersection(INTERMEDIATES).difference(inputs)
+        inputs.update(dependencies)
+    input_files = sorted(INPUT_FILES[frame] for frame in inputs if frame in INPUT_FILES)
+    reference_files = REFERENCE_FILES if 'reference' in inputs else []
+    return input_files, reference_files
+
+# Number of path traversals read at a time when aggregating them, or None to read the whole file (through the frame
+# cache). Set it for runs whose path traversals file does not fit in memory.
+PATHS_CHUNKSIZE = int(os.environ.get('DASHBOARD_PATHS_CHUNKSIZE', 0)) or None
+
+# Minimum length of the float columns sent to the browser as binary arrays by `column_data`
+BINARY_MIN_LENGTH = 16
+
+# Number of threads computing the independent input frames, intermediates and data sources of a submission
+BUILD_THREADS = int(os.environ.get('DASHBOARD_BUILD_THREADS', 4))
 
 def reset_index(df):
     '''Returns DataFrame with index as columns'''
@@ -24,22 +153,102 @@ def reset_index(df):
     # pd.merge(df, index_df, left_index=True, right_index=True) does not work
     return pd.merge(index_df, df, left_index=True, right_index=True)
 
-def calc_ridership_perc(row):
-    if row['numPassengers'] > row['seatingCapacity']:
-        return 100.0 + (row['numPassengers'] - row['seatingCapacity']) * 100.0 / row['standingRoomCapacity']
-    else:
-        return row['numPassengers'] * 100.0 / row['seatingCapacity']
+def submission_path(scenario, name):
+    '''Returns the directory of the `name` submission of `scenario`'''
+    return join(dirname(__file__), 'data/submissions/{}/{}'.format(scenario, name))
+
+def reference_path():
+    '''Returns the directory of the reference files shared by all submissions'''
+    return join(dirname(__file__), 'data/sioux_faux_bus_lines')
+
+def last_iteration_dir(submissions_dir):
+    '''Returns the number and the directory of the last iteration in the ITERS directory of a submission'''
+    path = join(submissions_dir, 'ITERS')
+    iter_num = max([int(file.split('.')[1]) for file in listdir(path) if file != '.DS_Store'])
+    return iter_num, join(path, 'it.{}'.format(iter_num))
+
+def input_path(submissions_dir, input_file):
+    '''Returns the path of one of the INPUT_FRAMES files of a submission'''
+    if input_file.startswith('ITERS/'):
+        iter_num, path = last_iteration_dir(submissions_dir)
+        return join(path, '{}.{}'.format(iter_num, input_file.split('/')[1]))
+    return join(submissions_dir, input_file)
+
+def input_paths(submissions_dir):
+    '''Returns the paths of all the input files of a submission'''
+    return [input_path(submissions_dir, input_file) for _, input_file in INPUT_FRAMES]
+
+def column_data(columns):
+    """ Returns the data of a ColumnDataSource from a dataframe or a dict of columns.
+
+    Float columns of at least BINARY_MIN_LENGTH rows are kept as numpy arrays, which Bokeh sends to the browser in
+    binary form instead of JSON text. The other columns are lists: integers and short columns are smaller as JSON
+    than with the per-array overhead of the binary encoding (see payload_size.py).
+    """
+    data = {}
+    for name, values in columns.items():
+        array = np.asarray(values)
+        if array.ndim == 1 and array.dtype.kind == 'f' and len(array) >= BINARY_MIN_LENGTH:
+            data[name] = array.astype(np.float64)
+        elif isinstance(values, list):
+            data[name] = values
+        else:
+            data[name] = array.tolist()
+    return data
+
+def data_memory_usage(data):
+    '''Returns an estimate of the memory used by the data of a ColumnDataSource (see `column_data`), in bytes'''
+    return int(sum(values.nbytes if isinstance(values, np.ndarray) else
+                   pd.Series(values).memory_usage(index=False, deep=True) for values in data.values()))
+
+def bus_fares_by_route(legs, route_index):
+    '''Returns the total fare of the bus legs of each route (legs of unknown trips are left out)'''
+    bus_fare_df = legs.loc[legs["Mode"] == "bus", ["Veh", "Fare"]]
+    route_codes = route_index.codes(bus_fare_df['Veh'])
+    routed = route_codes >= 0
+    fares = np.bincount(route_codes[routed], weights=bus_fare_df['Fare'].values[routed].astype(float),
+                        minlength=len(route_index.route_ids))
+    observed = np.bincount(route_codes[routed], minlength=len(route_index.route_ids)) > 0
+    return pd.DataFrame({"route_id": route_index.route_ids[observed], "Fare": fares[observed]})
+
+def transit_cost_benefit(bus_costs, bus_fares):
+    """ Joins the per-route bus costs and fares, with zeros for the routes missing on one side.
+
+    Parameters
+    ----------
+    bus_costs: pandas dataframe
+        Operational and fuel costs of the bus path traversals of each route ("route_id", "OperationalCosts" and
+        "FuelCost" columns)
+
+    bus_fares: pandas dataframe
+        Fares of the bus legs of each route ("route_id" and "Fare" columns)
+
+    Returns
+    -------
+    df: pandas dataframe
+        Costs and fares by route, indexed by route_id
+    """
+    costs = bus_costs.set_index("route_id")[["OperationalCosts", "FuelCost"]]
+    fares = bus_fares.set_index("route_id")[["Fare"]]
+    return costs.join(fares, how='outer').fillna(0.0)
 
 class Submission():
 
-    def __init__(self, name, scenario):
+    def __init__(self, name, scenario, lazy=False, chunksize=PATHS_CHUNKSIZE, retention=RAW_RETENTION):
         """
         Initialize class object.
 
         Parameters
         ----------
         name : str
-        dfs : list of pd.DataFrame
+        scenario : str
+        lazy : bool
+            If True, input files are only read, and data sources only computed, when first accessed (see
+            DATA_SOURCE_BUILDERS). Otherwise everything is read and computed here.
+        chunksize : int
+            Number of path traversals read at a time, or None to read them all at once
+        retention : str
+            Retention policy of the raw frames, one of RAW_RETENTION_POLICIES
 
         Returns
         -------
@@ -48,77 +257,174 @@ class Submission():
         self.name = name
         self.scenario = scenario
         self.modes = ['OnDemand_ride', 'car', 'drive_transit', 'walk', 'walk_transit']
-        self.submissions_dir = join(dirname(__file__), 'data/submissions/{}/{}'.format(self.scenario, self.name))
-        self.reference_dir = join(dirname(__file__), 'data/sioux_faux_bus_lines')
-        self.get_data(from_csv=True)
-        self.make_data_sources()
+        self.submissions_dir = submission_path(self.scenario, self.name)
+        self.reference_dir = reference_path()
+        self.chunksize = chunksize
+        if retention not in RAW_RETENTION_POLICIES:
+            raise ValueError('Unknown raw frame retention policy: {}'.format(retention))
+        self.retention = retention
+        # Memory used by each raw frame held, in bytes
+        self.raw_frame_memory = {}
+        # Person, trip and vehicle ids of the input frames (see identifiers.py)
+        self.identifiers = {kind: IdentifierTable() for kind in IDENTIFIER_KINDS}
+        self.raw_memory_lock = threading.Lock()
+        self.attribute_locks = {}
+        self.timings = {}
+        if not lazy:
+            self.make_data_sources()
+
+    def __getattr__(self, attr):
+        # Only called for attributes not set yet: input frames, reference data and data sources are loaded or
+        # computed on first access, once even when several threads ask for them at the same time
+        if attr not in INPUT_FILES and attr not in INTERMEDIATES and attr not in DATA_SOURCE_BUILDER and \
+                attr != 'reference':
+            raise AttributeError("'{}' object has no attribute '{}'".format(type(self).__name__, attr))
+        with self.attribute_lock(attr):
+            if attr in self.__dict__:
+                pass
+            elif attr in INPUT_FILES:
+                self.load_input(attr)
+            elif attr == 'reference':
+                self.reference = load_reference_data(self.reference_dir)
+            elif attr == 'route_index':
+                self.route_index = RouteIndex(self.reference)
+            elif attr == 'path_traversal_aggregates':
+                self.aggregate_path_traversals()
+            elif attr == 'trip_metrics':
+                self.trip_metrics = compute_trip_metrics(self.trips_df, self.persons_df)
+            else:
+                self.make_data_source(attr)
+        return self.__dict__[attr]
+
+    def attribute_lock(self, attr):
+        '''Returns the lock held while computing `attr` (the same for all the data sources of a `make_*` method)'''
+        key = DATA_SOURCE_BUILDER[attr][1] if attr in DATA_SOURCE_BUILDER else attr
+        with self.raw_memory_lock:
+            return self.attribute_locks.setdefault(key, threading.RLock())
 
     def get_data(self, from_csv=False):
 
         if from_csv:
-            self.frequency_df = pd.read_csv(join(self.submissions_dir, 'competition/submission-inputs/FrequencyAdjustment.csv'))
-            self.fares_df = pd.read_csv(join(self.submissions_dir, 'competition/submission-inputs/MassTransitFares.csv'))
-            self.incentives_df = pd.read_csv(join(self.submissions_dir, 'competition/submission-inputs/ModeIncentives.csv'))
-            self.fleet_df = pd.read_csv(join(self.submissions_dir, 'competition/submission-inputs/VehicleFleetMix.csv'))
-
-            self.scores_df = pd.read_csv(join(self.submissions_dir, 'competition/submissionScores.csv'))
-
-            self.activities_df = pd.read_csv(join(self.submissions_dir, 'activities_dataframe.csv'))
-            self.households_df = pd.read_csv(join(self.submissions_dir, 'households_dataframe.csv'))
-            self.legs_df = pd.read_csv(join(self.submissions_dir, 'legs_dataframe.csv'))
-            self.paths_df = pd.read_csv(join(self.submissions_dir, 'path_traversals_dataframe.csv'))
-            self.persons_df = pd.read_csv(join(self.submissions_dir, 'persons_dataframe.csv'))
-            self.trips_df = pd.read_csv(join(self.submissions_dir, 'trips_dataframe.csv'))
-            self.mode_choice_df = pd.read_csv(join(self.submissions_dir, 'modeChoice.csv'))
-            self.realized_mode_choice_df = pd.read_csv(join(self.submissions_dir, 'realizedModeChoice.csv'))
-
-            path = join(self.submissions_dir, 'ITERS')
-            iter_num = max([int(file.split('.')[1]) for file in listdir(path) if file != '.DS_Store'])
-            path = join(path, 'it.{}'.format(iter_num))
-            self.mode_choice_hourly_df = pd.read_csv(join(path, '{}.modeChoice.csv'.format(iter_num)), index_col=0).T
-            self.travel_times_df = pd.read_csv(join(path, '{}.averageTravelTimes.csv'.format(iter_num)))
-
-            self.seating_capacities = pd.read_csv(join(self.reference_dir, "availableVehicleTypes.csv"))[[
-                "vehicleTypeId", "seatingCapacity"]].set_index("vehicleTypeId", drop=True).T.to_dict("records")[0]
-            self.standing_room_capacities = pd.read_csv(join(self.reference_dir, "availableVehicleTypes.csv"))[[
-                "vehicleTypeId", "standingRoomCapacity"]].set_index("vehicleTypeId", drop=True).T.to_dict("records")[0]
-            self.trip_to_route = pd.read_csv(join(self.reference_dir, "gtfs_data/trips.txt"))[[
-                "trip_id", "route_id"]].set_index("trip_id", drop=True).T.to_dict('records')[0]
-            self.operational_costs = pd.read_csv(join(self.reference_dir, "vehicleCosts.csv"))[[
-                "vehicleTypeId", "opAndMaintCost"]].set_index("vehicleTypeId", drop=True).T.to_dict("records")[0]
+            # The path traversals are only read, possibly in chunks, by `aggregate_path_traversals`
+            for frame, _ in INPUT_FRAMES:
+                if frame != 'paths_df':
+                    self.load_input(frame)
+            self.reference = load_reference_data(self.reference_dir)
         else:
             pass
 
-    def make_data_sources(self):
-
-        self.modeinc_input_data = self.make_modeinc_input_data()
-        self.fleetmix_input_data = self.make_fleetmix_input_data()
-        self.fares_input_data = self.make_fares_input_data()
-        self.routesched_input_line_data, self.routesched_input_start_data, self.routesched_input_end_data = self.make_routesched_input_data()
-
-        self.normalized_scores_data = self.make_normalized_scores_data()
+    def load_input(self, frame):
+        """ Reads the file of the `frame` input frame (see INPUT_FRAMES).
+        """
+        input_file = INPUT_FILES[frame]
+        df = intern_identifiers(read_input(input_path(self.submissions_dir, input_file), input_file), input_file,
+                                self.identifiers)
+        if frame == 'mode_choice_hourly_df':
+            df = df.T
+        if frame in RAW_FRAMES:
+            with self.raw_memory_lock:
+                self.raw_frame_memory[frame] = frame_memory_usage(df, input_file)
+        setattr(self, frame, df)
+
+    def aggregate_path_traversals(self):
+        """ Computes the path traversal aggregates used by the data sources in a single pass over the path
+        traversals, reading them in chunks of `chunksize` rows unless they are already loaded. The path traversals
+        are not kept.
+        """
+        if 'paths_df' in self.__dict__:
+            chunks = [self.paths_df]
+        else:
+            chunks = read_path_traversals(input_path(self.submissions_dir, INPUT_FILES['paths_df']), self.chunksize)
+        self.path_traversal_aggregates = aggregate_path_traversals(chunks, self.reference, self.route_index)
 
-        self.mode_planned_pie_chart_data = self.make_mode_pie_chart_data(self.mode_choice_df.copy())
-        self.mode_realized_pie_chart_data = self.make_mode_pie_chart_data(self.realized_mode_choice_df.copy())
-        self.mode_choice_by_time_data = self.make_mode_choice_by_time_data()
-        self.mode_choice_by_age_group_data = self.make_mode_choice_by_age_group_data()
-        self.mode_choice_by_income_group_data = self.make_mode_choice_by_income_group_data()
-        self.mode_choice_by_distance_data = self.make_mode_choice_by_distance_data()
+    def make_data_source(self, data_source):
+        """ Computes `data_source`, along with the other data sources returned by the same `make_*` method.
+        """
+        data_sources, builder, _ = DATA_SOURCE_BUILDER[data_source]
+        data = getattr(self, builder)()
+        if len(data_sources) == 1:
+            data = [data]
+        for name, values in zip(data_sources, data):
+            setattr(self, name, values)
+        self.apply_retention()
+
+    def build_graph(self):
+        """ Returns the dependency graph of the data sources (see `dag.run_graph`): one node per input frame,
+        intermediate and `make_*` method, each computing (and memoizing) the corresponding attributes.
+        """
+        nodes = {'reference': (partial(getattr, self, 'reference'), [])}
+        for frame, _ in INPUT_FRAMES:
+            nodes[frame] = (partial(getattr, self, frame), [])
+        # The path traversals are streamed by `aggregate_path_traversals` instead of being loaded
+        del nodes['paths_df']
+        for intermediate, dependencies in INTERMEDIATES.items():
+            nodes[intermediate] = (partial(getattr, self, intermediate), dependencies)
+        for data_sources, builder, dependencies in DATA_SOURCE_BUILDERS:
+            nodes[builder] = (partial(getattr, self, data_sources[0]), dependencies)
+        return {name: (function, [dependency for dependency in dependencies if dependency in nodes])
+                for name, (function, dependencies) in nodes.items()}
+
+    def make_data_sources(self, workers=BUILD_THREADS):
+        """ Computes all the data sources, running independent nodes of `build_graph` on `workers` threads. The
+        duration of each node is saved in `timings`.
+        """
+        _, timings = run_graph(self.build_graph(), workers=workers)
+        self.timings.update(timings)
 
-        self.congestion_travel_time_by_mode_data = self.make_congestion_travel_time_by_mode_data()
-        self.congestion_travel_time_per_passenger_trip_data = self.make_congestion_travel_time_per_passenger_trip_data()
-        self.congestion_miles_traveled_per_mode_data = self.make_congestion_miles_traveled_per_mode_data()
-        self.congestion_bus_vmt_by_ridership_data = self.make_congestion_bus_vmt_by_ridership_data()
-        self.congestion_on_demand_vmt_by_phases_data = self.make_congestion_on_demand_vmt_by_phases_data()
-        self.congestion_travel_speed_data = self.make_congestion_travel_speed_data()
+    def raw_memory_usage(self):
+        """ Returns the memory used by the raw frames still held by the submission and their ids, in bytes.
+        """
+        with self.raw_memory_lock:
+            return sum(self.raw_frame_memory.values()) + sum(table.memory for table in self.identifiers.values())
 
-        self.los_travel_expenditure_data = self.make_los_travel_expenditure_data()
-        self.los_crowding_data = self.make_los_crowding_data()
+    def memory_usage(self):
+        """ Returns the memory used by the raw frames ("raw") and the computed data sources ("data") of the
+        submission, in bytes.
+        """
+        data = sum(data_memory_usage(self.__dict__[data_source]) for data_source in DATA_SOURCES
+                   if data_source in self.__dict__)
+        return {'raw': self.raw_memory_usage(), 'data': data}
 
-        self.transit_cb_costs_data, self.transit_cb_benefits_data = self.make_transit_cb_data()
-        self.transit_inc_by_mode_data = self.make_transit_inc_by_mode_data()
-        
-        self.sustainability_25pm_per_mode_data = self.make_sustainability_25pm_per_mode_data()
+    def pending_inputs(self):
+        """ Returns the input frames, reference data and intermediates still needed by the data sources left to
+        compute.
+        """
+        pending = set()
+        dependencies = [dependency for data_sources, _, builder_dependencies in DATA_SOURCE_BUILDERS
+                        if data_sources[0] not in self.__dict__ for dependency in builder_dependencies]
+        while dependencies:
+            dependency = dependencies.pop()
+            if dependency in pending:
+                continue
+            pending.add(dependency)
+            if dependency in INTERMEDIATES and dependency not in self.__dict__:
+                dependencies.extend(INTERMEDIATES[dependency])
+        return pending
+
+    def apply_retention(self):
+        """ Releases the raw frames no data source left to compute needs, unless the retention policy is "keep".
+        """
+        if self.retention != 'keep':
+            pending = self.pending_inputs()
+            self.release_raw_frames([frame for frame in RAW_FRAMES if frame not in pending])
+
+    def release_raw_frames(self, frames=RAW_FRAMES):
+        """ Drops raw frames of the submission (all of them by default), keeping the computed data sources. With
+        the "spill" retention policy, each frame is first saved in the frame cache if it is not there yet. Raw
+        frames are read again if a data source still to compute needs them.
+        """
+        for frame in frames:
+            if self.retention == 'spill' and frame in self.__dict__:
+                input_file = INPUT_FILES[frame]
+                cache_input(self.__dict__[frame], input_path(self.submissions_dir, input_file), input_file)
+            self.__dict__.pop(frame, None)
+            with self.raw_memory_lock:
+                self.raw_frame_memory.pop(frame, None)
+        # The ids are only referenced by the raw frames. Frames read again are interned in new tables, and are only
+        # joined on their codes with frames of the same table (see `identifiers.get_indexer`).
+        with self.raw_memory_lock:
+            if not any(frame in self.__dict__ for frame in RAW_FRAMES):
+                self.identifiers = {kind: IdentifierTable() for kind in IDENTIFIER_KINDS}
 
     def splitting_min_max(self, df, name_column):
         """ Parsing and splitting the ranges in the "age" (or "income") columns into two new columns:
@@ -154,6 +460,8 @@ class Submission():
     def make_normalized_scores_data(self):
         scores = self.scores_df
         scores = scores.loc[:,["Component Name", "Weighted Score"]]
+        # Weighted scores as submitted, re-weighted in the browser by the KPI weight sliders (see kpi_weights.py)
+        scores.loc[:, "Base Weighted Score"] = scores["Weighted Score"]
         scores.set_index("Component Name", inplace=True)
         scores.reset_index(inplace=True)
 
@@ -167,7 +475,7 @@ class Submission():
         # min_score = min(scores['Weighted Score'].min(), 0.0) * 1.1
         # max_score = max(scores['Weighted Score'].max(), 1.0) * 1.1
 
-        data = scores.to_dict(orient='list')
+        data = column_data(scores)
         return data
 
     def make_fleetmix_input_data(self):
@@ -179,25 +487,14 @@ class Submission():
                 [[agency_id, "{}".format(route_id), "BUS-DEFAULT"] for route_id in ROUTE_IDS for agency_id in AGENCY_IDS],
                 columns=["agencyId", "routeId", "vehicleTypeId"])
 
-        df = pd.DataFrame([AGENCY_IDS[0], '1', BUSES_LIST[0]]).T
-        df.columns = ["agencyId", "routeId", "vehicleTypeId"]
-
         # Adding the missing bus types in the dataframe so that they appear in the plot
-        for bus in BUSES_LIST:
-            if bus not in fleet_mix["vehicleTypeId"].values:
-                df.loc[0, "vehicleTypeId"] = bus
-                fleet_mix = fleet_mix.append(df, ignore_index=True, sort=False)
+        fleet_mix = complete_grid(fleet_mix, [("vehicleTypeId", BUSES_LIST)],
+                                  fill_value={"agencyId": AGENCY_IDS[0], "routeId": '1'})
 
         # Adding the missing bus routes in the dataframe so that they appear in the plot
         fleet_mix.loc[:, "routeId"] = fleet_mix["routeId"].astype(str)
-
-        df = pd.DataFrame([AGENCY_IDS[0], "", BUSES_LIST[0]]).T
-        df.columns = ["agencyId", "routeId", "vehicleTypeId"]
-
-        for route in ROUTE_IDS:
-            if route not in fleet_mix["routeId"].values:
-                df.loc[0, "routeId"] = route
-                fleet_mix = fleet_mix.append(df, ignore_index=True, sort=False)
+        fleet_mix = complete_grid(fleet_mix, [("routeId", ROUTE_IDS)],
+                                  fill_value={"agencyId": AGENCY_IDS[0], "vehicleTypeId": BUSES_LIST[0]})
 
         # Reodering bus types starting by "BUS-DEFAULT" and then by ascending bus size order
         fleet_mix.loc[:, "vehicleTypeId"] = fleet_mix["vehicleTypeId"].astype('category').cat.reorder_categories(
@@ -207,7 +504,7 @@ class Submission():
         fleet_mix.sort_values(by="vehicleTypeId", inplace=True)
         fleet_mix.reset_index(inplace=True, drop=True)
 
-        data = fleet_mix.to_dict(orient='list')
+        data = column_data(fleet_mix)
         return data 
 
     def make_routesched_input_data(self):
@@ -216,13 +513,8 @@ class Submission():
         frequency.loc[:, "route_id"] = frequency["route_id"].astype(str)
 
         # Add all missing routes (the ones that were not changed) in the DF so that they appear int he plot
-        df = pd.DataFrame([0, 0, 24*3600, 10800]).T
-        df.columns = ["route_id", "start_time", "end_time", "headway_secs"]
-
-        for route in ROUTE_IDS:
-            if route not in frequency["route_id"].values:
-                df.loc[0, "route_id"] = route
-                frequency = frequency.append(df, ignore_index=True, sort=False)
+        frequency = complete_grid(frequency, [("route_id", ROUTE_IDS)],
+                                  fill_value={"start_time": 0, "end_time": 24*3600, "headway_secs": 10800})
 
         frequency.loc[:, "start_time"] = (frequency["start_time"].astype(int) / 3600).round(1)
         frequency.loc[:, "end_time"] = (frequency["end_time"].astype(int) / 3600).round(1)
@@ -248,7 +540,7 @@ class Submission():
             ys=[f_row['headway_secs'] for i, f_row in frequency.iterrows()],
             color=[palette_dict[i] for i, f_row in frequency.iterrows()]
         )
-        return line_data, start_data, end_data
+        return column_data(line_data), column_data(start_data), column_data(end_data)
 
     def make_fares_input_data(self, max_fare=10, max_age=120):
         fares = self.fares_df
@@ -256,27 +548,17 @@ class Submission():
         fares.loc[:, "age"] = fares["age"].astype(str)
         fares.loc[:, "routeId"] = fares["routeId"].astype(str)
 
-        df = pd.DataFrame(columns=["agencyId", "routeId", "age", "amount"])
-
         # Replace RouteId = NaN values by all bus lines (12 rows)
-        for i, fare in fares.iterrows():
-            if fare['routeId'] == 'nan':
-                df1 = pd.DataFrame(
-                    [[fare['agencyId'], route, fare['age'], fare['amount']] for route in ROUTE_IDS],
-                    columns=["agencyId", "routeId", "age", "amount"])
-                df = df.append(df1, ignore_index=True, sort=False)
-
-            else:
-                df = df.append(fare, ignore_index=True, sort=False)
+        fares = expand_wildcards(fares, "routeId", ROUTE_IDS)
 
         # Splitting age ranges into 2 columns (min_age and max_age)
-        fares = self.splitting_min_max(df, "age")
+        fares = self.splitting_min_max(fares, "age")
         fares.loc[:, "routeId"] = fares["routeId"].astype(str)
         fares.loc[:, "amount"] = fares["amount"].astype(float)
 
         fares = fares.drop(labels=["age"], axis=1)
         fares = fares.sort_values(by=["amount", "routeId"])
-        data = fares.to_dict(orient='list')
+        data = column_data(fares)
         return data 
 
     def make_modeinc_input_data(self, max_incentive=50, max_age=120, max_income=150000):
@@ -284,14 +566,10 @@ class Submission():
         incentives = self.incentives_df
         incentives.loc[:, "amount"] = incentives["amount"].astype(float)
 
-        # Completing the dataframe with the missing subsidized modes (so that they appear in the plot)
-        df = pd.DataFrame(["", "(0:{})".format(max_age), "(0:{})".format(max_income), 0.00]).T
-        df.columns = ["mode", "age", "income", "amount"]
-
+        # Completing the dataframe with a zero incentive for every subsidized mode (so that they appear in the plot)
         modes = ["OnDemand_ride", "drive_transit", "walk_transit"]
-        for mode in modes:
-            df.loc[0, "mode"] = mode
-            incentives = incentives.append(df, ignore_index=True, sort=False)
+        incentives = complete_grid(incentives, [("mode", modes), ("age", ["(0:{})".format(max_age)]),
+                                                ("income", ["(0:{})".format(max_income)]), ("amount", [0.0])])
         incentives = incentives[incentives["mode"].isin(modes)].drop_duplicates()
 
         # Splitting age and income columns
@@ -304,9 +582,15 @@ class Submission():
         incentives.loc[:, "mode"] = incentives["mode"].astype('category').cat.reorder_categories(modes)
 
         incentives = incentives.sort_values(by=["amount", "mode"])
-        data = incentives.to_dict(orient='list')
+        data = column_data(incentives)
         return data
 
+    def make_mode_planned_pie_chart_data(self):
+        return self.make_mode_pie_chart_data(self.mode_choice_df.copy())
+
+    def make_mode_realized_pie_chart_data(self):
+        return self.make_mode_pie_chart_data(self.realized_mode_choice_df.copy())
+
     def make_mode_pie_chart_data(self, mode_choice):
 
         # Select columns w/ modes
@@ -335,7 +619,7 @@ class Submission():
         mode_choice.loc[:, "label"] = mode_choice.apply(lambda x: '{}%'.format(round(x['perc'], 1)) if x['perc']
              >= 2.0 else '', axis=1)
         mode_choice.loc[:, "label"] = mode_choice["label"].str.pad(30, side = "left")
-        data = mode_choice.to_dict(orient='list')
+        data = column_data(mode_choice)
         return data
 
     def make_mode_choice_by_time_data(self):
@@ -351,93 +635,58 @@ class Submission():
             hours = [str(h) for h in range(max_hour + 1)]
         else:
             hours = HOURS
-            max_hour = 23
 
-        # Completing the dataframe with the missing ridership bins (so that they appear in the plot)
-        df = pd.DataFrame([0, 0.0, 0.0, 0.0, 0.0, 0.0]).T
-        df.columns = ["hours"] + self.modes
-
-        for hour in range(max_hour + 1):
-            if str(hour) not in mode_choice_by_hour["hours"].values:
-                df.loc[0, "hours"] = str(hour)
-                mode_choice_by_hour = mode_choice_by_hour.append(df, ignore_index=True, sort=False)
+        # Completing the dataframe with the missing hours (so that they appear in the plot)
+        mode_choice_by_hour = complete_grid(mode_choice_by_hour, [("hours", hours)],
+                                            fill_value={mode: 0.0 for mode in self.modes})
 
         mode_choice_by_hour = mode_choice_by_hour.set_index('hours')
 
         # max_choice = mode_choice_by_hour.sum(axis=1).max() * 1.1
 
-        data = mode_choice_by_hour.reset_index().to_dict(orient='list')
+        data = column_data(mode_choice_by_hour.reset_index())
         return data 
 
     def make_mode_choice_by_income_group_data(self):
 
-        persons_cols = ['PID', 'income']
-        trips_cols = ['PID', 'realizedTripMode']
-        people_income_mode = self.persons_df[persons_cols].merge(self.trips_df[trips_cols], on=['PID'])
-        edges = [0, 10000, 25000, 50000, 75000, 100000, float('inf')]
-        bins = ['[$0, $10k)', '[$10k, $25k)', '[$25k, $50k)', '[$50k, $75k)', '[$75k, $100k)', '[$100k, inf)']
-        people_income_mode.loc[:, 'income_group'] = pd.cut(people_income_mode['income'],
-                                                           bins=edges,
-                                                           labels=bins,
-                                                           right=False).astype(str)
-        grouped = people_income_mode.groupby(by=['realizedTripMode', 'income_group']).agg('count').reset_index()
+        # Number of trips by mode and income group of the person
+        grouped = self.trip_metrics['mode_choice_by_income_group'].rename(
+            columns={'bin': 'income_group', 'value': 'PID'})
         # ymax = grouped['PID'].max() * 1.1
 
         grouped = grouped.pivot(
             index='realizedTripMode', 
             columns='income_group', 
             values='PID').reset_index().rename(columns={'index':'realizedTripMode'})
-        data = grouped.to_dict(orient='list')
+        data = column_data(grouped)
 
         return data 
 
     def make_mode_choice_by_age_group_data(self):
 
-        persons_cols = ['PID', 'Age']
-        trips_cols = ['PID', 'realizedTripMode']
-        people_age_mode = self.persons_df[persons_cols].merge(self.trips_df[trips_cols], on=['PID'])
-        edges = [0, 18, 30, 40, 50, 60, float('inf')]
-        bins = ['[{}, {})'.format(edges[i], edges[i+1]) for i in range(len(edges)-1)]
-        people_age_mode.loc[:, 'age_group'] = pd.cut(people_age_mode['Age'],
-                                                     bins=edges,
-                                                     labels=bins,
-                                                     right=False).astype(str)
-        grouped = people_age_mode.groupby(by=['realizedTripMode', 'age_group']).agg('count').reset_index()
+        # Number of trips by mode and age group of the person
+        grouped = self.trip_metrics['mode_choice_by_age_group'].rename(columns={'bin': 'age_group', 'value': 'PID'})
         # ymax = grouped['PID'].max() * 1.1
 
         grouped = grouped.pivot(
             index='realizedTripMode', 
             columns='age_group', 
             values='PID').reset_index().rename(columns={'index':'realizedTripMode'})
-        data = grouped.to_dict(orient='list')
+        data = column_data(grouped)
         return data 
 
     def make_mode_choice_by_distance_data(self):
         
-        mode_df = self.trips_df[['Trip_ID', 'Distance_m', 'realizedTripMode']].copy()
-        mode_df.loc[:,'Distance_miles'] = mode_df['Distance_m'] * 0.000621371
-
-        edges = [0, .5, 1, 1.5, 2, 2.5, 3, 3.5, 4, 5, 7.5, 10, 40]
-        bins = ['[{}, {})'.format(edges[i], edges[i+1]) for i in range(len(edges)-1)]
-        mode_df.loc[:,'Trip Distance (miles)'] = pd.cut(mode_df['Distance_miles'],
-                                                        bins=edges,
-                                                        labels=bins,
-                                                        right=False).astype(str)
-
-        mode_df_grouped = mode_df.groupby(by=['realizedTripMode', 'Trip Distance (miles)']).agg('count').reset_index()
-
-        # rename df column to num_people due to grouping
-        mode_df_grouped = mode_df_grouped.rename(index=str, columns={'Trip_ID': 'num_trips'})
-
-        for_plot = mode_df_grouped[['realizedTripMode', 'Trip Distance (miles)', 'num_trips']]
+        # Number of trips by mode and distance
+        for_plot = self.trip_metrics['mode_choice_by_distance'].rename(
+            columns={'realizedTripMode': 'Trip Mode', 'bin': 'Trip Distance (miles)', 'value': 'num_trips'})
         # max_trips = for_plot.groupby('Trip Distance (miles)')['num_trips'].sum().max() * 1.1
 
-        for_plot = for_plot.rename(columns={'realizedTripMode': 'Trip Mode'})
         for_plot = for_plot.pivot(index='Trip Distance (miles)', columns='Trip Mode', values='num_trips').reset_index()
         
         # colors = Dark2[len(self.modes)]
 
-        data = for_plot.to_dict(orient='list')
+        data = column_data(for_plot)
         return data 
 
     def make_congestion_travel_time_by_mode_data(self):
@@ -451,11 +700,11 @@ class Submission():
 
         palette = Dark2[len(self.modes)]
 
-        data=dict( 
+        data = column_data(dict(
             x=self.modes,
-            y=[travel_time[mode] for mode in self.modes],
+            y=travel_time.loc[0, self.modes].astype(float).values,
             color=palette,
-        )
+        ))
         return data
 
     def make_congestion_travel_time_per_passenger_trip_data(self):
@@ -474,18 +723,16 @@ class Submission():
 
         # max_time = travel_time.max().max() * 1.1 
 
-        data = travel_time.to_dict(orient='list')
+        data = column_data(travel_time)
         return data
 
     def make_congestion_miles_traveled_per_mode_data(self):
 
         # get_vmt_dataframe:
-        vmt_walk = round(
-            self.paths_df[self.paths_df["mode"] == "walk"]["length"].apply(lambda x: x * 0.000621371).sum(), 0)
-        vmt_bus = round(
-            self.paths_df[self.paths_df["mode"] == "bus"]["length"].apply(lambda x: x * 0.000621371).sum(), 0)
-        vmt_on_demand = round(
-            self.paths_df[self.paths_df["vehicle"].str.contains("rideHailVehicle")]["length"].apply(lambda x: x * 0.000621371).sum(), 0)
+        paths = self.path_traversal_aggregates
+        vmt_walk = round(paths.walk_length * 0.000621371, 0)
+        vmt_bus = round(paths.bus_length * 0.000621371, 0)
+        vmt_on_demand = round(paths.on_demand_length * 0.000621371, 0)
         vmt_car = round(self.legs_df[self.legs_df["Mode"] == "car"]["Distance_m"].apply(lambda x: x * 0.000621371).sum(), 0)
         vmt = pd.DataFrame({"bus": [vmt_bus], "car": [vmt_car], "OnDemand_ride": [vmt_on_demand], "walk" : [vmt_walk]})
 
@@ -497,113 +744,40 @@ class Submission():
         palette = Dark2[5]
         data = dict(modes=modes, vmt=[vmt_on_demand, vmt_car, vmt_walk, vmt_bus], 
             color=[palette[0], palette[1], palette[3], palette[4]])
-        return data
+        return column_data(data)
 
     def make_congestion_bus_vmt_by_ridership_data(self):
-        columns = ["numPassengers", "vehicleType", "length", "departureTime", "arrivalTime"]
-        vmt_bus_ridership = self.paths_df[self.paths_df["mode"] == "bus"][columns]
-        vmt_bus_ridership.loc[:, 'seatingCapacity'] = vmt_bus_ridership['vehicleType'].apply(
-            lambda x: self.seating_capacities[x])
-        vmt_bus_ridership.loc[:, 'standingRoomCapacity'] = vmt_bus_ridership['vehicleType'].apply(
-            lambda x: self.standing_room_capacities[x])
-
-        vmt_bus_ridership.loc[:, 'ridershipPerc'] = vmt_bus_ridership.apply(lambda x: calc_ridership_perc(x), axis=1)
-
-        # Split the travels by hour of the day
-        edges = range(0,25*3600,3600)
-        vmt_bus_ridership.loc[:, "Hour"] = pd.cut(vmt_bus_ridership["departureTime"], 
-                                                  bins=edges,
-                                                  labels=HOURS,
-                                                  include_lowest=True)
-
-        # Group by hours of the day and number of passengers in the bus
-        vmt_bus_ridership = vmt_bus_ridership.groupby(by=["Hour", "ridershipPerc"])['length'].sum().reset_index()
-        edges = [0, 0.01, 50, 100, 150.0, 200.0]
-        bins = [
-            'empty\n(0 passengers)', 
-            'low ridership\n(< 50% seating capacity)', 
-            'medium ridership\n(< seating capacity)', 
-            'high ridership\n(< 50% standing capacity)',
-            'crowded\n(<= standing capacity)'
-        ]
-        vmt_bus_ridership.loc[:, "ridership"] = pd.cut(vmt_bus_ridership["ridershipPerc"], 
-                                                       bins=edges,
-                                                       labels=bins,
-                                                       include_lowest=True)
-        vmt_bus_ridership.replace(np.nan, 0, inplace=True)
-        vmt_bus_ridership.loc[:, "Hour"] = vmt_bus_ridership["Hour"].astype("int")
-        # del vmt_bus_ridership['numPassengers']
-        # del vmt_bus_ridership['departureTime']
-        # del vmt_bus_ridership['arrivalTime']
-        # Completing the dataframe with the missing ridership bins (so that they appear in the plot)
-        df = pd.DataFrame([0, 0.0, ""]).T
-        df.columns = ["Hour", "length", "ridership"]
-
-        for ridership in bins:
-            for hour in range(24):
-                if len(vmt_bus_ridership[(vmt_bus_ridership['Hour'] == hour) & (vmt_bus_ridership['ridership'] == ridership)].index) == 0:
-                    df.loc[0, "ridership"] = ridership
-                    df.loc[0, "Hour"] = hour
-                    vmt_bus_ridership = vmt_bus_ridership.append(df, ignore_index=True, sort=False)
-        vmt_bus_ridership = vmt_bus_ridership.groupby(['Hour', 'ridership'])['length'].sum().reset_index().pivot(
-            index='Hour',
-            columns='ridership', 
-            values='length')
+        # Bus length by departure hour and ridership bin
+        vmt_bus_ridership = pd.DataFrame(self.path_traversal_aggregates.bus_vmt, columns=RIDERSHIP_BINS)
+        vmt_bus_ridership.index.name = 'Hour'
         # ymax = vmt_bus_ridership.sum(axis=1).max()*1.1
 
         # colors = Dark2[len(bins)]
 
-        data = vmt_bus_ridership.reset_index().to_dict(orient='list')
+        data = column_data(vmt_bus_ridership.reset_index())
         return data 
 
     def make_congestion_on_demand_vmt_by_phases_data(self):
 
-        columns = ["numPassengers", "departureTime", "length"]
-        vmt_on_demand = self.paths_df[self.paths_df["vehicle"].str.contains("rideHailVehicle")].copy()[columns]
-        # Split the travels by hour of the day
-        edges = range(0,25*3600,3600)
-        vmt_on_demand.loc[:, "Hour"] = pd.cut(vmt_on_demand["departureTime"],
-                                              bins=edges,
-                                              labels=HOURS,
-                                              right=False)
+        # On-demand length by departure hour and driving state (number of passengers)
+        vmt_on_demand = self.path_traversal_aggregates.on_demand_vmt.set_index(['Hour', 'drivingState'])['length']
         driving_states = ["fetch", "fare"]
-        vmt_on_demand.loc[:, "drivingState"] = pd.cut(vmt_on_demand["numPassengers"], 
-                                                      bins=[0, 1, 2], 
-                                                      labels=driving_states,
-                                                      right=False)
-
-        vmt_on_demand = vmt_on_demand.groupby(by=["Hour", "drivingState"])['length'].sum().reset_index()
-        vmt_on_demand.replace(np.nan, 0, inplace=True)
-        vmt_on_demand.loc[:, "Hour"] = vmt_on_demand["Hour"].astype("int")
-        vmt_on_demand = vmt_on_demand.pivot(
-            index='Hour', 
-            columns='drivingState',
-            values='length')
+        vmt_on_demand = vmt_on_demand.reindex(pd.MultiIndex.from_product(
+            [range(len(HOURS)), range(len(driving_states))], names=["Hour", "drivingState"]), fill_value=0.0)
+        vmt_on_demand = vmt_on_demand.unstack("drivingState")
+        vmt_on_demand.columns = driving_states
         # ymax = vmt_on_demand.sum(axis=1).max()*1.1
 
         # colors = Dark2[3][:len(driving_states)]
 
-        data = vmt_on_demand.reset_index().to_dict(orient='list')
+        data = column_data(vmt_on_demand.reset_index())
         return data 
 
     def make_congestion_travel_speed_data(self):
 
-        trips = self.trips_df[self.trips_df['Duration_sec'] > 0].copy()
-        
-        trips.loc[:, 'average speed (meters/sec)'] = trips['Distance_m'] / trips['Duration_sec']
-        trips.loc[:, 'Average Speed (miles/hour)'] = 2.23694 * trips['average speed (meters/sec)']
-        trips.loc[:, 'Start_time_hour'] = trips['Start_time'] / 3600
-        
-        edges = [6, 8, 10, 12, 14, 16, 18, 20, 22, 24]
-        bins = ['[{}, {})'.format(edges[i], edges[i+1]) for i in range(len(edges)-1)]
-        trips.loc[:, 'time_interval'] = pd.cut(trips['Start_time_hour'],
-                                               bins=edges,
-                                               labels=bins,
-                                               right=False).astype(str)
-
-        trips = trips.rename(index=str, columns={"time_interval": "Start time interval (hour)"})
-
-        grouped = trips.groupby(by=['Start time interval (hour)', 'realizedTripMode'])['Average Speed (miles/hour)'].mean().reset_index()
+        # Average speed of the trips by mode and start time interval
+        grouped = self.trip_metrics['travel_speed'].rename(
+            columns={'bin': 'Start time interval (hour)', 'value': 'Average Speed (miles/hour)'})
         # max_speed = grouped['Average Speed (miles/hour)'].max() * 1.2
 
         grouped = grouped.pivot(
@@ -612,31 +786,13 @@ class Submission():
             values='Average Speed (miles/hour)')
         grouped = grouped.reset_index().rename(columns={'index':'Start time interval (hour)'})
 
-        data = grouped.to_dict(orient='list')
+        data = column_data(grouped)
         return data 
 
     def make_los_travel_expenditure_data(self):
 
-        trips = self.trips_df.copy()
-        trips.loc[:, 'trip_cost'] = np.zeros(trips.shape[0])
-
-        trips.loc[trips['realizedTripMode'] == 'car', 'trip_cost'] = \
-            trips[trips['realizedTripMode'] == 'car']['FuelCost'].values
-
-        fare_modes = ['walk_transit', 'drive_transit', 'OnDemand_ride']
-        trips.loc[trips['realizedTripMode'].isin(fare_modes), 'trip_cost'] = \
-            trips[trips['realizedTripMode'].isin(fare_modes)]['Fare'].values - \
-            trips[trips['realizedTripMode'].isin(fare_modes)]['Incentive'].values
-
-        trips.loc[trips['realizedTripMode'] == 'drive_transit', 'trip_cost'] = \
-            trips[trips['realizedTripMode'] == 'drive_transit']['trip_cost'].values + \
-            trips[trips['realizedTripMode'] == 'drive_transit']['FuelCost'].values
-
-        trips.loc[trips['trip_cost'] < 0,:] = 0
-        trips.loc[:, "hour_of_day"] = np.floor(trips.Start_time/3600)
-
-        grouped = trips.groupby(by=["realizedTripMode", "hour_of_day"])["trip_cost"].mean().reset_index()
-        grouped = grouped[grouped['realizedTripMode'] != 0]
+        # Average cost of the trips by mode and hour of the day (trips with a negative cost are left out)
+        grouped = self.trip_metrics['travel_expenditure'].rename(columns={'bin': 'hour_of_day', 'value': 'trip_cost'})
         # max_cost = grouped['trip_cost'].max() * 1.1
 
         grouped = grouped.pivot(
@@ -645,86 +801,46 @@ class Submission():
             values='trip_cost')
         grouped = grouped.reset_index().rename(columns={'index':'hour_of_day'})
 
-        data = grouped.to_dict(orient='list')
+        data = column_data(grouped)
         return data 
 
     def make_los_crowding_data(self):
 
-        columns = ["vehicle", "numPassengers", "departureTime", "arrivalTime", "vehicleType"]
-        bus_slice_df = self.paths_df[self.paths_df["mode"] == "bus"].copy()[columns]
-
-        bus_slice_df.loc[:, "route_id"] = bus_slice_df['vehicle'].apply(lambda x: self.trip_to_route[x.split(":")[1].split('-')[0]])
-        bus_slice_df.loc[:, "serviceTime"] = (bus_slice_df['arrivalTime'] - bus_slice_df['departureTime']) / 3600
-        bus_slice_df.loc[:, "seatingCapacity"] = bus_slice_df['vehicleType'].apply(
-            lambda x: TRANSIT_SCALE_FACTOR * self.seating_capacities[x])
-        bus_slice_df.loc[:, "passengerOverflow"] = bus_slice_df['numPassengers'] > bus_slice_df['seatingCapacity']
-        # AM peak = 7am-10am, PM Peak = 5pm-8pm, Early Morning, Midday, Late Evening = in between
-        bins = [0, 25200, 36000, 61200, 72000, 86400]
-        labels = ["Early Morning (12a-7a)", "AM Peak (7a-10a)", "Midday (10a-5p)", "PM Peak (5p-8p)", "Late Evening (8p-12a)"]
-        bus_slice_df.loc[:, "servicePeriod"] = pd.cut(bus_slice_df['departureTime'],
-                                                      bins=bins,
-                                                      labels=labels)
-        grouped_data = bus_slice_df[bus_slice_df['passengerOverflow']].groupby([
-            "route_id", "servicePeriod"])["serviceTime"].sum().fillna(0).reset_index()
+        # Service time of the buses carrying more passengers than their seats, by route and service period
+        grouped_data = self.path_traversal_aggregates.crowding.copy()
+        labels = SERVICE_PERIODS
+        grouped_data.loc[:, "servicePeriod"] = grouped_data["servicePeriod"].astype(int)
         # max_crowding = grouped_data['serviceTime'].max() * 1.1
 
-        grouped_data = reset_index(grouped_data.pivot(
-            index='route_id', 
-            columns='servicePeriod', 
-            values='serviceTime')).rename(columns={'index':'route_id'})
-
-        # Completing the dataframe with the missing service periods and route_ids (so that they appear in the plot)
-        for label in labels:
-            if label not in grouped_data.columns:
-                grouped_data.loc[:, label] = 0.0
-        
-        df = pd.DataFrame(['', 0.0, 0.0, 0.0, 0.0, 0.0]).T
-        df.columns = ["route_id"] + labels
+        grouped_data = grouped_data.set_index(["route_id", "servicePeriod"])["serviceTime"].unstack(
+            "servicePeriod", fill_value=0.0).reindex(columns=range(len(labels)), fill_value=0.0)
+        grouped_data.columns = labels
+        grouped_data = reset_index(grouped_data)
 
-        for route_id in ROUTE_IDS:
-            if route_id not in set(grouped_data['route_id']):
-                df.loc[0, "route_id"] = route_id
-                grouped_data = grouped_data.append(df, ignore_index=True, sort=False)
+        # Completing the dataframe with the missing route_ids (so that they appear in the plot), the missing service
+        # periods being completed by the reindexing above
+        grouped_data = complete_grid(grouped_data, [("route_id", ROUTE_IDS)], fill_value=0.0)
 
         grouped_data.loc[:, 'route_id'] = grouped_data.loc[:, 'route_id'].astype(str)
-        data = grouped_data.to_dict(orient='list')
+        data = column_data(grouped_data)
         return data 
 
     def make_transit_cb_data(self):
 
-        columns = ["vehicle", "numPassengers", "departureTime", "arrivalTime", "FuelCost", "vehicleType"]
-        bus_slice_df = self.paths_df.loc[self.paths_df["mode"] == "bus"].copy()[columns]
-
-        bus_slice_df.loc[:, "route_id"] = bus_slice_df['vehicle'].apply(lambda x: self.trip_to_route[x.split(":")[-1].split('-')[0]])
-        bus_slice_df.loc[:, "operational_costs_per_bus"] = bus_slice_df['vehicleType'].apply(lambda x: self.operational_costs[x])
-        bus_slice_df.loc[:, "serviceTime"] = (bus_slice_df['arrivalTime'] - bus_slice_df['departureTime']) / 3600
-        bus_slice_df.loc[:, "OperationalCosts"] = bus_slice_df['operational_costs_per_bus'] * bus_slice_df['serviceTime']
-
-        columns = ["Veh", "Fare"]
-        bus_fare_df = self.legs_df[self.legs_df["Mode"] == "bus"].copy()[columns]
-
-        bus_fare_df.loc[:, "route_id"] = bus_fare_df['Veh'].apply(
-            lambda x: self.trip_to_route[x.split(":")[-1].split('-')[0].split('-')[0]])
-        
-        merged_df = pd.merge(bus_slice_df, bus_fare_df, on=["route_id"])
-
         labels = ["OperationalCosts", "FuelCost", "Fare"]
         costs_labels = labels[:2]
         benefits_labels = ["Fare"]
 
-        grouped_data = merged_df.groupby(by="route_id")[labels].sum()
+        # Both sides are reduced to one row per route before being joined
+        grouped_data = transit_cost_benefit(self.path_traversal_aggregates.bus_costs,
+                                            bus_fares_by_route(self.legs_df, self.route_index))
 
         # max_cost = grouped_data.sum(axis=1).max() * 1.1
         grouped_data.reset_index(inplace=True)
 
         # Completing the dataframe with the missing route_ids (so that they appear in the plot)
-        df = pd.DataFrame(['', 0.0, 0.0, 0.0]).T
-        df.columns = ["route_id"] + labels
-
-        for route_id in ROUTE_IDS:
-            if int(route_id) not in grouped_data['route_id'].values:
-                df.loc[0, "route_id"] = int(route_id)
-                grouped_data = grouped_data.append(df, ignore_index=True, sort=False)
+        grouped_data = complete_grid(grouped_data, [("route_id", [int(route_id) for route_id in ROUTE_IDS])],
+                                     fill_value=0.0)
         grouped_data.sort_values('route_id', inplace=True)
 
         grouped_data.loc[:, 'route_id'] = grouped_data.loc[:, 'route_id'].astype(str)
@@ -733,28 +849,15 @@ class Submission():
 
         # colors = Dark2[len(labels)]
 
-        costs_data = grouped_data[['route_id'] + costs_labels].to_dict(orient='list')
-        benefits_data = grouped_data[['route_id'] + benefits_labels].to_dict(orient='list')
+        costs_data = column_data(grouped_data[['route_id'] + costs_labels])
+        benefits_data = column_data(grouped_data[['route_id'] + benefits_labels])
         return costs_data, benefits_data
 
     def make_transit_inc_by_mode_data(self):
         
-        columns = ['FuelCost', 'Fare', 'Start_time', 'realizedTripMode', 'Incentive']
-        trips = self.trips_df.copy()[columns]
-
-        trips.loc[:, 'trip_cost'] = np.zeros(trips.shape[0])
-        trips.loc[:, 'ride_expenditure'] = trips['Fare'] - trips['Incentive']
-        ride_modes = set(['walk_transit', 'drive_transit', 'OnDemand_ride'])
-
-        trips.loc[trips['realizedTripMode'] == 'car', 'trip_cost'] = trips[trips['realizedTripMode'] == 'car']['FuelCost'].values
-        trips.loc[trips['realizedTripMode'].isin(ride_modes), 'trip_cost'] = trips[trips['realizedTripMode'].isin(ride_modes)]['ride_expenditure'].values
-        trips.loc[trips['realizedTripMode'] == 'drive_transit', 'trip_cost'] += trips[trips['realizedTripMode'] == 'drive_transit']['FuelCost'].values
-
-        trips.loc[:, 'Incentives distributed'] = trips['Incentive'].values
-        trips.loc[trips['trip_cost'] < 0, 'Incentives distributed'] -= trips[trips['trip_cost'] < 0]['trip_cost'].values
-
-        trips.loc[:, "hour_of_day"] = np.floor(trips['Start_time'] / 3600).astype(int)
-        grouped = trips.groupby(by=["realizedTripMode", "hour_of_day"])["Incentives distributed"].sum().reset_index()
+        # Incentives distributed by mode and hour of the day
+        grouped = self.trip_metrics['incentives_distributed'].rename(
+            columns={'bin': 'hour_of_day', 'value': 'Incentives distributed'})
 
         # max_incentives = grouped['Incentives distributed'].max() * 1.1
         # if max_incentives == 0:
@@ -766,20 +869,16 @@ class Submission():
             values='Incentives distributed')
         grouped = grouped.reset_index().rename(columns={'index':'hour_of_day'})
 
-        data = grouped.to_dict(orient='list')
+        data = column_data(grouped)
         return data 
 
     def make_sustainability_25pm_per_mode_data(self):
         
-        columns = ["vehicle", "mode", "length", "departureTime"]
-        vmt = self.paths_df.copy()[columns]
+        paths = self.path_traversal_aggregates
 
         # emissions for each mode
-        emissions_bus = round(
-            vmt[vmt["mode"] == "bus"]["length"].apply(lambda x: x * 0.000621371 * 0.259366648).sum(), 0)
-        emissions_on_demand = round(
-            vmt[vmt["vehicle"].str.contains("rideHailVehicle")]["length"].apply(
-                lambda x: x * 0.000621371 * 0.001716086).sum(), 0)
+        emissions_bus = round(paths.bus_length * 0.000621371 * 0.259366648, 0)
+        emissions_on_demand = round(paths.on_demand_length * 0.000621371 * 0.001716086, 0)
         emissions_car = round(
             self.legs_df[self.legs_df["Mode"] == "car"]["Distance_m"].apply(lambda x: x * 0.000621371 * 0.001716086).sum(), 0)
 
@@ -792,4 +891,4 @@ class Submission():
         
         palette = Dark2[len(modes)]
         data=dict(modes=modes, emissions=[emissions_on_demand, emissions_car, emissions_bus], color=palette)
-        return data
+        return column_data(data)
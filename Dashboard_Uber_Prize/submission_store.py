@@ -0,0 +1,311 @@
+import glob
+import os
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import partial
+from os.path import dirname, isdir, join
+import pandas as pd
+import yaml
+
+from bundle import SubmissionBundle, read_bundle, write_bundle
+from submission import DATA_SOURCES, RAW_RETENTION, Submission
+
+# Memory the raw frames of all built submissions may use together before the least recently used ones are
+# released, in MB
+RAW_MEMORY_BUDGET_MB = int(os.environ.get('DASHBOARD_RAW_MEMORY_BUDGET_MB', 2048))
+
+# Number of worker processes loading all the submissions when the server starts. By default (0) each submission is
+# only loaded when first selected, a preload of all of them being opt-in.
+LOAD_WORKERS = int(os.environ.get('DASHBOARD_LOAD_WORKERS', 0))
+
+# Threads loading submissions and computing their data sources for the sessions, in the background of the server
+# event loop
+BACKGROUND_THREADS = int(os.environ.get('DASHBOARD_BACKGROUND_THREADS', 4))
+BACKGROUND_EXECUTOR = ThreadPoolExecutor(max_workers=BACKGROUND_THREADS)
+
+
+def find_submissions():
+
+    path = join(dirname(__file__), 'data/submissions/')
+    new_dirs = {'/'.join(f.split('/')[-2:]) for f in glob.glob(join(path, '*/*')) if isdir(f)}
+
+    cols = ['submission_dir', 'show']
+    try:
+        submission_dirs = pd.read_csv(join(dirname(__file__), 'submission_files.csv'))
+    except IOError:
+        submission_dirs = pd.DataFrame(columns=cols)
+
+    old_dirs = set(submission_dirs['submission_dir'])
+
+    removed_dirs = old_dirs.difference(new_dirs)
+    added_dirs = new_dirs.difference(old_dirs)
+
+    added = pd.DataFrame.from_records([(added_dir, 1) for added_dir in added_dirs], columns=cols)
+    submission_dirs = pd.concat([submission_dirs, added], ignore_index=True, sort=False)
+    submission_dirs.loc[submission_dirs['submission_dir'].isin(removed_dirs), 'show'] = 0
+
+    if len(removed_dirs) or len(added_dirs):
+        submission_dirs.to_csv(join(dirname(__file__), 'submission_files.csv'), index=False)
+
+    if len(removed_dirs):
+        print("Can't find the following submissions, hiding for now:")
+        print('\n'.join(['\t{}'.format(removed_dir) for removed_dir in removed_dirs]))
+
+    if len(added_dirs):
+        print('The following submissions were added:')
+        print('\n'.join(['\t{}'.format(added_dir) for added_dir in added_dirs]))
+
+    return submission_dirs
+
+
+def load_submission(scenario, name, retention=RAW_RETENTION):
+    """ Returns the precomputed bundle of a submission, or a lazy Submission reading its raw files as its data
+    sources are first accessed if the bundle is missing or stale (bundles are written by `precompute.py`), with the
+    `retention` policy for its raw frames.
+    """
+    submission = read_bundle(scenario, name)
+    if submission is None:
+        submission = Submission(name=name, scenario=scenario, lazy=True, retention=retention)
+    return submission
+
+
+def build_submission_data(scenario, name):
+    """ Returns the data sources of a submission, from its bundle or computed from its raw files (in which case a
+    new bundle is saved). Runs in the worker processes of `SubmissionStore.load`, which only send the data back.
+    """
+    submission = read_bundle(scenario, name)
+    if submission is None:
+        submission = Submission(name=name, scenario=scenario)
+        try:
+            write_bundle(submission)
+        except (IOError, OSError):
+            pass
+    return {data_source: getattr(submission, data_source) for data_source in DATA_SOURCES}
+
+
+def load_submission_data(scenario_submission):
+    # Worker process entry point of `SubmissionStore.load`, never raises so that failures stay per submission
+    start = time.time()
+    scenario, name = scenario_submission.split('/')
+    try:
+        return scenario_submission, build_submission_data(scenario, name), None, time.time() - start
+    except Exception:
+        return scenario_submission, None, traceback.format_exc(), time.time() - start
+
+
+def read_submission_dirs():
+    """ Returns the list of "scenario/submission" pairs to show, from `submission_files_override.csv` if it exists
+    and from the data directory otherwise.
+    """
+    try:
+        submission_dirs = pd.read_csv(join(dirname(__file__), 'submission_files_override.csv'))
+    except IOError:
+        submission_dirs = find_submissions()
+    return submission_dirs.loc[submission_dirs['show'] == 1, 'submission_dir'].to_list()
+
+
+class SubmissionStore():
+
+    def __init__(self, raw_memory_budget_mb=RAW_MEMORY_BUDGET_MB, retention=RAW_RETENTION):
+        """
+        Process-wide store of built submissions (Submission or SubmissionBundle objects) and scenario KPI
+        categories.
+
+        Bokeh re-runs `main.py` for every new browser session, but imported modules are only loaded once per
+        server process, so a store living here is shared by every session. Each submission is built once, under
+        its own lock, so that concurrent sessions asking for the same submission wait for a single build instead
+        of all building it.
+
+        Submissions built from their raw files hold their raw frames according to the `retention` policy (see
+        RAW_RETENTION_POLICIES). The raw frames they keep are released in least recently used order whenever they
+        use more than `raw_memory_budget_mb` MB together. The computed data sources are always kept.
+
+        Parameters
+        ----------
+        raw_memory_budget_mb : int
+        retention : str
+
+        Returns
+        -------
+        None
+        """
+        self._lock = threading.Lock()
+        self._build_locks = {}
+        self._submissions = {}
+        self._in_flight = {}
+        self._generations = {}
+        self._categories = {}
+        self._raw_memory = OrderedDict()
+        self.raw_memory_budget = raw_memory_budget_mb * 1024 ** 2
+        self.retention = retention
+        self.hits = 0
+        self.misses = 0
+        # "scenario/submission" pairs to show (None until set), and a counter of their updates
+        self.submissions = None
+        self.version = 0
+
+    def get(self, scenario, name):
+        """ Returns the submission for `scenario`/`name`, loading it on the first request.
+        """
+        key = (scenario, name)
+        with self._lock:
+            if key in self._submissions:
+                self.hits += 1
+                self._touch(key)
+                return self._submissions[key]
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                if key in self._submissions:
+                    self.hits += 1
+                    self._touch(key)
+                    return self._submissions[key]
+                self.misses += 1
+            submission = load_submission(scenario, name, self.retention)
+            with self._lock:
+                self._submissions[key] = submission
+                self._touch(key)
+        return submission
+
+    def get_data(self, scenario, name, data_sources):
+        """ Returns the data of each of `data_sources` for the submission `scenario`/`name`, loading it and
+        computing them if needed.
+        """
+        submission = self.get(scenario, name)
+        data = {data_source: getattr(submission, data_source) for data_source in data_sources}
+        # Computing the data sources may have read raw frames (or released some), so their memory usage is
+        # measured again now that they are built
+        with self._lock:
+            if self._submissions.get((scenario, name)) is submission:
+                self._touch((scenario, name))
+        return data
+
+    def submit_data(self, scenario, name, data_sources):
+        """ Returns a Future of `get_data`, run on BACKGROUND_EXECUTOR. Concurrent requests for the same data
+        sources of a submission share the same Future.
+        """
+        key = (scenario, name, tuple(data_sources))
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is None:
+                future = BACKGROUND_EXECUTOR.submit(self.get_data, scenario, name, data_sources)
+                self._in_flight[key] = future
+        future.add_done_callback(partial(self._done, key))
+        return future
+
+    def _done(self, key, future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def set_submissions(self, submissions):
+        '''Sets the "scenario/submission" pairs to show in the sessions'''
+        with self._lock:
+            self.submissions = list(submissions)
+            self.version += 1
+
+    def evict(self, scenario, name):
+        """ Drops a submission from the store, so that it is loaded again from its files when next requested.
+        """
+        key = (scenario, name)
+        with self._lock:
+            self._submissions.pop(key, None)
+            self._raw_memory.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def generation(self, scenario, name):
+        '''Returns the number of times a submission was evicted, for sessions to detect the reloaded ones'''
+        with self._lock:
+            return self._generations.get((scenario, name), 0)
+
+    def _touch(self, key):
+        # Marks the raw frames of `key` as the most recently used, measuring their memory usage again since lazy
+        # submissions read their raw frames as their data sources are computed
+        submission = self._submissions[key]
+        self._raw_memory.pop(key, None)
+        raw_memory = submission.raw_memory_usage() if isinstance(submission, Submission) else 0
+        if raw_memory:
+            self._raw_memory[key] = raw_memory
+            self._evict()
+
+    def _evict(self):
+        # Releases raw frames, least recently used first, until they fit in the memory budget
+        while self._raw_memory and sum(self._raw_memory.values()) > self.raw_memory_budget:
+            key, _ = self._raw_memory.popitem(last=False)
+            self._submissions[key].release_raw_frames()
+
+    def get_categories(self, scenario):
+        """ Returns the ordered KPI categories of `scenario` from its `kpis.yaml` file.
+        """
+        with self._lock:
+            if scenario not in self._categories:
+                with open(join(dirname(__file__), 'data/submissions', scenario, 'kpis.yaml')) as kpis:
+                    self._categories[scenario] = yaml.safe_load(kpis)
+            return self._categories[scenario]
+
+    def load(self, submissions, workers=LOAD_WORKERS):
+        """ Loads every "scenario/submission" pair of `submissions` that is not in the store yet, in `workers`
+        processes.
+
+        Workers only send back the data sources of their submissions, which are stored as SubmissionBundle objects.
+        Progress is printed per submission. A submission failing to load is reported and left out of the store (it
+        will be loaded again, lazily, if selected) without stopping the others.
+
+        Returns
+        -------
+        failed: list of str
+            Pairs that failed to load
+        """
+        with self._lock:
+            pending = [scenario_submission for scenario_submission in submissions
+                       if tuple(scenario_submission.split('/')) not in self._submissions]
+        for scenario in {scenario_submission.split('/')[0] for scenario_submission in pending}:
+            self.get_categories(scenario)
+        if not pending:
+            return []
+
+        failed = []
+        with ProcessPoolExecutor(max_workers=max(1, min(workers, len(pending)))) as executor:
+            futures = [executor.submit(load_submission_data, scenario_submission) for scenario_submission in pending]
+            for i, future in enumerate(as_completed(futures)):
+                scenario_submission, data, error, duration = future.result()
+                if error is not None:
+                    failed.append(scenario_submission)
+                    print('[{}/{}] {}: failed ({:.1f}s)\n{}'.format(
+                        i + 1, len(pending), scenario_submission, duration, error))
+                    continue
+                scenario, name = scenario_submission.split('/')
+                with self._lock:
+                    self._submissions.setdefault((scenario, name), SubmissionBundle(name, scenario, data))
+                print('[{}/{}] {}: loaded ({:.1f}s)'.format(i + 1, len(pending), scenario_submission, duration))
+        return failed
+
+    def memory_usage(self):
+        """ Returns the memory used by the raw frames ("raw_mb") and the data sources ("data_mb") of each
+        submission held, in MB, keyed by "scenario/submission" pair.
+        """
+        with self._lock:
+            submissions = list(self._submissions.items())
+        usage = {}
+        for (scenario, name), submission in submissions:
+            memory = submission.memory_usage()
+            usage['{}/{}'.format(scenario, name)] = {'raw_mb': memory['raw'] / 1024 ** 2,
+                                                    'data_mb': memory['data'] / 1024 ** 2}
+        return usage
+
+    def stats(self):
+        """ Returns the hit and miss counters, the number of submissions held and the memory used by their raw
+        frames and data sources.
+        """
+        usage = self.memory_usage()
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._submissions),
+                    'raw_memory_mb': sum(memory['raw_mb'] for memory in usage.values()),
+                    'data_memory_mb': sum(memory['data_mb'] for memory in usage.values())}
+
+
+SUBMISSION_STORE = SubmissionStore()
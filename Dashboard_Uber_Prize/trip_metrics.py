@@ -0,0 +1,198 @@
+import numpy as np
+import pandas as pd
+
+from identifiers import get_indexer
+
+# Trip metrics of the dashboard, all grouped by realized trip mode and computed together by `compute_trip_metrics`.
+# Each metric reduces a column of `trip_columns` ("values", not needed to count trips) over the bins of another
+# one ("column"). "edges" and "labels" define the bins as in `pd.cut` with right=False. Values outside of the edges
+# fall in a "nan" bin, as they would after `pd.cut(...).astype(str)`. Without edges, each distinct value of
+# "column" is a bin. Only the trips where the "mask" column is True are included. Missing values are skipped by the
+# "mean" and "sum" reducers, as they are by `groupby(...).mean()` and `groupby(...).sum()`.
+DISTANCE_EDGES = [0, .5, 1, 1.5, 2, 2.5, 3, 3.5, 4, 5, 7.5, 10, 40]
+AGE_EDGES = [0, 18, 30, 40, 50, 60, float('inf')]
+INCOME_EDGES = [0, 10000, 25000, 50000, 75000, 100000, float('inf')]
+SPEED_EDGES = [6, 8, 10, 12, 14, 16, 18, 20, 22, 24]
+
+TRIP_METRICS = {
+    'mode_choice_by_age_group': {
+        'column': 'Age',
+        'edges': AGE_EDGES,
+        'labels': ['[{}, {})'.format(AGE_EDGES[i], AGE_EDGES[i + 1]) for i in range(len(AGE_EDGES) - 1)],
+        'reducer': 'count',
+        'mask': 'has_person'
+    },
+    'mode_choice_by_income_group': {
+        'column': 'income',
+        'edges': INCOME_EDGES,
+        'labels': ['[$0, $10k)', '[$10k, $25k)', '[$25k, $50k)', '[$50k, $75k)', '[$75k, $100k)', '[$100k, inf)'],
+        'reducer': 'count',
+        'mask': 'has_person'
+    },
+    'mode_choice_by_distance': {
+        'column': 'Distance_miles',
+        'edges': DISTANCE_EDGES,
+        'labels': ['[{}, {})'.format(DISTANCE_EDGES[i], DISTANCE_EDGES[i + 1])
+                   for i in range(len(DISTANCE_EDGES) - 1)],
+        'reducer': 'count'
+    },
+    'travel_speed': {
+        'column': 'Start_time_hour',
+        'edges': SPEED_EDGES,
+        'labels': ['[{}, {})'.format(SPEED_EDGES[i], SPEED_EDGES[i + 1]) for i in range(len(SPEED_EDGES) - 1)],
+        'values': 'Average Speed (miles/hour)',
+        'reducer': 'mean',
+        'mask': 'has_duration'
+    },
+    'travel_expenditure': {
+        'column': 'hour_of_day',
+        'values': 'trip_cost',
+        'reducer': 'mean',
+        'mask': 'has_cost'
+    },
+    'incentives_distributed': {
+        'column': 'hour',
+        'values': 'Incentives distributed',
+        'reducer': 'sum'
+    }
+}
+
+# Modes whose trips cost their fare minus incentive
+FARE_MODES = ['walk_transit', 'drive_transit', 'OnDemand_ride']
+
+
+def trip_columns(trips, persons):
+    """ Returns the columns the trip metrics are computed from, as arrays aligned with `trips`.
+
+    Parameters
+    ----------
+    trips: pandas dataframe
+        trips_dataframe.csv input file
+
+    persons: pandas dataframe
+        persons_dataframe.csv input file
+
+    Returns
+    -------
+    columns: dict of np.ndarray
+    """
+    mode = trips['realizedTripMode']
+    duration = trips['Duration_sec'].values
+    start_time = trips['Start_time'].values
+    fuel_cost = trips['FuelCost'].values
+    fare = trips['Fare'].values
+    incentive = trips['Incentive'].values
+
+    # Attributes of the person of each trip, the position -1 of the trips without a person picking a trailing NaN
+    person = get_indexer(persons['PID'], trips['PID'])
+    has_person = person >= 0
+
+    trip_cost = np.zeros(len(trips))
+    is_car = (mode == 'car').values
+    is_fare_mode = mode.isin(FARE_MODES).values
+    is_drive_transit = (mode == 'drive_transit').values
+    trip_cost[is_car] = fuel_cost[is_car]
+    trip_cost[is_fare_mode] = fare[is_fare_mode] - incentive[is_fare_mode]
+    trip_cost[is_drive_transit] += fuel_cost[is_drive_transit]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        speed = 2.23694 * (trips['Distance_m'].values / duration)
+
+    return {
+        'has_person': has_person,
+        'Age': np.append(persons['Age'].values.astype(float), np.nan).take(person),
+        'income': np.append(persons['income'].values.astype(float), np.nan).take(person),
+        'Distance_miles': trips['Distance_m'].values * 0.000621371,
+        'has_duration': duration > 0,
+        'Average Speed (miles/hour)': speed,
+        'Start_time_hour': start_time / 3600,
+        'hour_of_day': np.floor(start_time / 3600),
+        'hour': np.floor(start_time / 3600).astype(int),
+        'trip_cost': trip_cost,
+        # Trips of unknown cost are kept, their cost being skipped by the mean
+        'has_cost': ~(trip_cost < 0),
+        'Incentives distributed': np.where(trip_cost < 0, incentive - trip_cost, incentive)
+    }
+
+
+def bin_codes(values, spec):
+    """ Returns the integer bin code of each value for the metric `spec`, and the label of each bin.
+    """
+    if spec.get('edges') is None:
+        codes, uniques = pd.factorize(values)
+        return codes, list(uniques)
+    edges = np.asarray(spec['edges'], dtype=float)
+    codes = np.searchsorted(edges, values, side='right') - 1
+    # Values outside of the edges (or NaN) go to the extra "nan" bin
+    codes[(codes < 0) | (codes >= len(edges) - 1) | np.isnan(values)] = len(edges) - 1
+    return codes, list(spec['labels']) + ['nan']
+
+
+def compute_trip_metrics(trips, persons, specs=TRIP_METRICS):
+    """ Computes every metric of `specs` in a single vectorized pass: the (mode, bin) group code of each trip is
+    offset so that the groups of all metrics are distinct, and the trip counts, value counts and value sums of all
+    groups are accumulated by one `np.bincount` each.
+
+    Parameters
+    ----------
+    trips: pandas dataframe
+        trips_dataframe.csv input file
+
+    persons: pandas dataframe
+        persons_dataframe.csv input file
+
+    specs: dict
+        Metric specifications, see TRIP_METRICS
+
+    Returns
+    -------
+    metrics: dict of pandas dataframe
+        For each metric, its value ("value") by mode ("realizedTripMode") and bin label ("bin"), for the non empty
+        groups
+    """
+    columns = trip_columns(trips, persons)
+    modes = trips['realizedTripMode'].astype('category').cat
+    mode_codes = modes.codes.values
+    n_modes = len(modes.categories)
+
+    offset = 0
+    layouts = []
+    codes = []
+    weights = []
+    for name, spec in specs.items():
+        bins, labels = bin_codes(columns[spec['column']], spec)
+        valid = (mode_codes >= 0) & (bins >= 0)
+        if spec.get('mask'):
+            valid &= columns[spec['mask']]
+        codes.append(offset + mode_codes[valid].astype(np.int64) * len(labels) + bins[valid])
+        weights.append(columns[spec['values']][valid] if spec.get('values') else np.zeros(valid.sum()))
+        layouts.append((name, spec, labels, offset))
+        offset += n_modes * len(labels)
+
+    codes = np.concatenate(codes)
+    weights = np.concatenate(weights).astype(float)
+    present = ~np.isnan(weights)
+    counts = np.bincount(codes, minlength=offset)
+    value_counts = np.bincount(codes, weights=present, minlength=offset)
+    sums = np.bincount(codes, weights=np.where(present, weights, 0.0), minlength=offset)
+
+    metrics = {}
+    for name, spec, labels, start in layouts:
+        group_counts = counts[start:start + n_modes * len(labels)]
+        group_value_counts = value_counts[start:start + n_modes * len(labels)]
+        group_sums = sums[start:start + n_modes * len(labels)]
+        observed = np.flatnonzero(group_counts)
+        if spec['reducer'] == 'count':
+            values = group_counts[observed]
+        elif spec['reducer'] == 'sum':
+            values = group_sums[observed]
+        else:
+            # Groups without any value have a NaN mean
+            with np.errstate(divide='ignore', invalid='ignore'):
+                values = group_sums[observed] / group_value_counts[observed]
+        metrics[name] = pd.DataFrame({
+            'realizedTripMode': np.asarray(modes.categories).take(observed // len(labels)).astype(str),
+            'bin': pd.Series(labels, dtype=object).take(observed % len(labels)).values,
+            'value': values
+        }, columns=['realizedTripMode', 'bin', 'value'])
+    return metrics
@@ -0,0 +1,102 @@
+import os
+import threading
+import traceback
+
+from bundle import source_fingerprints
+from submission_store import LOAD_WORKERS, read_submission_dirs
+
+# Seconds between two scans of the submissions directory, 0 to disable the watcher
+WATCH_INTERVAL = float(os.environ.get('DASHBOARD_WATCH_INTERVAL', 10))
+
+
+def submission_fingerprint(scenario_submission):
+    '''Returns the fingerprint of the source files of a submission, or None while some of them are missing'''
+    try:
+        return source_fingerprints(*scenario_submission.split('/'))
+    except (OSError, ValueError):
+        return None
+
+
+class SubmissionWatcher():
+
+    def __init__(self, store, interval=WATCH_INTERVAL, workers=LOAD_WORKERS, score_index=None):
+        """
+        Polls the submissions directory for added, removed or changed submissions (a change being any change of
+        size or modification time of their source files), and updates only those in `store`: removed and changed
+        submissions are evicted, added and changed ones loaded in `workers` processes (or when first selected if
+        `workers` is 0). Sessions pick up the new list of submissions and the reloaded ones from the store. The
+        score files of the new and changed submissions are also read again in `score_index`, if given.
+
+        Parameters
+        ----------
+        store : SubmissionStore
+        interval : float
+            Seconds between two scans
+        workers : int
+        score_index : ScoreIndex
+
+        Returns
+        -------
+        None
+        """
+        self.store = store
+        self.interval = interval
+        self.workers = workers
+        self.score_index = score_index
+        self.fingerprints = {}
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def scan(self):
+        '''Returns the fingerprint of every submission to show'''
+        return {scenario_submission: submission_fingerprint(scenario_submission)
+                for scenario_submission in read_submission_dirs()}
+
+    def poll(self):
+        """ Compares the submissions with the previous scan and updates the store accordingly.
+
+        Returns
+        -------
+        added, removed, changed: list of str
+            "scenario/submission" pairs
+        """
+        fingerprints = self.scan()
+        added = sorted(set(fingerprints).difference(self.fingerprints))
+        removed = sorted(set(self.fingerprints).difference(fingerprints))
+        changed = sorted(scenario_submission for scenario_submission in set(fingerprints).intersection(self.fingerprints)
+                         if fingerprints[scenario_submission] != self.fingerprints[scenario_submission])
+        self.fingerprints = fingerprints
+
+        for scenario_submission in removed + changed:
+            self.store.evict(*scenario_submission.split('/'))
+        if added or removed:
+            self.store.set_submissions(sorted(fingerprints))
+        if changed:
+            print('The following submissions changed, reloading:')
+            print('\n'.join(['\t{}'.format(scenario_submission) for scenario_submission in changed]))
+
+        # Submissions still being copied are loaded once all their files are there
+        ready = [scenario_submission for scenario_submission in added + changed
+                 if fingerprints[scenario_submission] is not None]
+        if ready and self.workers > 0:
+            self.store.load(ready, self.workers)
+        if self.score_index is not None:
+            self.score_index.update(sorted(fingerprints))
+        return added, removed, changed
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                traceback.print_exc()
+
+    def start(self):
+        '''Takes the current submissions as reference and starts polling in a daemon thread'''
+        self.fingerprints = self.scan()
+        self.thread = threading.Thread(target=self.run, name='submission-watcher')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
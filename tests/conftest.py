@@ -0,0 +1,5 @@
+import sys
+from os.path import dirname, join
+
+# The dashboard modules import each other as top-level modules, the way `bokeh serve` runs them
+sys.path.insert(0, join(dirname(dirname(__file__)), 'Dashboard_Uber_Prize'))
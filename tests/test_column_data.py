@@ -0,0 +1,18 @@
+import numpy as np
+import pandas as pd
+
+from submission import BINARY_MIN_LENGTH, column_data
+
+
+def test_column_data():
+    n = BINARY_MIN_LENGTH
+    data = column_data(pd.DataFrame({
+        'mode': ['car'] * n,
+        'count': np.arange(n),
+        'vmt': np.linspace(0, 1, n)
+    }))
+    assert isinstance(data['vmt'], np.ndarray) and data['vmt'].dtype == np.float64
+    assert data['count'] == list(range(n)) and data['mode'] == ['car'] * n
+
+    short = column_data({'vmt': [0.5, 1.5], 'xs': [[0.0, 1.0], [2.0, 3.0]]})
+    assert short == {'vmt': [0.5, 1.5], 'xs': [[0.0, 1.0], [2.0, 3.0]]}
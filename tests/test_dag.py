@@ -0,0 +1,40 @@
+import threading
+
+import pytest
+
+from dag import run_graph
+
+
+def test_run_graph_order_and_concurrency():
+    barrier = threading.Barrier(2, timeout=5)
+    calls = []
+
+    def node(name, wait=False):
+        def run():
+            if wait:
+                # Only returns if both independent branches run at the same time
+                barrier.wait()
+            calls.append(name)
+            return name
+        return run
+
+    nodes = {
+        'a': (node('a'), []),
+        'b': (node('b', wait=True), ['a']),
+        'c': (node('c', wait=True), ['a']),
+        'd': (node('d'), ['b', 'c'])
+    }
+    results, timings = run_graph(nodes, workers=2)
+    assert results == {name: name for name in nodes}
+    assert set(timings) == set(nodes)
+    assert calls[0] == 'a' and calls[-1] == 'd'
+    assert len(calls) == 4
+
+
+def test_run_graph_errors():
+    with pytest.raises(ValueError):
+        run_graph({'a': (lambda: 1, ['missing'])})
+    with pytest.raises(ValueError):
+        run_graph({'a': (lambda: 1, ['b']), 'b': (lambda: 2, ['a'])})
+    with pytest.raises(ZeroDivisionError):
+        run_graph({'a': (lambda: 1 / 0, []), 'b': (lambda: 2, ['a'])})
@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import frame_cache
+from frame_cache import cache_frame, cache_path, read_csv_cached
+
+
+def write_csv(path, df):
+    df.to_csv(str(path), index=False)
+    return str(path)
+
+
+def test_round_trip(tmpdir):
+    df = pd.DataFrame({'PID': ['a', 'b', None], 'length': [1.5, 2.0, np.nan], 'numPassengers': [0, 3, 1]})
+    path = write_csv(tmpdir.join('legs_dataframe.csv'), df)
+
+    parsed = read_csv_cached(path)
+    assert os.path.isdir(cache_path(path))
+    cached = read_csv_cached(path)
+
+    pd.testing.assert_frame_equal(parsed, cached)
+    cached.loc[0, 'length'] = 10.0
+
+
+def test_index_col_round_trip(tmpdir):
+    df = pd.DataFrame({'Modes': ['car', 'walk'], 'Bin_0': [1, 2], 'Bin_1': [3, 4]})
+    path = write_csv(tmpdir.join('101.modeChoice.csv'), df)
+
+    parsed = read_csv_cached(path, index_col=0)
+    cached = read_csv_cached(path, index_col=0)
+
+    pd.testing.assert_frame_equal(parsed, cached)
+    pd.testing.assert_frame_equal(read_csv_cached(path), pd.read_csv(path))
+
+
+def test_invalidated_by_source_change(tmpdir, monkeypatch):
+    path = write_csv(tmpdir.join('trips_dataframe.csv'), pd.DataFrame({'Fare': [1.0, 2.0]}))
+    read_csv_cached(path)
+
+    write_csv(tmpdir.join('trips_dataframe.csv'), pd.DataFrame({'Fare': [1.0, 2.0, 3.0]}))
+    assert read_csv_cached(path)['Fare'].tolist() == [1.0, 2.0, 3.0]
+
+    # Same size, new mtime and content: the hash check rejects the cache
+    write_csv(tmpdir.join('trips_dataframe.csv'), pd.DataFrame({'Fare': [4.0, 5.0, 6.0]}))
+    os.utime(path, (1, 1))
+    assert read_csv_cached(path)['Fare'].tolist() == [4.0, 5.0, 6.0]
+
+    # Touched but unchanged: the cache is reused without parsing the CSV file
+    os.utime(path, (2, 2))
+    monkeypatch.setattr(frame_cache.pd, 'read_csv', None)
+    assert read_csv_cached(path)['Fare'].tolist() == [4.0, 5.0, 6.0]
+
+
+def test_cache_frame(tmpdir, monkeypatch):
+    path = write_csv(tmpdir.join('persons_dataframe.csv'), pd.DataFrame({'PID': ['a', 'b'], 'Age': [30, 40]}))
+    monkeypatch.setattr(frame_cache, 'FRAME_CACHE_ENABLED', False)
+    df = read_csv_cached(path)
+    assert not cache_frame(df, path) and not os.path.isdir(cache_path(path))
+
+    # A frame spilled to the cache is read back without parsing the CSV file
+    monkeypatch.setattr(frame_cache, 'FRAME_CACHE_ENABLED', True)
+    assert cache_frame(df, path)
+    monkeypatch.setattr(frame_cache.pd, 'read_csv', None)
+    pd.testing.assert_frame_equal(read_csv_cached(path), df)
@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+
+from grid import complete_grid, expand_wildcards
+
+
+def test_complete_grid():
+    df = pd.DataFrame({'route': ['b', 'b', 'a'], 'period': [1, 1, 0], 'time': [1.0, 2.0, 3.0]})
+    completed = complete_grid(df, [('route', ['a', 'b', 'c']), ('period', [0, 1])], fill_value={'time': -1.0})
+    assert completed.values.tolist() == [
+        ['b', 1, 1.0], ['b', 1, 2.0], ['a', 0, 3.0],
+        ['a', 1, -1.0], ['b', 0, -1.0], ['c', 0, -1.0], ['c', 1, -1.0]
+    ]
+    assert complete_grid(df, [('route', ['a', 'b'])]) is df
+    assert complete_grid(df.iloc[:0], [('route', ['a'])]).values.tolist() == [['a', 0.0, 0.0]]
+
+
+def test_expand_wildcards():
+    fares = pd.DataFrame({'routeId': ['1', np.nan, '2'], 'amount': [1.0, 2.0, 3.0]}, index=[5, 6, 7])
+    expanded = expand_wildcards(fares, 'routeId', ['1', '2', '3'])
+    assert expanded.values.tolist() == [['1', 1.0], ['1', 2.0], ['2', 2.0], ['3', 2.0], ['2', 3.0]]
+    assert expanded.index.tolist() == list(range(5))
@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+from identifiers import IdentifierTable, get_indexer
+
+
+def test_interned_columns_share_codes():
+    table = IdentifierTable()
+    persons = table.intern(pd.Series(['p2', 'p1', 'p3']))
+    trips = table.intern(pd.Series(['p1', 'p4', np.nan, 'p1'], dtype='category'))
+
+    assert len(table) == 4
+    assert trips.astype(object).tolist()[:2] == ['p1', 'p4'] and trips.isnull().tolist() == [False, False, True, False]
+    assert trips.cat.codes.tolist() == [persons.cat.codes[1], 3, -1, persons.cat.codes[1]]
+    assert table.decode(trips.cat.codes).tolist()[:2] == ['p1', 'p4']
+
+    assert get_indexer(persons, trips).tolist() == [1, -1, -1, 1]
+    assert get_indexer(persons, trips).tolist() == pd.Index(persons.astype(object)).get_indexer(
+        trips.astype(object)).tolist()
+
+
+def test_get_indexer_of_unrelated_categoricals():
+    keys = pd.Series(['b', 'a'], dtype='category')
+    values = pd.Series(['a', 'c', 'b'], dtype='category')
+    assert get_indexer(keys, values).tolist() == [1, -1, 0]
@@ -0,0 +1,16 @@
+from kpi_weights import ranking_html, reweight
+
+
+def test_reweight():
+    data = {'Component Name': ['A', 'B', 'Submission Score'], 'Base Weighted Score': [1.0, 3.0, 2.0],
+            'Weighted Score': [1.0, 3.0, 2.0], 'color': ['a', 'b', 'c']}
+    assert reweight(data, {'A': 1.0, 'B': 1.0})['Weighted Score'] == [1.0, 3.0, 2.0]
+
+    reweighted = reweight(data, {'A': 2.0, 'B': 0.5})
+    assert reweighted['Weighted Score'] == [2.0, 1.5, 1.75]
+    assert reweighted['color'] == data['color'] and data['Weighted Score'] == [1.0, 3.0, 2.0]
+
+
+def test_ranking_html():
+    assert ranking_html([('S0/one', 1.75), ('S0/two', 2.7)]) == \
+        '<b>Ranking</b><br>1. S0/two: 2.700<br>2. S0/one: 1.750'
@@ -0,0 +1,117 @@
+import gc
+import weakref
+import numpy as np
+import pandas as pd
+import pytest
+
+import frame_cache
+from path_traversals import aggregate_path_traversals, read_path_traversals, ridership_vmt_histogram
+from reference import ReferenceData
+from routes import RouteIndex
+
+
+def make_reference(capacities, routes=None):
+    vehicle_types = pd.DataFrame({'vehicleTypeId': list(capacities),
+                                  'seatingCapacity': [seating for seating, _ in capacities.values()],
+                                  'standingRoomCapacity': [standing for _, standing in capacities.values()]})
+    vehicle_costs = pd.DataFrame({'vehicleTypeId': list(capacities), 'opAndMaintCost': 100.0})
+    routes = routes or {'t_0': 1340}
+    trips = pd.DataFrame({'trip_id': list(routes), 'route_id': list(routes.values())})
+    return ReferenceData(vehicle_types, vehicle_costs, trips)
+
+
+def write_path_traversals(path, n=2000, seed=0):
+    random = np.random.RandomState(seed)
+    mode = random.choice(['walk', 'bus', 'car'], n)
+    # Buses of known and unknown (t_9) trips, ride hail and private cars
+    bus_vehicles = ['SF:t_{}-{}'.format(trip, i % 3) for i, trip in enumerate(random.choice([0, 1, 2, 3, 9], n))]
+    car_vehicles = np.where(random.rand(n) < 0.6, 'rideHailVehicle-' + pd.Series(random.randint(0, 50, n)).astype(str),
+                            'car-1')
+    departure = random.randint(0, 26 * 3600, n)
+    pd.DataFrame({
+        'vehicle': np.where(mode == 'bus', bus_vehicles, np.where(mode == 'car', car_vehicles, 'body-1')),
+        'mode': mode,
+        'vehicleType': np.where(mode == 'bus', random.choice(['BUS-DEFAULT', 'BUS-SMALL'], n),
+                                np.where(mode == 'car', 'Car', 'BODY')),
+        'numPassengers': np.where(mode == 'walk', 0, random.randint(0, 40, n)),
+        'departureTime': departure,
+        'arrivalTime': departure + random.randint(0, 1800, n),
+        'length': random.uniform(0, 5000, n),
+        'FuelCost': random.uniform(0, 3, n)
+    }).to_csv(path, index=False)
+
+
+def test_ridership_vmt_histogram():
+    paths = pd.DataFrame({
+        'vehicleType': pd.Categorical(['BUS-DEFAULT', 'BUS-DEFAULT', 'BUS-SMALL', 'BUS-DEFAULT', 'BUS-UNKNOWN']),
+        'numPassengers': [0, 5, 12, 20, 3],
+        'departureTime': [0, 3600, 3601, 90000, 100],
+        'length': [100.0, 200.0, 300.0, 400.0, 500.0]
+    })
+    reference = make_reference({'BUS-DEFAULT': (10, 10), 'BUS-SMALL': (10, 5)})
+
+    histogram = ridership_vmt_histogram(paths, reference)
+
+    assert histogram.shape == (24, 5)
+    # Empty bus at midnight, half full bus at the end of the first hour
+    assert histogram[0, 0] == 100.0
+    assert histogram[0, 1] == 200.0
+    # 2 standing passengers out of 5: 140%
+    assert histogram[1, 3] == 300.0
+    # Departures after the end of the day and unknown vehicle types are left out
+    assert histogram.sum() == 600.0
+
+
+def test_ridership_vmt_histogram_resolution():
+    paths = pd.DataFrame({
+        'vehicleType': pd.Categorical(['BUS-DEFAULT'] * 3),
+        'numPassengers': [10, 15, 25],
+        'departureTime': [1800, 1801, 86400],
+        'length': [1.0, 2.0, 4.0]
+    })
+    reference = make_reference({'BUS-DEFAULT': (10, 10)})
+
+    histogram = ridership_vmt_histogram(paths, reference, ridership_edges=[0, 100, 300], time_bin=1800)
+
+    assert histogram.shape == (48, 2)
+    np.testing.assert_array_equal(histogram[[0, 1, 47]], [[1.0, 0.0], [0.0, 2.0], [0.0, 4.0]])
+
+
+@pytest.mark.parametrize('chunksize', [1, 7, 128, 5000])
+def test_chunked_aggregates(tmp_path, monkeypatch, chunksize):
+    monkeypatch.setattr(frame_cache, 'FRAME_CACHE_ENABLED', False)
+    path = str(tmp_path / 'path_traversals_dataframe.csv')
+    write_path_traversals(path)
+    reference = make_reference({'BUS-DEFAULT': (30, 20), 'BUS-SMALL': (20, 10), 'Car': (4, 0)},
+                               routes={'t_0': 1340, 't_1': 1341, 't_2': 1341, 't_3': 1342})
+    whole = aggregate_path_traversals(read_path_traversals(path), reference, RouteIndex(reference))
+
+    # Chunks are dropped once added to the aggregates, only a chunk at a time is held
+    chunks = []
+
+    def tracked(chunks_read):
+        for chunk in chunks_read:
+            assert len(chunk) <= chunksize
+            chunks.append(weakref.ref(chunk))
+            yield chunk
+            gc.collect()
+            assert sum(chunk() is not None for chunk in chunks) <= 1
+
+    chunked = aggregate_path_traversals(tracked(read_path_traversals(path, chunksize)), reference,
+                                        RouteIndex(reference))
+    assert len(chunks) == -(-2000 // chunksize)
+
+    for attr in ['walk_length', 'bus_length', 'on_demand_length']:
+        assert getattr(chunked, attr) == pytest.approx(getattr(whole, attr), rel=1e-9)
+    np.testing.assert_allclose(chunked.bus_vmt, whole.bus_vmt, rtol=1e-9)
+    for attr, by in [('on_demand_vmt', ['Hour', 'drivingState']), ('crowding', ['route_id', 'servicePeriod']),
+                     ('bus_costs', ['route_id'])]:
+        expected = getattr(whole, attr).sort_values(by).reset_index(drop=True)
+        aggregate = getattr(chunked, attr).sort_values(by).reset_index(drop=True)
+        pd.testing.assert_frame_equal(aggregate, expected, check_dtype=False, check_less_precise=True)
+
+    # The aggregates only grow with the number of hours, routes and passenger counts, not with the chunks
+    assert len(chunked.on_demand_vmt) <= 24 * 2
+    assert len(chunked.crowding) <= len(reference.route_ids) * 5
+    assert len(chunked.bus_costs) <= len(reference.route_ids)
+    assert whole.bus_length > 0 and len(whole.crowding) and whole.on_demand_length > 0
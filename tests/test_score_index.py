@@ -0,0 +1,33 @@
+import os
+
+import score_index
+from score_index import ScoreIndex
+
+
+def write_scores(path, total, cost):
+    with open(path, 'w') as f:
+        f.write('Component Name,Weight,Raw Score,Weighted Score\n')
+        f.write('Level of service: costs and benefits,1.0,1.0,{}\n'.format(cost))
+        f.write('Submission Score,,,{}\n'.format(total))
+
+
+def test_update_reads_only_new_and_changed_score_files(tmpdir, monkeypatch):
+    monkeypatch.setattr(score_index, 'scores_path', lambda pair: str(tmpdir.join(pair.replace('/', '_') + '.csv')))
+    write_scores(score_index.scores_path('S0/a'), 2.0, 1.0)
+    write_scores(score_index.scores_path('S0/b'), 3.0, 1.5)
+    write_scores(score_index.scores_path('S1/c'), 1.0, 0.5)
+    index = ScoreIndex(workers=2)
+
+    assert index.update(['S0/a', 'S0/b', 'S1/c', 'S1/unscored']) == (['S0/a', 'S0/b', 'S1/c'], [])
+    assert index.update(['S0/a', 'S0/b', 'S1/c']) == ([], [])
+    version = index.version
+
+    write_scores(score_index.scores_path('S0/a'), 4.25, 2.0)
+    assert index.update(['S0/a', 'S0/b']) == (['S0/a'], ['S1/c'])
+    assert index.version == version + 1
+
+    leaderboard = index.frame()
+    assert leaderboard[['Rank', 'Scenario', 'Submission', 'Submission Score']].values.tolist() == [
+        [1, 'S0', 'a', 4.25], [2, 'S0', 'b', 3.0]]
+    assert index.frame('S0', 'B')['Submission'].tolist() == ['b']
+    assert index.frame('S1').empty and os.path.exists(score_index.scores_path('S1/c'))
@@ -0,0 +1,84 @@
+import threading
+
+import submission_store
+from submission_store import SubmissionStore
+
+
+class FakeSubmission():
+
+    def __init__(self, scenario, name, retention):
+        self.scenario = scenario
+        self.name = name
+
+    def memory_usage(self):
+        return {'raw': 0, 'data': 0}
+
+
+def test_hit_and_miss_counters(monkeypatch):
+    loads = []
+
+    def load_submission(scenario, name, retention):
+        loads.append((scenario, name))
+        return FakeSubmission(scenario, name, retention)
+
+    monkeypatch.setattr(submission_store, 'load_submission', load_submission)
+    store = SubmissionStore()
+    first = store.get('S0', 'example_run')
+    assert store.get('S0', 'example_run') is first and store.get('S0', 'example_run') is first
+    store.get('S0', 'warm-start')
+    store.get('S1', 'example_run')
+    store.get('S0', 'warm-start')
+
+    assert loads == [('S0', 'example_run'), ('S0', 'warm-start'), ('S1', 'example_run')]
+    stats = store.stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (3, 3, 3)
+
+    # An evicted submission is loaded again on its next request
+    store.evict('S0', 'example_run')
+    assert store.get('S0', 'example_run') is not first
+    assert (store.stats()['hits'], store.stats()['misses']) == (3, 4)
+
+
+def test_submit_data_shares_in_flight_requests():
+    store = SubmissionStore()
+    release = threading.Event()
+    calls = []
+
+    def get_data(scenario, name, data_sources):
+        calls.append((scenario, name))
+        release.wait(5)
+        return {data_source: name for data_source in data_sources}
+
+    store.get_data = get_data
+    first = store.submit_data('S0', 'example_run', ['fleetmix_input_data'])
+    second = store.submit_data('S0', 'example_run', ['fleetmix_input_data'])
+    other = store.submit_data('S0', 'warm-start', ['fleetmix_input_data'])
+    release.set()
+
+    assert first is second and first is not other
+    assert first.result() == {'fleetmix_input_data': 'example_run'}
+    assert other.result() == {'fleetmix_input_data': 'warm-start'}
+    assert sorted(calls) == [('S0', 'example_run'), ('S0', 'warm-start')]
+
+
+def test_raw_frames_released_in_lru_order():
+    store = SubmissionStore()
+    data_sources = ['mode_choice_by_age_group_data']
+    for name in ['example_run', 'warm-start']:
+        store.get_data('S0', name, data_sources)
+    first, second = store._submissions[('S0', 'example_run')], store._submissions[('S0', 'warm-start')]
+    # The raw frames read to compute the data sources are accounted for as soon as they are computed
+    assert first.raw_memory_usage() > 0 and second.raw_memory_usage() > 0
+    assert list(store._raw_memory) == [('S0', 'example_run'), ('S0', 'warm-start')]
+
+    # Using example_run again makes warm-start the least recently used, released first once over budget
+    store.raw_memory_budget = max(first.raw_memory_usage(), second.raw_memory_usage())
+    store.get_data('S0', 'example_run', data_sources)
+    assert second.raw_memory_usage() == 0 and 'trips_df' not in second.__dict__
+    assert first.raw_memory_usage() > 0 and 'trips_df' in first.__dict__
+    assert list(store._raw_memory) == [('S0', 'example_run')]
+
+    # Released submissions keep their data sources and intermediates, so they do not read their raw frames again
+    data = store.get_data('S0', 'warm-start', data_sources + ['mode_choice_by_income_group_data'])
+    assert data['mode_choice_by_age_group_data'] is second.mode_choice_by_age_group_data
+    assert second.raw_memory_usage() == 0 and ('S0', 'warm-start') not in store._raw_memory
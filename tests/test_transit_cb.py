@@ -0,0 +1,77 @@
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from path_traversals import aggregate_path_traversals
+from reference import ReferenceData
+from routes import RouteIndex
+from submission import bus_fares_by_route, transit_cost_benefit
+
+N_ROUTES = 12
+N_TRIPS_PER_ROUTE = 50
+N_PATHS = 200000
+N_LEGS = 200000
+
+
+def make_inputs():
+    rng = np.random.RandomState(0)
+    n_trips = N_ROUTES * N_TRIPS_PER_ROUTE
+    reference = ReferenceData(
+        pd.DataFrame({'vehicleTypeId': ['BUS-DEFAULT'], 'seatingCapacity': [10], 'standingRoomCapacity': [10]}),
+        pd.DataFrame({'vehicleTypeId': ['BUS-DEFAULT'], 'opAndMaintCost': [100.0]}),
+        pd.DataFrame({'trip_id': ['t_{}'.format(trip) for trip in range(n_trips)],
+                      'route_id': 1340 + np.arange(n_trips) % N_ROUTES}))
+    path_trips = rng.randint(n_trips, size=N_PATHS)
+    paths = pd.DataFrame({
+        'vehicle': ['217:t_{}-0'.format(trip) for trip in path_trips],
+        'mode': pd.Categorical(['bus'] * N_PATHS),
+        'vehicleType': pd.Categorical(['BUS-DEFAULT'] * N_PATHS),
+        'numPassengers': rng.randint(0, 10, size=N_PATHS),
+        'departureTime': np.zeros(N_PATHS, dtype=int),
+        'arrivalTime': np.full(N_PATHS, 1800),
+        'length': np.ones(N_PATHS),
+        'FuelCost': np.full(N_PATHS, 2.0)
+    })
+    leg_trips = rng.randint(n_trips, size=N_LEGS)
+    legs = pd.DataFrame({
+        'Mode': pd.Categorical(['bus'] * N_LEGS),
+        'Veh': ['217:t_{}-0'.format(trip) for trip in leg_trips],
+        'Fare': np.full(N_LEGS, 1.5)
+    })
+    return paths, legs, reference, path_trips % N_ROUTES, leg_trips % N_ROUTES
+
+
+def test_transit_cost_benefit_totals_and_memory():
+    paths, legs, reference, path_routes, leg_routes = make_inputs()
+    chunks = [paths.iloc[start:start + 20000] for start in range(0, N_PATHS, 20000)]
+
+    tracemalloc.start()
+    route_index = RouteIndex(reference)
+    aggregates = aggregate_path_traversals(chunks, reference, route_index)
+    grouped = transit_cost_benefit(aggregates.bus_costs, bus_fares_by_route(legs, route_index))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # A join of both sides on the route alone would have N_PATHS * N_LEGS / N_ROUTES rows
+    assert peak < 64 * 1024 ** 2
+    assert len(grouped) == N_ROUTES
+
+    route_ids = 1340 + np.arange(N_ROUTES)
+    np.testing.assert_allclose(grouped.loc[route_ids, 'OperationalCosts'],
+                               50.0 * np.bincount(path_routes, minlength=N_ROUTES))
+    np.testing.assert_allclose(grouped.loc[route_ids, 'FuelCost'], 2.0 * np.bincount(path_routes, minlength=N_ROUTES))
+    np.testing.assert_allclose(grouped.loc[route_ids, 'Fare'], 1.5 * np.bincount(leg_routes, minlength=N_ROUTES))
+    assert grouped['FuelCost'].sum() == 2.0 * N_PATHS
+    assert grouped['Fare'].sum() == 1.5 * N_LEGS
+
+
+def test_transit_cost_benefit_missing_routes():
+    bus_costs = pd.DataFrame({'route_id': [1340, 1341], 'OperationalCosts': [10.0, 20.0], 'FuelCost': [1.0, 2.0]})
+    bus_fares = pd.DataFrame({'route_id': [1341, 1342], 'Fare': [5.0, 6.0]})
+
+    grouped = transit_cost_benefit(bus_costs, bus_fares)
+
+    assert grouped.loc[1340, 'Fare'] == 0.0
+    assert grouped.loc[1342, 'OperationalCosts'] == 0.0
+    assert grouped.loc[1341].tolist() == [20.0, 2.0, 5.0]
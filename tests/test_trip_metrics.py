@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from submission import Submission
+from trip_metrics import compute_trip_metrics
+
+MODES = ['OnDemand_ride', 'bike', 'car', 'drive_transit', 'walk', 'walk_transit']
+
+
+def sample_trips(n=3000, seed=0):
+    random = np.random.RandomState(seed)
+    persons = pd.DataFrame({
+        'PID': ['p{}'.format(i) for i in range(400)],
+        # Some ages and incomes out of the bin edges
+        'Age': random.randint(-5, 90, 400),
+        'income': random.randint(-1000, 200000, 400)
+    })
+    trips = pd.DataFrame({
+        # Some trips of persons missing from the persons file
+        'PID': ['p{}'.format(i) for i in random.randint(0, 420, n)],
+        'Trip_ID': ['t{}'.format(i) for i in range(n)],
+        'realizedTripMode': random.choice(MODES, n),
+        # Some trips longer than the distance edges
+        'Distance_m': random.uniform(0, 80000, n),
+        # Some trips without a duration
+        'Duration_sec': random.randint(0, 3600, n).astype(float),
+        # Some trips starting before or after the speed edges
+        'Start_time': random.uniform(0, 26 * 3600, n),
+        'FuelCost': random.uniform(0, 5, n),
+        'Fare': random.uniform(0, 5, n),
+        # Some trips with a negative cost
+        'Incentive': random.uniform(0, 6, n)
+    })
+    # Missing values, skipped by the means and sums
+    trips.loc[::97, 'FuelCost'] = np.nan
+    trips.loc[::89, 'Incentive'] = np.nan
+    trips.loc[::83, 'Distance_m'] = np.nan
+    return trips, persons
+
+
+def submission(trips, persons):
+    submission = Submission(name='test', scenario='test', lazy=True)
+    submission.trips_df = trips
+    submission.persons_df = persons
+    return submission
+
+
+def old_trip_cost(trips):
+    trips = trips.copy()
+    trips.loc[:, 'trip_cost'] = np.zeros(trips.shape[0])
+    trips.loc[trips['realizedTripMode'] == 'car', 'trip_cost'] = \
+        trips[trips['realizedTripMode'] == 'car']['FuelCost'].values
+    fare_modes = ['walk_transit', 'drive_transit', 'OnDemand_ride']
+    trips.loc[trips['realizedTripMode'].isin(fare_modes), 'trip_cost'] = \
+        trips[trips['realizedTripMode'].isin(fare_modes)]['Fare'].values - \
+        trips[trips['realizedTripMode'].isin(fare_modes)]['Incentive'].values
+    trips.loc[trips['realizedTripMode'] == 'drive_transit', 'trip_cost'] = \
+        trips[trips['realizedTripMode'] == 'drive_transit']['trip_cost'].values + \
+        trips[trips['realizedTripMode'] == 'drive_transit']['FuelCost'].values
+    return trips
+
+
+# The builders of the trip metric data sources before they were computed by `compute_trip_metrics`
+
+def old_group_data(trips, persons, column, edges, labels):
+    people_mode = persons[['PID', column]].merge(trips[['PID', 'realizedTripMode']], on=['PID'])
+    people_mode.loc[:, 'group'] = pd.cut(people_mode[column], bins=edges, labels=labels, right=False).astype(str)
+    grouped = people_mode.groupby(by=['realizedTripMode', 'group'], observed=True).agg('count').reset_index()
+    grouped.loc[:, 'realizedTripMode'] = grouped['realizedTripMode'].astype(str)
+    return grouped.pivot(index='realizedTripMode', columns='group', values='PID').reset_index()
+
+
+def old_age_group_data(trips, persons):
+    edges = [0, 18, 30, 40, 50, 60, float('inf')]
+    labels = ['[{}, {})'.format(edges[i], edges[i + 1]) for i in range(len(edges) - 1)]
+    return old_group_data(trips, persons, 'Age', edges, labels)
+
+
+def old_income_group_data(trips, persons):
+    edges = [0, 10000, 25000, 50000, 75000, 100000, float('inf')]
+    labels = ['[$0, $10k)', '[$10k, $25k)', '[$25k, $50k)', '[$50k, $75k)', '[$75k, $100k)', '[$100k, inf)']
+    return old_group_data(trips, persons, 'income', edges, labels)
+
+
+def old_distance_data(trips, persons):
+    mode_df = trips[['Trip_ID', 'Distance_m', 'realizedTripMode']].copy()
+    mode_df.loc[:, 'Distance_miles'] = mode_df['Distance_m'] * 0.000621371
+    edges = [0, .5, 1, 1.5, 2, 2.5, 3, 3.5, 4, 5, 7.5, 10, 40]
+    labels = ['[{}, {})'.format(edges[i], edges[i + 1]) for i in range(len(edges) - 1)]
+    mode_df.loc[:, 'Trip Distance (miles)'] = pd.cut(mode_df['Distance_miles'], bins=edges, labels=labels,
+                                                     right=False).astype(str)
+    grouped = mode_df.groupby(by=['realizedTripMode', 'Trip Distance (miles)'], observed=True).agg('count')
+    grouped = grouped.reset_index().rename(columns={'Trip_ID': 'num_trips', 'realizedTripMode': 'Trip Mode'})
+    return grouped.pivot(index='Trip Distance (miles)', columns='Trip Mode', values='num_trips').reset_index()
+
+
+def old_travel_speed_data(trips, persons):
+    trips = trips[trips['Duration_sec'] > 0].copy()
+    trips.loc[:, 'Average Speed (miles/hour)'] = 2.23694 * (trips['Distance_m'] / trips['Duration_sec'])
+    edges = [6, 8, 10, 12, 14, 16, 18, 20, 22, 24]
+    labels = ['[{}, {})'.format(edges[i], edges[i + 1]) for i in range(len(edges) - 1)]
+    trips.loc[:, 'Start time interval (hour)'] = pd.cut(trips['Start_time'] / 3600, bins=edges, labels=labels,
+                                                        right=False).astype(str)
+    grouped = trips.groupby(by=['Start time interval (hour)', 'realizedTripMode'],
+                            observed=True)['Average Speed (miles/hour)'].mean().reset_index()
+    return grouped.pivot(index='Start time interval (hour)', columns='realizedTripMode',
+                         values='Average Speed (miles/hour)').reset_index()
+
+
+def old_travel_expenditure_data(trips, persons):
+    trips = old_trip_cost(trips)
+    trips = trips[trips['trip_cost'] >= 0].copy()
+    trips.loc[:, 'hour_of_day'] = np.floor(trips.Start_time / 3600)
+    grouped = trips.groupby(by=['realizedTripMode', 'hour_of_day'], observed=True)['trip_cost'].mean().reset_index()
+    return grouped.pivot(index='hour_of_day', columns='realizedTripMode', values='trip_cost').reset_index()
+
+
+def old_incentives_data(trips, persons):
+    trips = old_trip_cost(trips)
+    trips.loc[:, 'Incentives distributed'] = trips['Incentive'].values
+    trips.loc[trips['trip_cost'] < 0, 'Incentives distributed'] -= trips[trips['trip_cost'] < 0]['trip_cost'].values
+    trips.loc[:, 'hour_of_day'] = np.floor(trips['Start_time'] / 3600).astype(int)
+    grouped = trips.groupby(by=['realizedTripMode', 'hour_of_day'],
+                            observed=True)['Incentives distributed'].sum().reset_index()
+    return grouped.pivot(index='hour_of_day', columns='realizedTripMode',
+                         values='Incentives distributed').reset_index()
+
+
+OLD_BUILDERS = {
+    'mode_choice_by_age_group_data': old_age_group_data,
+    'mode_choice_by_income_group_data': old_income_group_data,
+    'mode_choice_by_distance_data': old_distance_data,
+    'congestion_travel_speed_data': old_travel_speed_data,
+    'los_travel_expenditure_data': old_travel_expenditure_data,
+    'transit_inc_by_mode_data': old_incentives_data
+}
+
+
+def assert_same_data(data, expected):
+    data = pd.DataFrame(data)
+    expected.columns = data.columns
+    pd.testing.assert_frame_equal(data, expected, check_dtype=False, check_names=False)
+
+
+def test_same_as_old_builders():
+    trips, persons = sample_trips()
+    new = submission(trips, persons)
+    for data_source, old_builder in OLD_BUILDERS.items():
+        expected = old_builder(trips, persons)
+        data = getattr(new, data_source)
+        assert list(data) == [str(column) for column in expected.columns], data_source
+        assert_same_data(data, expected)
+
+
+def test_bins_masks_and_missing_values():
+    trips = pd.DataFrame({
+        'PID': ['a', 'a', 'b', 'z'],
+        'Trip_ID': ['t0', 't1', 't2', 't3'],
+        'realizedTripMode': ['car', 'car', 'walk_transit', 'car'],
+        'Distance_m': [1000.0, 100000.0, np.nan, 2000.0],
+        'Duration_sec': [100.0, 0.0, 200.0, 400.0],
+        'Start_time': [7 * 3600.0, 7 * 3600.0, 3 * 3600.0, 7.5 * 3600],
+        'FuelCost': [2.0, np.nan, 0.0, 4.0],
+        'Fare': [0.0, 0.0, 1.0, 0.0],
+        'Incentive': [0.0, 0.0, 3.0, 0.0]
+    })
+    persons = pd.DataFrame({'PID': ['a', 'b'], 'Age': [25, -1], 'income': [5000, 20000]})
+    metrics = {name: {tuple(row[:2]): row[2] for row in metric.values.tolist()}
+               for name, metric in compute_trip_metrics(trips, persons).items()}
+
+    # Out of range and missing values fall in the "nan" bin, trips of unknown persons are left out
+    assert metrics['mode_choice_by_age_group'] == {('car', '[18, 30)'): 2, ('walk_transit', 'nan'): 1}
+    assert metrics['mode_choice_by_distance'] == {('car', '[0.5, 1)'): 1, ('car', 'nan'): 1, ('car', '[1, 1.5)'): 1,
+                                                  ('walk_transit', 'nan'): 1}
+    # Trips without duration are left out of the speeds, missing speeds are skipped by the mean
+    speeds = metrics['travel_speed']
+    assert sorted(speeds) == [('car', '[6, 8)'), ('walk_transit', 'nan')] and np.isnan(speeds['walk_transit', 'nan'])
+    assert speeds['car', '[6, 8)'] == pytest.approx((22.3694 + 11.1847) / 2)
+    # Trips with a negative cost are left out of the expenditure, trips of unknown cost are skipped by the mean
+    assert metrics['travel_expenditure'] == {('car', 7.0): 3.0}
+    # The incentives distributed make up for negative costs
+    assert metrics['incentives_distributed'] == {('car', 7): 0.0, ('walk_transit', 3): 3.0 + 2.0}
+
+
+def test_no_persons():
+    trips, persons = sample_trips(n=100)
+    metrics = compute_trip_metrics(trips, persons.iloc[:0])
+    assert len(metrics['mode_choice_by_age_group']) == 0 and len(metrics['mode_choice_by_income_group']) == 0
+    assert metrics['mode_choice_by_distance']['value'].sum() == len(trips)
@@ -0,0 +1,32 @@
+from watcher import SubmissionWatcher
+
+
+class RecordingStore():
+
+    def __init__(self):
+        self.calls = []
+
+    def evict(self, scenario, name):
+        self.calls.append(('evict', '{}/{}'.format(scenario, name)))
+
+    def set_submissions(self, submissions):
+        self.calls.append(('set_submissions', submissions))
+
+    def load(self, submissions, workers):
+        self.calls.append(('load', submissions))
+
+
+def test_poll_updates_only_the_changed_submissions():
+    store = RecordingStore()
+    watcher = SubmissionWatcher(store, workers=1)
+    watcher.fingerprints = {'S0/kept': {'a.csv': [1, 1]}, 'S0/changed': {'a.csv': [1, 1]}, 'S0/removed': {}}
+    watcher.scan = lambda: {'S0/kept': {'a.csv': [1, 1]}, 'S0/changed': {'a.csv': [2, 2]}, 'S0/added': {},
+                            'S0/copying': None}
+
+    assert watcher.poll() == (['S0/added', 'S0/copying'], ['S0/removed'], ['S0/changed'])
+    assert store.calls == [
+        ('evict', 'S0/removed'),
+        ('evict', 'S0/changed'),
+        ('set_submissions', ['S0/added', 'S0/changed', 'S0/copying', 'S0/kept']),
+        ('load', ['S0/added', 'S0/changed'])
+    ]